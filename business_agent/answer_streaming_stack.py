@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+
+from aws_cdk import (
+    NestedStack,
+    aws_lambda as lambda_,
+    aws_iam as iam,
+    Duration
+)
+from constructs import Construct
+from business_agent.answering import ANSWER_MODEL_ID, SQL_MODEL_ID
+from business_agent.financial_data_append import SDK_PANDAS_ACCOUNT, SDK_PANDAS_LAYER_VERSION
+from business_agent.report_retrieval import report_catalog
+from business_agent.semantic_cache import data_version
+
+ANSWER_STREAM_SOURCE_DIR = "./lambda/answer_stream"
+ANSWER_STREAM_BUILD_DIR = "./.build/answer_stream"
+
+# Modules of the business_agent package the answer server imports, the orchestrator answers with the same code
+SHARED_MODULES = [
+    "__init__.py", "answering.py", "documents.py", "embedding_cache.py", "report_retrieval.py", "semantic_cache.py"
+]
+
+# Lambda Web Adapter streams the chunked HTTP response of the answer server through the function URL
+LAMBDA_ADAPTER_ACCOUNT = "753240598075"
+LAMBDA_ADAPTER_LAYER_VERSION = 24
+
+
+def build_answer_stream_asset(output_dir=ANSWER_STREAM_BUILD_DIR):
+    """Answer server with the shared business_agent modules and the report catalog next to it"""
+    shutil.rmtree(output_dir, ignore_errors=True)
+    shutil.copytree(ANSWER_STREAM_SOURCE_DIR, output_dir, ignore=shutil.ignore_patterns("__pycache__"))
+
+    package_dir = os.path.join(output_dir, "business_agent")
+    os.makedirs(package_dir)
+    for module in SHARED_MODULES:
+        shutil.copy(os.path.join(os.path.dirname(__file__), module), package_dir)
+
+    with open(os.path.join(output_dir, "report_catalog.json"), "w") as f:
+        json.dump(report_catalog(), f, indent=2)
+    return output_dir
+
+
+class AnswerStreamingStack(NestedStack):
+    """Function URL that streams retrieved sources, SQL results and answer tokens as server-sent events"""
+
+    def __init__(self, scope: Construct, construct_id: str, *, knowledge_base_ids, **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        lambda_adapter_layer = lambda_.LayerVersion.from_layer_version_arn(
+            self, "LambdaAdapterLayer",
+            f"arn:aws:lambda:{self.region}:{LAMBDA_ADAPTER_ACCOUNT}:layer:LambdaAdapterLayerX86:"
+            f"{LAMBDA_ADAPTER_LAYER_VERSION}"
+        )
+        # The semantic answer cache needs NumPy, which the AWS SDK for pandas layer brings
+        sdk_pandas_layer = lambda_.LayerVersion.from_layer_version_arn(
+            self, "SdkPandasLayer",
+            f"arn:aws:lambda:{self.region}:{SDK_PANDAS_ACCOUNT}:layer:AWSSDKPandas-Python312:"
+            f"{SDK_PANDAS_LAYER_VERSION}"
+        )
+
+        answer_stream_lambda = lambda_.Function(
+            self, "AnswerStreamFunction",
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            handler="run.sh",
+            code=lambda_.Code.from_asset(build_answer_stream_asset()),
+            environment={
+                "AWS_LAMBDA_EXEC_WRAPPER": "/opt/bootstrap",
+                "AWS_LWA_INVOKE_MODE": "response_stream",
+                "AWS_LWA_READINESS_CHECK_PATH": "/health",
+                "PORT": "8080",
+                "FINANCIAL_DATA_KB_ID": knowledge_base_ids["financial_data"],
+                "INTERNAL_REPORTS_KB_ID": knowledge_base_ids["internal_reports"],
+                "RESEARCH_REPORTS_KB_ID": knowledge_base_ids["research_reports"],
+                "ANSWER_MODEL_ID": ANSWER_MODEL_ID,
+                "SQL_MODEL_ID": SQL_MODEL_ID,
+                "REGION": self.region,
+                # Changes with the data and reports, so a deploy of new data starts with empty answer caches
+                "DATA_VERSION": data_version()
+            },
+            layers=[lambda_adapter_layer, sdk_pandas_layer],
+            memory_size=512,
+            timeout=Duration.minutes(5)
+        )
+
+        # Grant permissions to query the knowledge bases and stream the answer
+        answer_stream_lambda.add_to_role_policy(iam.PolicyStatement(
+            actions=[
+                "bedrock:Retrieve",
+                "bedrock:RetrieveAndGenerate",
+                "bedrock:GenerateQuery",
+                "bedrock:InvokeModel",
+                "bedrock:InvokeModelWithResponseStream"
+            ],
+            resources=["*"]
+        ))
+
+        # Callers sign their requests, the response is streamed back as it is written
+        self.answer_stream_url = answer_stream_lambda.add_function_url(
+            auth_type=lambda_.FunctionUrlAuthType.AWS_IAM,
+            invoke_mode=lambda_.InvokeMode.RESPONSE_STREAM
+        )
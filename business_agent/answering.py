@@ -0,0 +1,85 @@
+# Retrieval and prompt of an answer, shared by the orchestrator and the answer stream Lambda. Only standard
+# library modules are imported here and in report_retrieval, both are copied into the Lambda asset as they are.
+from business_agent.report_retrieval import retrieve_reports
+
+ANSWER_MODEL_ID = "anthropic.claude-3-5-sonnet-20240620-v1:0"
+SQL_MODEL_ID = "anthropic.claude-3-5-sonnet-20240620-v1:0"
+
+# Each source gets its own deadline, a slow source is left out of the answer instead of delaying it
+DEFAULT_TIMEOUTS = {
+    "financial_data": 60.0,
+    "internal_reports": 10.0,
+    "research_reports": 10.0
+}  # seconds
+DEFAULT_NUMBER_OF_RESULTS = 5
+
+ANSWER_PROMPT = """You are a business analyst. Answer the question using only the context below, which comes from
+the company's financial data warehouse, its internal reports and external research reports. Cite the source of
+every fact in brackets and say so when the context does not answer the question.
+
+{context}
+
+Question: {question}"""
+
+NO_CONTEXT_ANSWER = "None of the knowledge bases returned a result for this question."
+
+
+def model_arn(region, model_id):
+    return f"arn:aws:bedrock:{region}::foundation-model/{model_id}"
+
+
+def query_financial_data(agent_runtime, kb_id, sql_model_arn, question):
+    """Let the SQL knowledge base generate and run the query and summarize its result"""
+    response = agent_runtime.retrieve_and_generate(
+        input={"text": question},
+        retrieveAndGenerateConfiguration={
+            "type": "KNOWLEDGE_BASE",
+            "knowledgeBaseConfiguration": {
+                "knowledgeBaseId": kb_id,
+                "modelArn": sql_model_arn
+            }
+        }
+    )
+    queries = [
+        reference["location"].get("sqlLocation", {}).get("query")
+        for citation in response.get("citations", [])
+        for reference in citation.get("retrievedReferences", [])
+    ]
+    return [{"text": response["output"]["text"], "queries": [query for query in queries if query]}]
+
+
+def query_reports(agent_runtime, kb_id, question, catalog, number_of_results=DEFAULT_NUMBER_OF_RESULTS):
+    """Chunks of a report knowledge base, scoped to the reports the question names"""
+    results = retrieve_reports(agent_runtime, kb_id, question, catalog, number_of_results)
+    return [
+        {
+            "text": result["content"]["text"],
+            "score": result.get("score"),
+            "document": result.get("metadata", {}).get("document_title")
+        } for result in results
+    ]
+
+
+def merge_context(results):
+    """One context of the results of every source that answered, labelled so the answer can cite it"""
+    sections = []
+    for source, source_results in results.items():
+        for number, result in enumerate(source_results, start=1):
+            label = f"{source} {number}" + (f" - {result['document']}" if result.get("document") else "")
+            body = result["text"]
+            if result.get("queries"):
+                body += "\nSQL: " + "\n".join(result["queries"])
+            sections.append(f"[{label}]\n{body}")
+    return "\n\n".join(sections)
+
+
+def answer_request(question, context, model_id=ANSWER_MODEL_ID):
+    """Arguments of the Converse call that answers a question from the merged context"""
+    return {
+        "modelId": model_id,
+        "messages": [{
+            "role": "user",
+            "content": [{"text": ANSWER_PROMPT.format(context=context, question=question)}]
+        }],
+        "inferenceConfig": {"maxTokens": 2048, "temperature": 0}
+    }
@@ -0,0 +1,86 @@
+from aws_cdk import (
+    NestedStack,
+    aws_lambda as lambda_,
+    aws_iam as iam,
+    Duration,
+    CustomResource
+)
+from aws_cdk.custom_resources import Provider
+from constructs import Construct
+
+BOOTSTRAP_CODE = "./lambda/bootstrap"
+
+
+class BootstrapStack(NestedStack):
+    """One custom resource provider that runs every bootstrap task of the other layers
+
+    Its handler dispatches on the Task property of a resource to a module under lambda/bootstrap/tasks.
+    Each layer grants the shared role what its own tasks need with a BootstrapTask.
+    """
+
+    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        self.role = iam.Role(
+            self, "BootstrapRole",
+            assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
+            managed_policies=[
+                iam.ManagedPolicy.from_aws_managed_policy_name("service-role/AWSLambdaBasicExecutionRole")
+            ]
+        )
+
+        # Both handlers share the code and the role, long running tasks return to is_complete in time
+        on_event_lambda = lambda_.Function(
+            self, "BootstrapFunction",
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            handler="index.on_event",
+            code=lambda_.Code.from_asset(BOOTSTRAP_CODE),
+            role=self.role,
+            memory_size=256,
+            timeout=Duration.minutes(10)
+        )
+
+        is_complete_lambda = lambda_.Function(
+            self, "BootstrapStatusFunction",
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            handler="index.is_complete",
+            code=lambda_.Code.from_asset(BOOTSTRAP_CODE),
+            role=self.role,
+            memory_size=256,
+            timeout=Duration.minutes(5)
+        )
+
+        self.provider = Provider(
+            self, "BootstrapProvider",
+            on_event_handler=on_event_lambda,
+            is_complete_handler=is_complete_lambda,
+            query_interval=Duration.seconds(10),
+            total_timeout=Duration.hours(2)
+        )
+        self.service_token = self.provider.service_token
+
+
+class BootstrapTask(Construct):
+    """Custom resource that runs one task of the bootstrap provider
+
+    The statements are granted to the shared bootstrap role by a policy in the calling layer, the resource
+    waits for that policy. Properties are passed to the task next to its name.
+    """
+
+    def __init__(self, scope: Construct, construct_id: str, *, bootstrap: BootstrapStack, task, properties,
+                 statements) -> None:
+        super().__init__(scope, construct_id)
+
+        self.policy = iam.Policy(
+            self, "Policy",
+            roles=[bootstrap.role],
+            statements=statements
+        )
+
+        self.resource = CustomResource(
+            self, "Resource",
+            service_token=bootstrap.service_token,
+            properties={"Task": task, **properties}
+        )
+
+        self.resource.node.add_dependency(self.policy)
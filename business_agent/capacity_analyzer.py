@@ -0,0 +1,210 @@
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from business_agent.capacity_profiles import BLOCK_BYTES, CAPACITY_PROFILES, DEFAULT_CAPACITY_PROFILE
+from business_agent.datalake import FINANCIAL_DATA_LAKE_DIR
+from business_agent.local_sql import connect, execute
+from business_agent.query_benchmark import load_query_pairs
+
+# Concurrency is measured once a second, the sustained level is this percentile of the busy seconds
+SAMPLE_SECONDS = 1
+SUSTAINED_PERCENTILE = 95
+
+# Columns of a SYS_QUERY_HISTORY export that carry the scan volume of a query, in order of preference.
+# blocks_read comes from SYS_QUERY_DETAIL and counts 1 MB blocks.
+SCAN_COLUMNS = {"scanned_bytes": 1, "external_scanned_bytes": 1, "blocks_read": BLOCK_BYTES}
+
+# Analysts of the local sample wait this long on average before asking the next question
+DEFAULT_THINK_SECONDS = 20.0
+
+
+def parse_time(value):
+    """Timestamp of an export, either ISO 8601 or Redshift's 'YYYY-MM-DD HH:MM:SS.ffffff'"""
+    return datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+
+
+def load_history(path):
+    """Rows of a SYS_QUERY_HISTORY export, a CSV with a header row or a JSON list of objects"""
+    with open(path, newline="") as f:
+        if path.endswith(".json"):
+            rows = json.load(f)
+            return rows["Records"] if isinstance(rows, dict) else rows
+        return list(csv.DictReader(f))
+
+
+def normalize(row):
+    """Start, end and scanned bytes of one query, None for rows that never ran"""
+    row = {key.lower(): value for key, value in row.items()}
+    if not row.get("start_time") or str(row.get("status", "success")).lower() in ("queued", "running", "planning"):
+        return None
+
+    start = parse_time(row["start_time"])
+    if row.get("end_time"):
+        end = parse_time(row["end_time"])
+    else:
+        # elapsed_time is in microseconds and includes the time the query queued
+        end = start + timedelta(microseconds=int(row.get("elapsed_time") or 0))
+
+    scanned = 0
+    for column, unit in SCAN_COLUMNS.items():
+        if row.get(column) not in (None, ""):
+            scanned = int(float(row[column])) * unit
+            break
+
+    queue_seconds = int(row.get("queue_time") or 0) / 1e6
+    return {"start": start, "end": max(end, start), "scanned_bytes": scanned, "queue_seconds": queue_seconds}
+
+
+def concurrency_samples(queries):
+    """Queries running at once in every sample second from the first start to the last end"""
+    started = min(query["start"] for query in queries)
+    offsets = np.array([[(query["start"] - started).total_seconds(), (query["end"] - started).total_seconds()]
+                        for query in queries])
+    samples = np.arange(0, offsets[:, 1].max() + SAMPLE_SECONDS, SAMPLE_SECONDS)
+    starts = np.searchsorted(np.sort(offsets[:, 0]), samples, side="right")
+    ends = np.searchsorted(np.sort(offsets[:, 1]), samples, side="left")
+    return starts - ends
+
+
+def analyze(rows):
+    """Concurrency, scan volume and queueing observed in the query history"""
+    queries = [query for query in map(normalize, rows) if query]
+    if not queries:
+        raise ValueError("The query history has no finished queries")
+
+    samples = concurrency_samples(queries)
+    busy = samples[samples > 0]
+    scanned_gb = np.array([query["scanned_bytes"] for query in queries]) / 1024 ** 3
+    queued = np.array([query["queue_seconds"] for query in queries])
+    span = (max(query["end"] for query in queries) - min(query["start"] for query in queries)).total_seconds()
+
+    return {
+        "queries": len(queries),
+        "span_hours": round(span / 3600, 2),
+        "queries_per_hour": round(len(queries) / max(span / 3600, 1 / 3600), 1),
+        "peak_concurrency": int(samples.max()),
+        "sustained_concurrency": int(np.percentile(busy, SUSTAINED_PERCENTILE)) if len(busy) else 0,
+        "busy_fraction": round(len(busy) / len(samples), 4),
+        "p95_scan_gb": round(float(np.percentile(scanned_gb, 95)), 3),
+        "max_scan_gb": round(float(scanned_gb.max()), 3),
+        "queued_fraction": round(float(np.mean(queued > 0)), 4),
+        "p95_queue_seconds": round(float(np.percentile(queued, 95)), 3)
+    }
+
+
+def recommend(stats):
+    """Smallest profile that serves the sustained and peak concurrency and the scan volume observed
+
+    Profiles are tried from the smallest base capacity, queries that already queued push the sustained
+    level up by one so the recommendation does not repeat an undersized workgroup.
+    """
+    sustained = stats["sustained_concurrency"] + (stats["queued_fraction"] > 0.05)
+    reasons = {}
+    for name, profile in sorted(CAPACITY_PROFILES.items(),
+                                key=lambda item: (item[1]["base_capacity"], item[1]["max_capacity"])):
+        misses = []
+        if sustained > profile["sustained_concurrency"]:
+            misses.append(f"sustained concurrency {sustained} > {profile['sustained_concurrency']}")
+        if stats["peak_concurrency"] > profile["peak_concurrency"]:
+            misses.append(f"peak concurrency {stats['peak_concurrency']} > {profile['peak_concurrency']}")
+        if stats["p95_scan_gb"] > profile["max_scan_gb"]:
+            misses.append(f"p95 scan {stats['p95_scan_gb']} GB > {profile['max_scan_gb']} GB")
+        if not misses:
+            return name, reasons
+        reasons[name] = misses
+    return max(CAPACITY_PROFILES, key=lambda name: CAPACITY_PROFILES[name]["max_capacity"]), reasons
+
+
+def table_bytes(data_lake_dir=FINANCIAL_DATA_LAKE_DIR):
+    """Parquet bytes of every table of the local data lake"""
+    sizes = {}
+    for table_name in os.listdir(data_lake_dir):
+        total = 0
+        for directory, _, files in os.walk(os.path.join(data_lake_dir, table_name)):
+            total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+        sizes[table_name] = total
+    return sizes
+
+
+def local_sample(analysts, duration, think_seconds=DEFAULT_THINK_SECONDS, seed=0):
+    """Query history of analysts replaying the query pairs against the local engine
+
+    Every query is timed once on DuckDB and scans the Parquet bytes of the tables it names. The analysts
+    then ask questions back to back with an exponential think time in between, laid out on a simulated
+    clock of the given duration in seconds.
+    """
+    connection = connect()
+    sizes = table_bytes()
+    timings = []
+    for _, _, sql in load_query_pairs():
+        started = time.perf_counter()
+        try:
+            execute(connection, sql)
+        except Exception:
+            continue
+        elapsed = time.perf_counter() - started
+        scanned = sum(size for table_name, size in sizes.items() if re.search(rf"\b{table_name}\b", sql))
+        timings.append((sql, elapsed, scanned))
+
+    rng = random.Random(seed)
+    origin = datetime(2024, 1, 1)
+    rows = []
+    for _ in range(analysts):
+        clock = rng.expovariate(1 / think_seconds)
+        while clock < duration:
+            sql, elapsed, scanned = rng.choice(timings)
+            rows.append({
+                "start_time": (origin + timedelta(seconds=clock)).isoformat(),
+                "end_time": (origin + timedelta(seconds=clock + elapsed)).isoformat(),
+                "queue_time": 0,
+                "status": "success",
+                "scanned_bytes": scanned,
+                "query_text": sql
+            })
+            clock += elapsed + rng.expovariate(1 / think_seconds)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recommend a Redshift capacity profile from a query history")
+    parser.add_argument("history", nargs="?", help="SYS_QUERY_HISTORY export as CSV or JSON, "
+                                                   "replays the query pairs locally if omitted")
+    parser.add_argument("--analysts", type=int, default=10, help="analysts of the local sample")
+    parser.add_argument("--duration", type=float, default=3600, help="simulated seconds of the local sample")
+    parser.add_argument("--think-seconds", type=float, default=DEFAULT_THINK_SECONDS,
+                        help="mean pause between the questions of an analyst in the local sample")
+    parser.add_argument("--output", help="also write the analysis to this JSON file")
+    args = parser.parse_args(argv)
+
+    rows = load_history(args.history) if args.history else local_sample(
+        args.analysts, args.duration, args.think_seconds
+    )
+    stats = analyze(rows)
+    profile, reasons = recommend(stats)
+
+    for key, value in stats.items():
+        print(f"{key:22} {value}")
+    for name, misses in reasons.items():
+        print(f"not {name}: {', '.join(misses)}")
+    capacity = CAPACITY_PROFILES[profile]
+    print(f"recommended profile {profile}: {capacity['base_capacity']} to {capacity['max_capacity']} RPUs"
+          + (" (the default)" if profile == DEFAULT_CAPACITY_PROFILE else "")
+          + f", deploy with -c redshiftCapacityProfile={profile}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"stats": stats, "profile": profile, "reasons": reasons}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
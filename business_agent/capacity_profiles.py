@@ -0,0 +1,100 @@
+import json
+
+# Named Redshift Serverless capacity profiles. base_capacity RPUs serve every query, the workgroup scales up to
+# max_capacity RPUs while queries queue. Each profile is sized for a number of queries running at once
+# (sustained at base, peak at max) and a largest expected scan per query.
+CAPACITY_PROFILES = {
+    "dev": {
+        "base_capacity": 8,
+        "max_capacity": 32,
+        "sustained_concurrency": 2,
+        "peak_concurrency": 5,
+        "max_scan_gb": 10,
+        "usage_limits": [
+            {"period": "daily", "rpu_hours": 24, "breach_action": "deactivate"}
+        ]
+    },
+    "steady": {
+        "base_capacity": 32,
+        "max_capacity": 128,
+        "sustained_concurrency": 10,
+        "peak_concurrency": 25,
+        "max_scan_gb": 100,
+        "usage_limits": [
+            {"period": "daily", "rpu_hours": 400, "breach_action": "emit-metric"},
+            {"period": "monthly", "rpu_hours": 8000, "breach_action": "log"}
+        ]
+    },
+    "burst": {
+        "base_capacity": 32,
+        "max_capacity": 512,
+        "sustained_concurrency": 10,
+        "peak_concurrency": 100,
+        "max_scan_gb": 500,
+        "usage_limits": [
+            {"period": "daily", "rpu_hours": 1500, "breach_action": "emit-metric"},
+            {"period": "monthly", "rpu_hours": 20000, "breach_action": "log"}
+        ]
+    }
+}
+
+DEFAULT_CAPACITY_PROFILE = "steady"
+
+# The SQL knowledge base gives up on a generated query after this long, Redshift should not keep running it
+QUERY_EXECUTION_TIMEOUT = 200  # seconds
+
+# Query monitoring rules that abort generated SQL gone wrong: queries running past the timeout, cross joins,
+# unfiltered scans of the whole lake and queries that spill to disk. Values are per query, blocks are 1 MB.
+QUERY_MONITORING_RULES = [
+    {"rule_name": "abort_long_running", "metric_name": "query_execution_time", "value": QUERY_EXECUTION_TIMEOUT},
+    {"rule_name": "abort_nested_loop_join", "metric_name": "nested_loop_join_row_count", "value": 10_000_000},
+    {"rule_name": "abort_large_join", "metric_name": "join_row_count", "value": 1_000_000_000},
+    {"rule_name": "abort_disk_spill", "metric_name": "query_temp_blocks_to_disk", "value": 100_000}
+]
+
+BLOCK_BYTES = 1024 * 1024
+
+
+def get_capacity_profile(name):
+    if name not in CAPACITY_PROFILES:
+        raise ValueError(f"Unknown capacity profile {name}, expected one of {', '.join(CAPACITY_PROFILES)}")
+    return CAPACITY_PROFILES[name]
+
+
+def query_monitoring_rules(profile):
+    """Abort rules of the profile, the blocks read rule scales with the largest scan it is sized for"""
+    rules = [
+        {"rule_name": rule["rule_name"], "predicate": [
+            {"metric_name": rule["metric_name"], "operator": ">", "value": rule["value"]}
+        ], "action": "abort"} for rule in QUERY_MONITORING_RULES
+    ]
+    rules.append({"rule_name": "abort_large_scan", "predicate": [
+        {"metric_name": "query_blocks_read", "operator": ">",
+         "value": profile["max_scan_gb"] * 1024 ** 3 // BLOCK_BYTES}
+    ], "action": "abort"})
+    return rules
+
+
+# Redshift Serverless takes either these individual query monitoring metrics or wlm_json_configuration,
+# never both in one workgroup
+QUERY_MONITORING_PARAMETERS = {
+    "max_query_cpu_time", "max_query_blocks_read", "max_scan_row_count", "max_query_execution_time",
+    "max_query_queue_time", "max_query_cpu_usage_percent", "max_query_temp_blocks_to_disk",
+    "max_join_row_count", "max_nested_loop_join_row_count"
+}
+
+
+# Metrics a rule of wlm_json_configuration can test, the parameters above without their max_ prefix
+QUERY_MONITORING_METRICS = {
+    "query_cpu_time", "query_blocks_read", "scan_row_count", "query_execution_time", "query_queue_time",
+    "query_cpu_usage_percent", "query_temp_blocks_to_disk", "join_row_count", "nested_loop_join_row_count"
+}
+
+
+def config_parameters(profile):
+    """Workgroup config parameters with the query monitoring rules, the execution timeout among them"""
+    return [
+        {"parameter_key": "wlm_json_configuration", "parameter_value": json.dumps([
+            {"query_group": [], "user_group": [], "rules": query_monitoring_rules(profile)}
+        ])}
+    ]
@@ -0,0 +1,231 @@
+from aws_cdk import (
+    NestedStack,
+    aws_s3 as s3,
+    aws_s3_deployment as s3_deployment,
+    aws_iam as iam,
+    aws_glue as glue,
+    RemovalPolicy
+)
+from constructs import Construct
+from business_agent.bootstrap_stack import BootstrapStack, BootstrapTask
+from business_agent.datalake import DATE_COLUMN, build_financial_data_lake, table_definitions
+from business_agent.rollups import GLUE_DATABASE
+from business_agent.table_profiles import table_profiles
+import json
+import os
+
+# Last year partition projection resolves for the financial data tables
+PROJECTION_END_YEAR = 2099
+
+FINANCIAL_DATA_PREFIX = "datalake/financial_data"
+# Monthly CSVs dropped under incoming/<table>/ are appended to the data lake, files that do not fit its
+# catalog columns are moved to rejected/
+INCOMING_PREFIX = "incoming/"
+REJECTED_PREFIX = "rejected/"
+# Parquet files written by the monthly append, kept when the deployment syncs the shipped data again
+APPENDED_FILES = "*/append-*.parquet"
+
+
+def glue_columns(columns, cfn_class=glue.CfnTable):
+    """Glue column properties for the column definitions of a financial data table"""
+    return [
+        cfn_class.ColumnProperty(name=column["name"], type=column["type"], comment=column["description"])
+        for column in columns
+    ]
+
+
+def parquet_storage_descriptor(location, columns, cfn_class=glue.CfnTable):
+    """Storage descriptor for a Parquet table or partition stored under location"""
+    return cfn_class.StorageDescriptorProperty(
+        columns=glue_columns(columns, cfn_class),
+        location=location,
+        input_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+        output_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
+        serde_info=cfn_class.SerdeInfoProperty(
+            serialization_library="org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"
+        )
+    )
+
+
+class DataLakeStack(NestedStack):
+    """Financial data bucket, its Parquet upload and the Glue catalog describing it"""
+
+    def __init__(self, scope: Construct, construct_id: str, *, bootstrap: BootstrapStack, **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        self.bootstrap = bootstrap
+
+        # Create an S3 bucket for storing financial data
+        self.financial_data_bucket = s3.Bucket(
+            self,
+            "FinancialDataBucket",
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True,
+        )
+
+        # Send object events to EventBridge, where the monthly append picks up new incoming files
+        self.financial_data_bucket.node.default_child.notification_configuration = \
+            s3.CfnBucket.NotificationConfigurationProperty(
+                event_bridge_configuration=s3.CfnBucket.EventBridgeConfigurationProperty(event_bridge_enabled=True)
+            )
+
+        # Upload the financial data to the S3 bucket as year partitioned Parquet
+        self.financial_data_deployment = s3_deployment.BucketDeployment(
+            self,
+            "FinancialDataDeployment",
+            destination_bucket=self.financial_data_bucket,
+            destination_key_prefix=FINANCIAL_DATA_PREFIX,
+            sources=[s3_deployment.Source.asset(build_financial_data_lake())],
+            exclude=[APPENDED_FILES]
+        )
+
+        # Create a Glue database
+        financial_data_database = glue.CfnDatabase(
+            self,
+            "FinancialDataDatabase",
+            catalog_id=self.account,
+            database_input=glue.CfnDatabase.DatabaseInputProperty(
+                name=GLUE_DATABASE,
+                description="Database for financial data catalog"
+            )
+        )
+
+        # Register every financial data table in the Glue catalog from the schemas known at synth time
+        financial_data_location = f"s3://{self.financial_data_bucket.bucket_name}/{FINANCIAL_DATA_PREFIX}"
+        self.financial_data_catalog = []
+        # Tables with a row per month, the ones new months are appended to
+        self.monthly_tables = []
+
+        profiles = table_profiles()
+        for table in table_definitions():
+            table_id = "".join(part.title() for part in table["name"].split("_"))
+            table_location = f"{financial_data_location}/{table['name']}"
+            table_parameters = {
+                "classification": "parquet",
+                # Redshift keeps no statistics of external tables, Spectrum orders joins by this row count.
+                # Months appended after the deploy make it a lower bound.
+                "numRows": str(profiles["tables"][table["name"]]["rows"])
+            }
+
+            if table["partition_keys"]:
+                # Partition projection lets Athena resolve new years without catalog updates
+                table_parameters.update({
+                    "projection.enabled": "true",
+                    "projection.year.type": "integer",
+                    "projection.year.range": f"{table['partitions'][0]},{PROJECTION_END_YEAR}",
+                    "storage.location.template": f"{table_location}/year=${{year}}/"
+                })
+
+            financial_data_table = glue.CfnTable(
+                self, f"{table_id}Table",
+                catalog_id=self.account,
+                database_name=GLUE_DATABASE,
+                table_input=glue.CfnTable.TableInputProperty(
+                    name=table["name"],
+                    description=f"Table containing {table['name']} information",
+                    table_type="EXTERNAL_TABLE",
+                    parameters=table_parameters,
+                    partition_keys=glue_columns(table["partition_keys"]),
+                    storage_descriptor=parquet_storage_descriptor(f"{table_location}/", table["columns"])
+                )
+            )
+
+            financial_data_table.add_dependency(financial_data_database)
+            self.financial_data_catalog.append(financial_data_table)
+
+            if table["partition_keys"] and any(column["name"] == DATE_COLUMN for column in table["columns"]):
+                self.monthly_tables.append(table["name"])
+
+            # Redshift Spectrum does not evaluate partition projection, so the shipped years are registered explicitly
+            for year in table["partitions"]:
+                financial_data_partition = glue.CfnPartition(
+                    self, f"{table_id}Partition{year}",
+                    catalog_id=self.account,
+                    database_name=GLUE_DATABASE,
+                    table_name=table["name"],
+                    partition_input=glue.CfnPartition.PartitionInputProperty(
+                        values=[str(year)],
+                        storage_descriptor=parquet_storage_descriptor(
+                            f"{table_location}/year={year}/", table["columns"], glue.CfnPartition
+                        )
+                    )
+                )
+
+                financial_data_partition.add_dependency(financial_data_table)
+                self.financial_data_catalog.append(financial_data_partition)
+
+        # Optionally crawl the data lake to detect drift between the data and the generated catalog
+        if self.node.try_get_context("catalogDriftCheck"):
+            self.add_catalog_drift_check()
+
+    def add_catalog_drift_check(self):
+        # Create a Glue Crawler role to crawl the financial data
+        financial_data_crawler_role = iam.Role(
+            self,
+            "FinancialDataCrawlerRole",
+            assumed_by=iam.ServicePrincipal("glue.amazonaws.com")
+        )
+
+        # Add managed policies for Glue service and S3 access
+        financial_data_crawler_role.add_managed_policy(
+            iam.ManagedPolicy.from_aws_managed_policy_name("service-role/AWSGlueServiceRole")
+        )
+
+        financial_data_crawler_role.add_to_policy(
+            iam.PolicyStatement(
+                actions=["glue:StartCrawler"],
+                resources=["*"]
+            )
+        )
+
+        self.financial_data_bucket.grant_read(financial_data_crawler_role)
+
+        # Create a Glue Crawler to crawl the financial data
+        financial_data_crawler = glue.CfnCrawler(
+            self,
+            "FinancialDataCrawler",
+            role=financial_data_crawler_role.role_arn,
+            database_name=GLUE_DATABASE,
+            targets=glue.CfnCrawler.TargetsProperty(
+                s3_targets=[glue.CfnCrawler.S3TargetProperty(
+                    path=f"s3://{self.financial_data_bucket.bucket_name}/{FINANCIAL_DATA_PREFIX}"
+                )]
+            ),
+            name="financial-data-crawler",
+            # Only report differences, the generated tables stay the source of truth
+            schema_change_policy=glue.CfnCrawler.SchemaChangePolicyProperty(
+                update_behavior="LOG",
+                delete_behavior="LOG"
+            ),
+            # Each folder under datalake/financial_data is one table, its year=YYYY folders are partitions
+            configuration=json.dumps({
+                "Version": 1.0,
+                "Grouping": {"TableLevelConfiguration": 4}
+            })
+        )
+
+        for catalog_resource in self.financial_data_catalog:
+            financial_data_crawler.node.add_dependency(catalog_resource)
+        financial_data_crawler.node.add_dependency(self.financial_data_deployment)
+
+        # Start the crawler and wait until its crawl succeeded and found every table
+        crawl_task = BootstrapTask(
+            self, "CrawlerStarter",
+            bootstrap=self.bootstrap,
+            task="crawl",
+            properties={
+                "CrawlerName": financial_data_crawler.name,
+                "DatabaseName": GLUE_DATABASE,
+                "ExpectedTables": sorted(os.listdir("./data/financial_data"))
+            },
+            statements=[iam.PolicyStatement(
+                actions=[
+                    "glue:StartCrawler",
+                    "glue:GetCrawler",
+                    "glue:GetTables"
+                ],
+                resources=["*"]
+            )]
+        )
+
+        crawl_task.resource.node.add_dependency(financial_data_crawler)
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+FINANCIAL_DATA_DIR = "./data/financial_data"
+FINANCIAL_DATA_LAKE_DIR = "./.build/financial_data"
+TABLE_DESCRIPTIONS_PATH = "./structured_knoledgebase_artifacts/table_column_description.json"
+
+# Tables are partitioned by calendar year when they carry a date or year column
+DATE_COLUMN = "date"
+PARTITION_COLUMN = "year"
+
+PARQUET_COMPRESSION = "snappy"
+
+GLUE_TYPES = {
+    pa.int32(): "int",
+    pa.int64(): "bigint",
+    pa.float64(): "double",
+    pa.string(): "string",
+    pa.date32(): "date",
+    pa.bool_(): "boolean"
+}
+
+
+def column_name(header):
+    """Normalize a CSV header into a catalog friendly column name
+
+    Names must start with a letter to be used unquoted in SQL, so "100% Recycled Cardboard" becomes
+    c_100pct_recycled_cardboard.
+    """
+    name = re.sub(r"[^0-9a-z]+", "_", header.strip().lower().replace("%", "pct")).strip("_")
+    return f"c_{name}" if name[:1].isdigit() else name
+
+
+def table_name_from_key(description_key):
+    """Map a camelCase key of table_column_description.json to its table name"""
+    return re.sub(r"(?<!^)([A-Z])", r"_\1", description_key).lower()
+
+
+def source_files(source_dir):
+    """List the CSV files of every table, keyed by table name"""
+    return {
+        table_name: sorted(
+            os.path.join(source_dir, table_name, file_name)
+            for file_name in os.listdir(os.path.join(source_dir, table_name))
+            if file_name.endswith(".csv")
+        )
+        for table_name in sorted(os.listdir(source_dir))
+        if os.path.isdir(os.path.join(source_dir, table_name))
+    }
+
+
+def source_hash(source_dir):
+    """Hash the CSV sources so an unchanged data set is not converted again"""
+    digest = hashlib.sha256(pa.__version__.encode())
+    for table_name, paths in source_files(source_dir).items():
+        for path in paths:
+            digest.update(os.path.relpath(path, source_dir).encode())
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def typed_columns(table):
+    """Normalize the column names of raw CSV rows, with months as dates and the year they fall in"""
+    table = table.rename_columns([column_name(name) for name in table.column_names])
+
+    # A column without a single value is read as null, it is stored as the string it would have been
+    for index, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(index, field.name, table[field.name].cast(pa.string()))
+
+    if DATE_COLUMN in table.column_names:
+        # 'YYYY-MM' strings become the first day of the month
+        month_start = pc.strptime(
+            pc.binary_join_element_wise(table[DATE_COLUMN].cast(pa.string()), "01", "-"),
+            format="%Y-%m-%d",
+            unit="s"
+        ).cast(pa.date32())
+        table = table.set_column(table.schema.get_field_index(DATE_COLUMN), DATE_COLUMN, month_start)
+        table = table.append_column(PARTITION_COLUMN, pc.year(month_start).cast(pa.int32()))
+    elif PARTITION_COLUMN in table.column_names:
+        table = table.set_column(
+            table.schema.get_field_index(PARTITION_COLUMN),
+            PARTITION_COLUMN,
+            table[PARTITION_COLUMN].cast(pa.int32())
+        )
+
+    return table
+
+
+def unified_column_types(schemas):
+    """Type every file of a table can be read with, per column
+
+    A column that is whole numbers in one file and has decimals in another is double, any other mix of types
+    is string. Columns without a value in a file take the type of the other files.
+    """
+    column_types = {}
+    for schema in schemas:
+        for field in schema:
+            if pa.types.is_null(field.type):
+                continue
+            known = column_types.setdefault(field.name, field.type)
+            if known != field.type:
+                numeric = {known, field.type} <= {pa.int64(), pa.float64()}
+                column_types[field.name] = pa.float64() if numeric else pa.string()
+    return column_types
+
+
+def read_table(paths):
+    """Read the CSV files of one table with typed columns"""
+    tables = [pv.read_csv(path) for path in paths]
+    column_types = unified_column_types([table.schema for table in tables])
+    # Files whose inferred types differ are read again with the types of the whole table
+    tables = [
+        table if all(field.type == column_types.get(field.name, field.type) for field in table.schema)
+        else pv.read_csv(path, convert_options=pv.ConvertOptions(column_types=column_types))
+        for path, table in zip(paths, tables)
+    ]
+    table = typed_columns(pa.concat_tables(tables))
+
+    if DATE_COLUMN in table.column_names:
+        table = table.sort_by([(DATE_COLUMN, "ascending")])
+    elif PARTITION_COLUMN in table.column_names:
+        table = table.sort_by([(PARTITION_COLUMN, "ascending")])
+
+    return table
+
+
+def write_table(table, table_dir):
+    """Write one table as Parquet, partitioned by year where possible"""
+    if PARTITION_COLUMN in table.column_names:
+        ds.write_dataset(
+            table,
+            table_dir,
+            format="parquet",
+            partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.int32())]), flavor="hive"),
+            basename_template="part-{i}.parquet",
+            file_options=ds.ParquetFileFormat().make_write_options(compression=PARQUET_COMPRESSION),
+            existing_data_behavior="delete_matching",
+            use_threads=False
+        )
+    else:
+        os.makedirs(table_dir, exist_ok=True)
+        pq.write_table(table, os.path.join(table_dir, "part-0.parquet"), compression=PARQUET_COMPRESSION)
+
+
+def build_financial_data_lake(source_dir=FINANCIAL_DATA_DIR, output_dir=FINANCIAL_DATA_LAKE_DIR):
+    """Convert every financial data CSV into compressed, year partitioned Parquet"""
+    marker_path = f"{output_dir.rstrip('/')}.sha256"
+    current_hash = source_hash(source_dir)
+
+    if os.path.isdir(output_dir) and os.path.exists(marker_path):
+        with open(marker_path) as f:
+            if f.read() == current_hash:
+                return output_dir
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    for table_name, paths in source_files(source_dir).items():
+        write_table(read_table(paths), os.path.join(output_dir, table_name))
+
+    with open(marker_path, "w") as f:
+        f.write(current_hash)
+
+    return output_dir
+
+
+def glue_type(table_name, field):
+    """Glue type of an Arrow column, raising for a type the catalog has no mapping for"""
+    if field.type not in GLUE_TYPES:
+        raise ValueError(
+            f"Column {table_name}.{field.name} has Arrow type {field.type}, expected one of "
+            f"{', '.join(str(arrow_type) for arrow_type in GLUE_TYPES)}"
+        )
+    return GLUE_TYPES[field.type]
+
+
+def table_definitions(source_dir=FINANCIAL_DATA_DIR, descriptions_path=TABLE_DESCRIPTIONS_PATH):
+    """Describe the columns, partition key and partition values of every table for the Glue catalog"""
+    with open(descriptions_path) as f:
+        descriptions = {
+            table_name_from_key(key): {column_name(column): text for column, text in columns.items()}
+            for key, columns in json.load(f).items()
+        }
+
+    definitions = []
+    for name, paths in source_files(source_dir).items():
+        table = read_table(paths)
+        column_descriptions = descriptions.get(name, {})
+        partitioned = PARTITION_COLUMN in table.column_names
+
+        definitions.append({
+            "name": name,
+            "columns": [
+                {
+                    "name": field.name,
+                    "type": glue_type(name, field),
+                    "description": column_descriptions.get(field.name, "")
+                } for field in table.schema
+                if not (partitioned and field.name == PARTITION_COLUMN)
+            ],
+            "partition_keys": [
+                {
+                    "name": PARTITION_COLUMN,
+                    "type": "int",
+                    "description": column_descriptions.get(PARTITION_COLUMN, "Calendar year of the record")
+                }
+            ] if partitioned else [],
+            "partitions": sorted(set(table[PARTITION_COLUMN].to_pylist())) if partitioned else []
+        })
+
+    return definitions
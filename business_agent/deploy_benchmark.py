@@ -0,0 +1,169 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+STACK_NAME = "BusinessAgentStack"
+CDK_OUT_DIR = "./cdk.out"
+HISTORY_PATH = "./.build/deploy_benchmark.json"
+
+IN_PROGRESS_SUFFIX = "_IN_PROGRESS"
+COMPLETE_SUFFIX = "_COMPLETE"
+
+
+def nested_stacks(cdk_out_dir=CDK_OUT_DIR, stack_name=STACK_NAME):
+    """Map the logical ID of every nested stack resource to its layer name and template file"""
+    with open(os.path.join(cdk_out_dir, f"{stack_name}.template.json")) as f:
+        template = json.load(f)
+
+    return {
+        logical_id: {
+            # aws:cdk:path looks like BusinessAgentStack/DataLake.NestedStack/DataLake.NestedStackResource
+            "layer": resource["Metadata"]["aws:cdk:path"].split("/")[1].split(".")[0],
+            "template": os.path.join(cdk_out_dir, resource["Metadata"]["aws:asset:path"])
+        }
+        for logical_id, resource in template["Resources"].items()
+        if resource["Type"] == "AWS::CloudFormation::Stack"
+    }
+
+
+def layer_templates(cdk_out_dir=CDK_OUT_DIR, stack_name=STACK_NAME):
+    """Map the parent stack and every nested stack layer to its synthesized template"""
+    templates = {stack_name: os.path.join(cdk_out_dir, f"{stack_name}.template.json")}
+    for nested_stack in nested_stacks(cdk_out_dir, stack_name).values():
+        templates[nested_stack["layer"]] = nested_stack["template"]
+    return templates
+
+
+def template_hashes(templates):
+    """Hash every template so layers whose template did not change can be told apart"""
+    hashes = {}
+    for layer, path in templates.items():
+        with open(path, "rb") as f:
+            hashes[layer] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def synth(cdk_out_dir=CDK_OUT_DIR):
+    """Synthesize the app in a fresh process and return the elapsed seconds"""
+    for path in glob.glob(os.path.join(cdk_out_dir, "*.template.json")):
+        os.remove(path)
+
+    # Pass the cdk.json context the way the CDK CLI does, with the path metadata the layer names come from
+    with open("cdk.json") as f:
+        context = json.load(f).get("context", {})
+    context["aws:cdk:enable-path-metadata"] = True
+    context["aws:cdk:enable-asset-metadata"] = True
+
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "app.py"],
+        env={**os.environ, "CDK_OUTDIR": cdk_out_dir, "CDK_CONTEXT_JSON": json.dumps(context)},
+        check=True,
+        stdout=subprocess.DEVNULL
+    )
+    return time.perf_counter() - started
+
+
+def deploy(stack_name=STACK_NAME, cdk_out_dir=CDK_OUT_DIR):
+    """Deploy the already synthesized assembly and return the elapsed seconds"""
+    started = time.perf_counter()
+    subprocess.run(
+        ["cdk", "deploy", stack_name, "--app", cdk_out_dir, "--require-approval", "never"],
+        check=True
+    )
+    return time.perf_counter() - started
+
+
+def layer_deploy_durations(since, stack_name=STACK_NAME, cdk_out_dir=CDK_OUT_DIR):
+    """Read how long each nested stack took from the parent stack events, unchanged layers are absent"""
+    import boto3
+
+    layers = {
+        logical_id: nested_stack["layer"] for logical_id, nested_stack in nested_stacks(cdk_out_dir, stack_name).items()
+    }
+    started, finished = {}, {}
+
+    paginator = boto3.client("cloudformation").get_paginator("describe_stack_events")
+    for page in paginator.paginate(StackName=stack_name):
+        for stack_event in page["StackEvents"]:
+            if stack_event["Timestamp"] < since:
+                break
+            layer = layers.get(stack_event["LogicalResourceId"])
+            if not layer:
+                continue
+            status = stack_event["ResourceStatus"]
+            # Events are listed newest first, so keep the earliest start and the latest completion
+            if status.endswith(IN_PROGRESS_SUFFIX):
+                started[layer] = stack_event["Timestamp"]
+            elif status.endswith(COMPLETE_SUFFIX) and layer not in finished:
+                finished[layer] = stack_event["Timestamp"]
+        else:
+            continue
+        break
+
+    return {
+        layer: round((finished[layer] - started[layer]).total_seconds(), 1)
+        for layer in started if layer in finished
+    }
+
+
+def load_history(path=HISTORY_PATH):
+    """Measurements of earlier runs, oldest first"""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time synth and deploy and report which stack layers changed")
+    parser.add_argument("--deploy", action="store_true", help="also deploy and time every nested stack")
+    parser.add_argument("--label", default="", help="description of the change being measured")
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON file the measurements are appended to")
+    args = parser.parse_args(argv)
+
+    history = load_history(args.history)
+    previous_hashes = history[-1]["template_hashes"] if history else {}
+
+    synth_seconds = synth()
+    hashes = template_hashes(layer_templates())
+    changed_layers = sorted(layer for layer, digest in hashes.items() if previous_hashes.get(layer) != digest)
+
+    print(f"Synth: {synth_seconds:.1f} s")
+    for layer in hashes:
+        print(f"  {layer}: {'changed' if layer in changed_layers else 'unchanged'}")
+
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "label": args.label,
+        "synth_seconds": round(synth_seconds, 1),
+        "template_hashes": hashes,
+        "changed_layers": changed_layers
+    }
+
+    if args.deploy:
+        deploy_started = datetime.now(timezone.utc)
+        run["deploy_seconds"] = round(deploy(), 1)
+        run["layer_deploy_seconds"] = layer_deploy_durations(deploy_started)
+
+        print(f"Deploy: {run['deploy_seconds']:.1f} s")
+        for nested_stack in nested_stacks().values():
+            layer = nested_stack["layer"]
+            seconds = run["layer_deploy_seconds"].get(layer)
+            print(f"  {layer}: {f'{seconds:.1f} s' if seconds is not None else 'skipped'}")
+
+    os.makedirs(os.path.dirname(args.history), exist_ok=True)
+    with open(args.history, "w") as f:
+        json.dump(history + [run], f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import argparse
+import json
+import os
+import sys
+
+from business_agent.deploy_benchmark import (
+    CDK_OUT_DIR, COMPLETE_SUFFIX, IN_PROGRESS_SUFFIX, STACK_NAME, nested_stacks, synth
+)
+
+DURATIONS_PATH = "./.build/deploy_durations.json"
+
+# A fresh deploy of the whole app is expected to finish within this estimate
+DEPLOY_BUDGET_SECONDS = 45 * 60
+
+# Seconds CloudFormation takes to create a resource of each type when no deploy has been measured yet
+DEFAULT_DURATIONS = {
+    "AWS::CloudFormation::Stack": 20,
+    "AWS::IAM::Role": 15,
+    "AWS::IAM::Policy": 15,
+    "AWS::Lambda::Function": 10,
+    "AWS::Lambda::LayerVersion": 10,
+    "AWS::Lambda::Url": 3,
+    "AWS::Logs::LogGroup": 2,
+    "AWS::StepFunctions::StateMachine": 5,
+    "AWS::S3::Bucket": 5,
+    "AWS::S3::BucketPolicy": 3,
+    "AWS::SecretsManager::Secret": 3,
+    "AWS::Glue::Database": 2,
+    "AWS::Glue::Table": 2,
+    "AWS::Glue::Partition": 2,
+    "AWS::OpenSearchServerless::SecurityPolicy": 3,
+    "AWS::OpenSearchServerless::AccessPolicy": 3,
+    "AWS::OpenSearchServerless::Collection": 420,
+    "AWS::RedshiftServerless::Namespace": 120,
+    "AWS::RedshiftServerless::Workgroup": 240,
+    "AWS::Bedrock::KnowledgeBase": 30,
+    "AWS::Bedrock::DataSource": 5,
+    "Custom::AWS": 10,
+    "Custom::S3AutoDeleteObjects": 5,
+    "Custom::CDKBucketDeployment": 60,
+    "AWS::CloudFormation::CustomResource": 30
+}
+UNKNOWN_TYPE_DURATION = 10
+
+# Custom resources that wait on the services they drive, by construct path below the app's stack
+DEFAULT_PATH_DURATIONS = {
+    "VectorSearch/IndexInit": 180,
+    "DocumentKnowledgeBase/KBSync/KBSyncTask": 1200,
+    "SqlKnowledgeBase/KBSync/KBSyncTask": 120,
+    "SqlKnowledgeBase/RedshiftBootstrap": 300,
+    "SqlKnowledgeBase/RedshiftAuthorizer": 30
+}
+
+
+def load_templates(cdk_out_dir=CDK_OUT_DIR, stack_name=STACK_NAME):
+    """Resources of the parent template and of every nested stack template, by layer"""
+    with open(os.path.join(cdk_out_dir, f"{stack_name}.template.json")) as f:
+        templates = {stack_name: json.load(f)["Resources"]}
+    for nested_stack in nested_stacks(cdk_out_dir, stack_name).values():
+        with open(nested_stack["template"]) as f:
+            templates[nested_stack["layer"]] = json.load(f)["Resources"]
+    return templates
+
+
+def references(value, resources):
+    """Logical IDs of the resources a property value refers to with Ref, Fn::GetAtt or Fn::Sub"""
+    found = set()
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "Ref" and item in resources:
+                found.add(item)
+            elif key == "Fn::GetAtt":
+                name = item[0] if isinstance(item, list) else item.split(".")[0]
+                if name in resources:
+                    found.add(name)
+            elif key == "Fn::Sub":
+                text = item[0] if isinstance(item, list) else item
+                for name in resources:
+                    if f"${{{name}}}" in text or f"${{{name}." in text:
+                        found.add(name)
+            found |= references(item, resources)
+    elif isinstance(value, list):
+        for item in value:
+            found |= references(item, resources)
+    return found
+
+
+def dependency_graph(resources):
+    """Explicit DependsOn and implicit reference dependencies of every resource of one template"""
+    graph = {}
+    for logical_id, resource in resources.items():
+        depends_on = resource.get("DependsOn", [])
+        explicit = {depends_on} if isinstance(depends_on, str) else set(depends_on)
+        implicit = references({key: value for key, value in resource.items() if key != "DependsOn"}, resources)
+        graph[logical_id] = {"explicit": explicit, "implicit": implicit - {logical_id}}
+    return graph
+
+
+def resource_path(resource):
+    """Construct path of a resource without the app's stack name and the trailing Default or Resource"""
+    path = resource.get("Metadata", {}).get("aws:cdk:path", "")
+    parts = [part.split(".")[0] for part in path.split("/")[1:]]
+    return "/".join(part for part in parts if part not in ("Default", "Resource"))
+
+
+def default_duration(resource):
+    path = resource_path(resource)
+    if path in DEFAULT_PATH_DURATIONS:
+        return DEFAULT_PATH_DURATIONS[path]
+    return DEFAULT_DURATIONS.get(resource["Type"], UNKNOWN_TYPE_DURATION)
+
+
+def critical_path(cdk_out_dir=CDK_OUT_DIR, stack_name=STACK_NAME, durations=None):
+    """Estimated fresh deploy time and the chain of resources that sets it
+
+    CloudFormation creates every resource as soon as all its dependencies exist, so the deploy takes as
+    long as the slowest dependency chain. A nested stack takes its own critical path on top of the
+    overhead of the stack resource itself. Measured durations, keyed by layer/logical ID, win over the
+    defaults.
+    """
+    durations = durations or {}
+    templates = load_templates(cdk_out_dir, stack_name)
+    layers = {logical_id: nested_stack["layer"]
+              for logical_id, nested_stack in nested_stacks(cdk_out_dir, stack_name).items()}
+
+    def longest_chain(layer):
+        resources = templates[layer]
+        graph = dependency_graph(resources)
+        finish, chains = {}, {}
+
+        def visit(logical_id):
+            if logical_id in finish:
+                return finish[logical_id]
+            resource = resources[logical_id]
+            dependencies = graph[logical_id]["explicit"] | graph[logical_id]["implicit"]
+            start, chain = 0, []
+            for dependency in dependencies:
+                if visit(dependency) > start:
+                    start, chain = finish[dependency], chains[dependency]
+
+            key = f"{layer}/{logical_id}"
+            if logical_id in layers:
+                nested_seconds, nested_chain = longest_chain(layers[logical_id])
+                seconds = durations.get(key, DEFAULT_DURATIONS["AWS::CloudFormation::Stack"] + nested_seconds)
+                own = [(key, seconds - nested_seconds)] + nested_chain
+            else:
+                seconds = durations.get(key, default_duration(resource))
+                own = [(key, seconds)]
+            finish[logical_id] = start + seconds
+            chains[logical_id] = chain + own
+            return finish[logical_id]
+
+        for logical_id in resources:
+            visit(logical_id)
+        last = max(finish, key=finish.get)
+        return finish[last], chains[last]
+
+    seconds, chain = longest_chain(stack_name)
+    return {"seconds": seconds, "path": [{"resource": key, "seconds": step} for key, step in chain]}
+
+
+def redundant_dependencies(cdk_out_dir=CDK_OUT_DIR, stack_name=STACK_NAME):
+    """Explicit dependencies that add no ordering guarantee
+
+    A DependsOn entry is redundant when the resource already refers to its target, or when the target
+    is reached through the other dependencies anyway. These usually come from node.add_dependency on a
+    whole construct, which depends on every resource inside it.
+    """
+    redundant = []
+    for layer, resources in load_templates(cdk_out_dir, stack_name).items():
+        graph = dependency_graph(resources)
+        for logical_id, edges in graph.items():
+            for target in sorted(edges["explicit"]):
+                if target in edges["implicit"]:
+                    redundant.append({"layer": layer, "resource": logical_id, "depends_on": target,
+                                      "reason": "already referenced"})
+                    continue
+
+                # Search from the other direct dependencies for the target
+                stack = [dependency for dependency in edges["explicit"] | edges["implicit"] if dependency != target]
+                seen = set(stack)
+                while stack:
+                    current = stack.pop()
+                    if current == target:
+                        redundant.append({"layer": layer, "resource": logical_id, "depends_on": target,
+                                          "reason": "implied by its other dependencies"})
+                        break
+                    for dependency in graph[current]["explicit"] | graph[current]["implicit"]:
+                        if dependency not in seen:
+                            seen.add(dependency)
+                            stack.append(dependency)
+    return redundant
+
+
+def resource_durations(stack_name=STACK_NAME):
+    """Seconds every resource took in the latest deploy, from the events of the stack and its nested stacks"""
+    import boto3
+
+    cloudformation = boto3.client("cloudformation")
+    stacks = {stack_name: stack_name}
+    for resource in cloudformation.describe_stack_resources(StackName=stack_name)["StackResources"]:
+        if resource["ResourceType"] == "AWS::CloudFormation::Stack" and resource.get("PhysicalResourceId"):
+            stacks[resource["LogicalResourceId"]] = resource["PhysicalResourceId"]
+
+    layers = {logical_id: nested_stack["layer"] for logical_id, nested_stack in nested_stacks().items()}
+    durations = {}
+    for logical_id, physical_id in stacks.items():
+        layer = stack_name if logical_id == stack_name else layers.get(logical_id, logical_id)
+        started, finished = {}, {}
+        paginator = cloudformation.get_paginator("describe_stack_events")
+        for page in paginator.paginate(StackName=physical_id):
+            for stack_event in page["StackEvents"]:
+                # Events of the stack itself
+                if stack_event.get("PhysicalResourceId") == stack_event["StackId"]:
+                    continue
+                resource_id = stack_event["LogicalResourceId"]
+                status = stack_event["ResourceStatus"]
+                # Events are listed newest first, keep the latest completion and the start right before it
+                if status.endswith(COMPLETE_SUFFIX) and resource_id not in finished:
+                    finished[resource_id] = stack_event["Timestamp"]
+                elif status.endswith(IN_PROGRESS_SUFFIX) and resource_id in finished and resource_id not in started:
+                    started[resource_id] = stack_event["Timestamp"]
+
+        for resource_id in started:
+            durations[f"{layer}/{resource_id}"] = round((finished[resource_id] - started[resource_id]).total_seconds(), 1)
+    return durations
+
+
+def load_durations(path=DURATIONS_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate the critical path of a fresh deploy of the stack")
+    parser.add_argument("--events", action="store_true",
+                        help="read resource durations from the events of the deployed stack and save them")
+    parser.add_argument("--defaults", action="store_true", help="ignore saved durations, use the defaults")
+    parser.add_argument("--durations", default=DURATIONS_PATH, help="JSON file of measured resource durations")
+    parser.add_argument("--budget", type=float, default=DEPLOY_BUDGET_SECONDS,
+                        help="fail when the estimate exceeds this many seconds")
+    parser.add_argument("--all", action="store_true",
+                        help="also list the dependencies that repeat a reference, mostly added by CDK itself")
+    parser.add_argument("--no-synth", action="store_true", help="use the templates already in cdk.out")
+    args = parser.parse_args(argv)
+
+    if not args.no_synth:
+        synth()
+
+    if args.events:
+        durations = resource_durations()
+        os.makedirs(os.path.dirname(args.durations), exist_ok=True)
+        with open(args.durations, "w") as f:
+            json.dump(durations, f, indent=2)
+    else:
+        durations = {} if args.defaults else load_durations(args.durations)
+
+    result = critical_path(durations=durations)
+    print(f"Critical path: {result['seconds'] / 60:.1f} min, budget {args.budget / 60:.1f} min")
+    for step in result["path"]:
+        print(f"  {step['seconds']:7.1f} s  {step['resource']}")
+
+    redundant = redundant_dependencies()
+    implied = [dependency for dependency in redundant if dependency["reason"] != "already referenced"]
+    print(f"{len(redundant)} dependencies add no ordering guarantee, {len(redundant) - len(implied)} of them "
+          f"repeat a reference" + ("" if args.all else ", list them with --all"))
+    for dependency in redundant if args.all else implied:
+        print(f"  {dependency['layer']}/{dependency['resource']} -> {dependency['depends_on']}: "
+              f"{dependency['reason']}")
+
+    return 0 if result["seconds"] <= args.budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
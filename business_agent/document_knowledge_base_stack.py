@@ -0,0 +1,346 @@
+from aws_cdk import (
+    NestedStack,
+    aws_s3 as s3,
+    aws_s3_deployment as s3_deployment,
+    aws_bedrock as bedrock,
+    aws_opensearchserverless as opensearchserverless,
+    aws_iam as iam,
+    RemovalPolicy,
+    CfnDeletionPolicy
+)
+from constructs import Construct
+from business_agent.bootstrap_stack import BootstrapStack
+from business_agent.documents import INTERNAL_REPORTS_DIR, RESEARCH_REPORTS_DIR, document_manifest
+from business_agent.index_profiles import embedding_model_configuration
+from business_agent.knowledge_base_sync import KnowledgeBaseSync
+from business_agent.preparse import MULTIMODAL_PREFIX, PARSED_PREFIX, preparse_reports
+from business_agent.vector_search_stack import VectorSearchStack
+import json
+import os
+
+# AOSS policy names are limited to 32 characters and must stay stable across deployments
+BEDROCK_DATA_ACCESS_POLICY_NAME = "business-agent-bedrock-access"
+
+PARSING_MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+
+
+def vector_ingestion_configuration(parsing_configuration=None):
+    """Hierarchical chunking shared by every report data source, with an optional parser"""
+    return bedrock.CfnDataSource.VectorIngestionConfigurationProperty(
+        chunking_configuration=bedrock.CfnDataSource.ChunkingConfigurationProperty(
+            chunking_strategy='HIERARCHICAL',
+            hierarchical_chunking_configuration=bedrock.CfnDataSource.HierarchicalChunkingConfigurationProperty(
+                level_configurations=[
+                    bedrock.CfnDataSource.HierarchicalChunkingLevelConfigurationProperty(
+                        max_tokens=1000
+                    ),
+                    bedrock.CfnDataSource.HierarchicalChunkingLevelConfigurationProperty(
+                        max_tokens=200
+                    )
+                ],
+                overlap_tokens=60
+            )
+        ),
+        parsing_configuration=parsing_configuration
+    )
+
+
+def multimodal_parsing_configuration(region):
+    """Foundation model parsing for the pages the local pre-parser left to it"""
+    return bedrock.CfnDataSource.ParsingConfigurationProperty(
+        parsing_strategy='BEDROCK_FOUNDATION_MODEL',
+        bedrock_foundation_model_configuration=bedrock.CfnDataSource.BedrockFoundationModelConfigurationProperty(
+            model_arn=f"arn:aws:bedrock:{region}::foundation-model/{PARSING_MODEL_ID}",
+            parsing_modality="MULTIMODAL"
+        )
+    )
+
+
+class DocumentKnowledgeBaseStack(NestedStack):
+    """Report buckets and the vector knowledge bases that index them into the vector search collection"""
+
+    def __init__(self, scope: Construct, construct_id: str, *, vector_search: VectorSearchStack,
+                 bootstrap: BootstrapStack, **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        collection = vector_search.collection
+        collection_name = vector_search.collection_name
+
+        # Create an S3 bucket for supplemental data
+        supplemental_data_bucket = s3.Bucket(
+            self,
+            "SupplementalDataBucket",
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True
+        )
+
+        # Create an S3 bucket for storing internal reports
+        internal_reports_bucket = s3.Bucket(
+            self,
+            "InternalReportsBucket",
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True
+        )
+
+        # Create an S3 bucket for storing research reports
+        research_reports_bucket = s3.Bucket(
+            self,
+            "ResearchReportsBucket",
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True
+        )
+
+        # Extract text and tables locally, only image heavy pages are left to foundation model parsing
+        internal_reports_dir = preparse_reports(INTERNAL_REPORTS_DIR, "internal_reports")
+        research_reports_dir = preparse_reports(RESEARCH_REPORTS_DIR, "research_reports")
+
+        # Upload the pre-parsed internal reports to the S3 bucket
+        internal_reports_deployment = s3_deployment.BucketDeployment(
+            self,
+            "InternalReportsDeployment",
+            destination_bucket=internal_reports_bucket,
+            sources=[s3_deployment.Source.asset(internal_reports_dir)]
+        )
+
+        # Upload the pre-parsed research reports to the S3 bucket
+        research_reports_deployment = s3_deployment.BucketDeployment(
+            self,
+            "ResearchReportsDeployment",
+            destination_bucket=research_reports_bucket,
+            sources=[s3_deployment.Source.asset(research_reports_dir)],
+            memory_limit=1024
+        )
+
+        # Create IAM role for Bedrock Knowledge Base
+        knowledge_base_role = iam.Role(
+            self, 'KnowledgeBaseRole',
+            assumed_by=iam.ServicePrincipal('bedrock.amazonaws.com'),
+        )
+
+        # # Add S3 permissions to the role
+        knowledge_base_role.add_to_policy(iam.PolicyStatement(
+            actions=[
+                's3:GetObject',
+                's3:ListBucket',
+                's3:PutObject',
+                's3:DeleteObject'
+            ],
+            resources=[
+                internal_reports_bucket.bucket_arn,
+                f'{internal_reports_bucket.bucket_arn}/*',
+                research_reports_bucket.bucket_arn,
+                f'{research_reports_bucket.bucket_arn}/*',
+                supplemental_data_bucket.bucket_arn,
+                f'{supplemental_data_bucket.bucket_arn}/*'
+            ],
+        ))
+
+        internal_reports_bucket.grant_read(knowledge_base_role)
+        research_reports_bucket.grant_read(knowledge_base_role)
+        supplemental_data_bucket.grant_read_write(knowledge_base_role)
+
+        # Add OpenSearch permissions to the role
+        knowledge_base_role.add_to_policy(iam.PolicyStatement(
+            actions=[
+                'aoss:APIAccessAll'
+            ],
+            resources=[collection.attr_arn],
+        ))
+
+        # Add Bedrock permissions to the role for embedding and parsing
+        knowledge_base_role.add_to_policy(iam.PolicyStatement(
+            actions=[
+                'bedrock:*'
+            ],
+            resources=['*'],
+        ))
+
+        # # Create Data Access Policy for Bedrock Knowledge Base
+        bedrock_data_access_policy = opensearchserverless.CfnAccessPolicy(
+            self, 'BedrockDataAccessPolicy',
+            name=BEDROCK_DATA_ACCESS_POLICY_NAME,
+            type='data',
+            description='Data access policy for development',
+            policy=json.dumps([
+                {
+                    'Rules': [
+                        {
+                            'ResourceType': 'collection',
+                            'Resource': [f'collection/{collection_name}'],
+                            'Permission': [
+                                'aoss:CreateCollectionItems',
+                                'aoss:DeleteCollectionItems',
+                                'aoss:UpdateCollectionItems',
+                                'aoss:DescribeCollectionItems',
+                                'aoss:*'
+                            ]
+                        },
+                        {
+                            'ResourceType': 'index',
+                            'Resource': [f"index/{collection_name}/*"],
+                            'Permission': [
+                                'aoss:CreateIndex',
+                                'aoss:DeleteIndex',
+                                'aoss:UpdateIndex',
+                                'aoss:DescribeIndex',
+                                'aoss:ReadDocument',
+                                'aoss:WriteDocument',
+                                'aoss:*'
+                            ]
+                        }
+                    ],
+                    'Principal': [
+                        knowledge_base_role.role_arn,
+                        f'arn:aws:iam::{self.account}:root'
+                    ],
+                    'Description': 'Combined access policy for both collection and index operations'
+                }
+            ])
+        )
+
+        bedrock_data_access_policy.cfn_options.deletion_policy = CfnDeletionPolicy.DELETE
+
+        internal_reports_kb_name = 'internal-reports-knowledge-base'
+        self.internal_reports_kb = bedrock.CfnKnowledgeBase(
+            self, 'InternalReportsKb',
+            name=internal_reports_kb_name,
+            role_arn=knowledge_base_role.role_arn,
+            knowledge_base_configuration=bedrock.CfnKnowledgeBase.KnowledgeBaseConfigurationProperty(
+                type='VECTOR',
+                vector_knowledge_base_configuration=bedrock.CfnKnowledgeBase.VectorKnowledgeBaseConfigurationProperty(
+                    embedding_model_arn=f'arn:aws:bedrock:{self.region}::foundation-model/amazon.titan-embed-text-v2:0',
+                    embedding_model_configuration=bedrock.CfnKnowledgeBase.EmbeddingModelConfigurationProperty(
+                        bedrock_embedding_model_configuration=bedrock.CfnKnowledgeBase.BedrockEmbeddingModelConfigurationProperty(
+                            **embedding_model_configuration(vector_search.internal_reports_profile)
+                        )
+                    ),
+                    supplemental_data_storage_configuration=bedrock.CfnKnowledgeBase.SupplementalDataStorageConfigurationProperty(
+                        supplemental_data_storage_locations=[
+                            bedrock.CfnKnowledgeBase.SupplementalDataStorageLocationProperty(
+                                supplemental_data_storage_location_type="S3",
+                                s3_location=bedrock.CfnKnowledgeBase.S3LocationProperty(
+                                    uri=f"s3://{supplemental_data_bucket.bucket_name}"
+                                )
+                            )]
+                    )
+                )
+            ),
+            storage_configuration=bedrock.CfnKnowledgeBase.StorageConfigurationProperty(
+                type='OPENSEARCH_SERVERLESS',
+                opensearch_serverless_configuration=bedrock.CfnKnowledgeBase.OpenSearchServerlessConfigurationProperty(
+                    collection_arn=collection.attr_arn,
+                    field_mapping=bedrock.CfnKnowledgeBase.OpenSearchServerlessFieldMappingProperty(
+                        metadata_field='metadata',
+                        text_field='content',
+                        vector_field='content_embedding',
+                    ),
+                    vector_index_name=vector_search.internal_reports_index,
+                ),
+            ),
+        )
+
+        self.internal_reports_kb.node.add_dependency(knowledge_base_role)
+        self.internal_reports_kb.node.add_dependency(bedrock_data_access_policy)
+
+        internal_reports_sources = self.add_report_data_sources(
+            'BedrockDataSource', 'internal-reports', 'internal reports',
+            self.internal_reports_kb, internal_reports_bucket, internal_reports_deployment, internal_reports_dir
+        )
+
+        research_reports_kb_name = 'research-reports-knowledge-base'
+        self.research_reports_kb = bedrock.CfnKnowledgeBase(
+            self, 'ResearchReportsKb',
+            name=research_reports_kb_name,
+            role_arn=knowledge_base_role.role_arn,
+            knowledge_base_configuration=bedrock.CfnKnowledgeBase.KnowledgeBaseConfigurationProperty(
+                type='VECTOR',
+                vector_knowledge_base_configuration=bedrock.CfnKnowledgeBase.VectorKnowledgeBaseConfigurationProperty(
+                    embedding_model_arn=f'arn:aws:bedrock:{self.region}::foundation-model/amazon.titan-embed-text-v2:0',
+                    embedding_model_configuration=bedrock.CfnKnowledgeBase.EmbeddingModelConfigurationProperty(
+                        bedrock_embedding_model_configuration=bedrock.CfnKnowledgeBase.BedrockEmbeddingModelConfigurationProperty(
+                            **embedding_model_configuration(vector_search.research_reports_profile)
+                        )
+                    ),
+                    supplemental_data_storage_configuration=bedrock.CfnKnowledgeBase.SupplementalDataStorageConfigurationProperty(
+                        supplemental_data_storage_locations=[
+                            bedrock.CfnKnowledgeBase.SupplementalDataStorageLocationProperty(
+                                supplemental_data_storage_location_type="S3",
+                                s3_location=bedrock.CfnKnowledgeBase.S3LocationProperty(
+                                    uri=f"s3://{supplemental_data_bucket.bucket_name}"
+                                )
+                            )]
+                    )
+                )
+            ),
+            storage_configuration=bedrock.CfnKnowledgeBase.StorageConfigurationProperty(
+                type='OPENSEARCH_SERVERLESS',
+                opensearch_serverless_configuration=bedrock.CfnKnowledgeBase.OpenSearchServerlessConfigurationProperty(
+                    collection_arn=collection.attr_arn,
+                    field_mapping=bedrock.CfnKnowledgeBase.OpenSearchServerlessFieldMappingProperty(
+                        metadata_field='metadata',
+                        text_field='content',
+                        vector_field='content_embedding',
+                    ),
+                    vector_index_name=vector_search.research_reports_index,
+                ),
+            ),
+        )
+
+        self.research_reports_kb.node.add_dependency(knowledge_base_role)
+        self.research_reports_kb.node.add_dependency(bedrock_data_access_policy)
+
+        research_reports_sources = self.add_report_data_sources(
+            'ResearchReportsDataSource', 'research-reports', 'research reports',
+            self.research_reports_kb, research_reports_bucket, research_reports_deployment, research_reports_dir
+        )
+
+        # Sync both document knowledge bases together, only re-ingesting documents whose content changed
+        KnowledgeBaseSync(
+            self, 'KBSync',
+            bootstrap=bootstrap,
+            sources=internal_reports_sources + research_reports_sources
+        )
+
+    def add_report_data_sources(self, construct_id, name, description, knowledge_base, bucket, deployment, reports_dir):
+        """Create the data sources of a report knowledge base over the pre-parsed output
+
+        Locally extracted Markdown under parsed/ uses the default parser. Pages under multimodal/ use
+        foundation model parsing, that data source only exists when the pre-parser produced such pages.
+        Returns the sync sources with the document manifest of each data source.
+        """
+        prefixes = [(PARSED_PREFIX, construct_id, f"{name}-parsed", None)]
+        if os.path.isdir(os.path.join(reports_dir, MULTIMODAL_PREFIX)):
+            prefixes.append((
+                MULTIMODAL_PREFIX, f"{construct_id}Multimodal", f"{name}-multimodal",
+                multimodal_parsing_configuration(self.region)
+            ))
+
+        sources = []
+        for prefix, data_source_id, data_source_name, parsing_configuration in prefixes:
+            data_source = bedrock.CfnDataSource(
+                self, data_source_id,
+                data_source_configuration=bedrock.CfnDataSource.DataSourceConfigurationProperty(
+                    s3_configuration=bedrock.CfnDataSource.S3DataSourceConfigurationProperty(
+                        bucket_arn=bucket.bucket_arn,
+                        inclusion_prefixes=[f"{prefix}/"]
+                    ),
+                    type='S3'
+                ),
+                knowledge_base_id=knowledge_base.attr_knowledge_base_id,
+                name=f'{data_source_name}-datasource',
+                description=f'Data source for {description} ({prefix})',
+                data_deletion_policy='RETAIN',
+                vector_ingestion_configuration=vector_ingestion_configuration(parsing_configuration)
+            )
+
+            data_source.node.add_dependency(knowledge_base)
+
+            # The deployed bucket makes only the sync wait for the upload, the data source is created alongside it
+            sources.append({
+                "knowledge_base": knowledge_base,
+                "data_source": data_source,
+                "bucket": deployment.deployed_bucket,
+                "manifest": document_manifest(os.path.join(reports_dir, prefix), f"{prefix}/")
+            })
+
+        return sources
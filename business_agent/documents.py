@@ -0,0 +1,42 @@
+import hashlib
+import os
+
+INTERNAL_REPORTS_DIR = "./data/internal_reports"
+RESEARCH_REPORTS_DIR = "./data/research_reports"
+PARSED_REPORTS_DIR = "./.build/reports"
+
+# Sidecar of every pre-parsed document with its metadata attributes
+METADATA_SUFFIX = ".metadata.json"
+
+# Metadata attributes of the report sidecars and the OpenSearch type each is indexed with, so knowledge base
+# retrieval can pre-filter on them. Bedrock stores every metadata attribute as a top level document field.
+REPORT_METADATA_FIELDS = {
+    "document_title": "keyword",
+    "source_kb": "keyword",
+    "report_type": "keyword",
+    "year": "integer",
+    "pages": "keyword",
+    "source_document": "keyword",
+    "parser": "keyword",
+    "content_hash": "keyword"
+}
+
+
+def file_hash(path):
+    """SHA-256 of a file, read in chunks so large PDFs are not loaded at once"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def document_manifest(source_dir, key_prefix=""):
+    """Map the S3 key of every document under source_dir to its content hash"""
+    manifest = {}
+    for root, _, file_names in os.walk(source_dir):
+        for file_name in file_names:
+            path = os.path.join(root, file_name)
+            key = key_prefix + os.path.relpath(path, source_dir).replace(os.sep, "/")
+            manifest[key] = file_hash(path)
+    return dict(sorted(manifest.items()))
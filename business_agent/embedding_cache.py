@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+EMBEDDING_CACHE_DIR = "./.build/embedding_cache"
+
+EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v2:0"
+EMBEDDING_DIMENSIONS = 1024
+
+KEY_BYTES = hashlib.sha256().digest_size
+VECTOR_DTYPE = np.float32
+
+
+def cache_key(text, model_id, dimensions, normalize=True):
+    """Content address of one embedding, the same text embedded differently gets a different key"""
+    digest = hashlib.sha256(f"{model_id}\0{dimensions}\0{int(normalize)}\0".encode())
+    digest.update(text.encode())
+    return digest.digest()
+
+
+class EmbeddingCache:
+    """Append-only store of embedding vectors keyed by content hash
+
+    Keys are raw SHA-256 digests in keys.bin and vectors are float32 rows in vectors.f32, both in the same
+    order. The vectors are memory-mapped on read, so a large cache costs no more memory than the rows used.
+    One directory holds a single model and dimension, since every row has the same width.
+    """
+
+    def __init__(self, model_id=EMBEDDING_MODEL_ID, dimensions=EMBEDDING_DIMENSIONS, cache_dir=EMBEDDING_CACHE_DIR):
+        self.model_id = model_id
+        self.dimensions = dimensions
+        self.directory = os.path.join(cache_dir, f"{re.sub(r'[^0-9A-Za-z.-]+', '_', model_id)}-{dimensions}")
+        self.keys_path = os.path.join(self.directory, "keys.bin")
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.lock = threading.Lock()
+        self.vectors = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.rows = {}
+        keys = b""
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "rb") as f:
+                keys = f.read()
+        count = min(len(keys) // KEY_BYTES, self.stored_vectors())
+        for row in range(count):
+            self.rows[keys[row * KEY_BYTES:(row + 1) * KEY_BYTES]] = row
+
+        # An interrupted run can leave a vector without its key or a partially written row, both files are cut
+        # back to the rows complete in both so new rows line up again
+        for path, row_bytes in ((self.keys_path, KEY_BYTES), (self.vectors_path, self.row_bytes())):
+            if os.path.exists(path) and os.path.getsize(path) != count * row_bytes:
+                os.truncate(path, count * row_bytes)
+
+    def row_bytes(self):
+        return self.dimensions * np.dtype(VECTOR_DTYPE).itemsize
+
+    def stored_vectors(self):
+        if not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // self.row_bytes()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def key(self, text):
+        return cache_key(text, self.model_id, self.dimensions)
+
+    def get(self, key):
+        """Return the cached vector for a key, or None"""
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        if self.vectors is None or row >= len(self.vectors):
+            self.vectors = np.memmap(self.vectors_path, dtype=VECTOR_DTYPE, mode="r").reshape(-1, self.dimensions)
+        return np.array(self.vectors[row])
+
+    def put(self, key, vector):
+        """Append a vector unless the key is already cached"""
+        vector = np.asarray(vector, dtype=VECTOR_DTYPE)
+        if vector.shape != (self.dimensions,):
+            raise ValueError(f"Expected a vector of {self.dimensions} dimensions, got {vector.shape}")
+
+        with self.lock:
+            if key in self.rows:
+                return
+            # The vector is written first, a key without its vector is never visible to readers. The row is
+            # where the vector actually landed, not the number of keys
+            with open(self.vectors_path, "ab") as f:
+                row = f.tell() // self.row_bytes()
+                f.write(vector.tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.write(key)
+            self.rows[key] = row
+
+
+class EmbeddingClient:
+    """Titan text embeddings that consult the embedding cache before calling Bedrock"""
+
+    def __init__(self, cache=None, bedrock_runtime=None, max_workers=8):
+        self.cache = cache or EmbeddingCache()
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+        self.stats_lock = threading.Lock()
+
+        if bedrock_runtime is None:
+            import boto3
+            bedrock_runtime = boto3.client("bedrock-runtime")
+        self.bedrock_runtime = bedrock_runtime
+
+    def invoke(self, text):
+        response = self.bedrock_runtime.invoke_model(
+            modelId=self.cache.model_id,
+            body=json.dumps({"inputText": text, "dimensions": self.cache.dimensions, "normalize": True})
+        )
+        return json.loads(response["body"].read())["embedding"]
+
+    def embed(self, text):
+        """Embed one text, from the cache when it was embedded before"""
+        key = self.cache.key(text)
+        vector = self.cache.get(key)
+        with self.stats_lock:
+            if vector is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if vector is not None:
+            return vector
+
+        vector = np.asarray(self.invoke(text), dtype=VECTOR_DTYPE)
+        self.cache.put(key, vector)
+        return vector
+
+    def embed_many(self, texts):
+        """Embed several texts, calling the model concurrently for the ones not cached yet"""
+        if not texts:
+            return np.empty((0, self.cache.dimensions), dtype=VECTOR_DTYPE)
+
+        # Repeated texts within one batch are embedded once
+        unique_texts = list(dict.fromkeys(texts))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            vectors = dict(zip(unique_texts, executor.map(self.embed, unique_texts)))
+        return np.stack([vectors[text] for text in texts])
+
+    def stats(self):
+        """Hit and miss counts since the client was created"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "cached_vectors": len(self.cache)
+        }
@@ -0,0 +1,116 @@
+from aws_cdk import (
+    Stack,
+    aws_events as events,
+    aws_events_targets as targets,
+    aws_lambda as lambda_,
+    aws_iam as iam,
+    Duration
+)
+from constructs import Construct
+from business_agent.data_lake_stack import (
+    DataLakeStack, FINANCIAL_DATA_PREFIX, INCOMING_PREFIX, REJECTED_PREFIX
+)
+from business_agent.rollups import GLUE_DATABASE, ROLLUPS, ROLLUP_SCHEMA
+import json
+import os
+import shutil
+
+# AWS SDK for pandas layer, it brings pyarrow to read the CSV and write Parquet
+SDK_PANDAS_ACCOUNT = "336392948345"
+SDK_PANDAS_LAYER_VERSION = 15
+
+APPEND_SOURCE_DIR = "./lambda/financial_data_append"
+APPEND_BUILD_DIR = "./.build/financial_data_append"
+
+# Modules of the business_agent package the append handler imports, so it normalizes and types the monthly
+# files exactly like the data lake build
+SHARED_MODULES = ["__init__.py", "datalake.py"]
+
+
+def build_append_asset(output_dir=APPEND_BUILD_DIR):
+    """Append handler with the shared business_agent modules next to it"""
+    shutil.rmtree(output_dir, ignore_errors=True)
+    shutil.copytree(APPEND_SOURCE_DIR, output_dir, ignore=shutil.ignore_patterns("__pycache__"))
+
+    package_dir = os.path.join(output_dir, "business_agent")
+    os.makedirs(package_dir)
+    for module in SHARED_MODULES:
+        shutil.copy(os.path.join(os.path.dirname(__file__), module), package_dir)
+    return output_dir
+
+
+class FinancialDataAppend(Construct):
+    """Appends monthly CSVs dropped under incoming/<table>/ of the financial data bucket to the data lake
+
+    A file is validated against the catalog columns of its table and written as one new Parquet file per
+    year partition, new years are registered in the Glue catalog and the rollups built from the table are
+    refreshed. Files that do not fit are moved to rejected/ with the reason.
+    """
+
+    def __init__(self, scope: Construct, construct_id: str, *, data_lake: DataLakeStack, workgroup_name,
+                 database, secret) -> None:
+        super().__init__(scope, construct_id)
+
+        sdk_pandas_layer = lambda_.LayerVersion.from_layer_version_arn(
+            self, "SdkPandasLayer",
+            f"arn:aws:lambda:{Stack.of(self).region}:{SDK_PANDAS_ACCOUNT}:layer:AWSSDKPandas-Python312:"
+            f"{SDK_PANDAS_LAYER_VERSION}"
+        )
+
+        append_lambda = lambda_.Function(
+            self, "AppendFunction",
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            handler="index.handler",
+            code=lambda_.Code.from_asset(build_append_asset()),
+            environment={
+                "GLUE_DATABASE": GLUE_DATABASE,
+                "DATALAKE_PREFIX": FINANCIAL_DATA_PREFIX,
+                "INCOMING_PREFIX": INCOMING_PREFIX,
+                "REJECTED_PREFIX": REJECTED_PREFIX,
+                "APPEND_TABLES": ",".join(data_lake.monthly_tables),
+                "ROLLUP_VIEWS": json.dumps({
+                    table_name: [
+                        f"{ROLLUP_SCHEMA}.{rollup['name']}" for rollup in ROLLUPS
+                        if table_name in rollup["source_tables"]
+                    ] for table_name in data_lake.monthly_tables
+                }),
+                "WORKGROUP": workgroup_name,
+                "DATABASE": database,
+                "SECRET_ARN": secret.secret_arn
+            },
+            layers=[sdk_pandas_layer],
+            memory_size=1024,
+            timeout=Duration.minutes(5)
+        )
+
+        data_lake.financial_data_bucket.grant_read_write(append_lambda)
+        data_lake.financial_data_bucket.grant_delete(append_lambda, f"{INCOMING_PREFIX}*")
+        secret.grant_read(append_lambda)
+
+        append_lambda.add_to_role_policy(iam.PolicyStatement(
+            actions=["glue:GetTable", "glue:BatchCreatePartition"],
+            resources=["*"]
+        ))
+
+        append_lambda.add_to_role_policy(iam.PolicyStatement(
+            actions=[
+                "redshift-data:BatchExecuteStatement",
+                "redshift-data:DescribeStatement",
+                "redshift-serverless:GetCredentials"
+            ],
+            resources=["*"]
+        ))
+
+        # The bucket sends its events to EventBridge, so this layer subscribes without changing the data lake
+        events.Rule(
+            self, "IncomingRule",
+            event_pattern=events.EventPattern(
+                source=["aws.s3"],
+                detail_type=["Object Created"],
+                detail={
+                    "bucket": {"name": [data_lake.financial_data_bucket.bucket_name]},
+                    "object": {"key": [{"prefix": INCOMING_PREFIX}]}
+                }
+            ),
+            targets=[targets.LambdaFunction(append_lambda, retry_attempts=2)]
+        )
@@ -0,0 +1,251 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from business_agent.documents import INTERNAL_REPORTS_DIR, RESEARCH_REPORTS_DIR
+from business_agent.embedding_cache import EmbeddingCache, EmbeddingClient
+from business_agent.index_profiles import INDEX_PROFILES, estimated_memory_bytes
+from business_agent.preparse import PARSED_PREFIX, preparse_reports
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Passages approximate the 200 token child chunks of the knowledge bases
+PASSAGE_CHARS = 800
+QUERY_CHARS = 200
+
+DEFAULT_SAMPLE = 2000
+DEFAULT_QUERIES = 100
+DEFAULT_K = 10
+SEED = 0
+
+# Recall is measured against exact float32 search over the full 1024 dimensions
+REFERENCE_DIMENSIONS = 1024
+
+# Offline embeddings hash tokens into this many signed buckets before projecting them
+HASH_BUCKETS = 4096
+
+
+def split_passages(text):
+    """Split a Markdown document into passages of about PASSAGE_CHARS characters along paragraphs"""
+    passages, current = [], ""
+    for paragraph in re.split(r"\n{2,}", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) > PASSAGE_CHARS:
+            passages.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        passages.append(current)
+    return passages
+
+
+def load_passages(sample):
+    """Sample passages of the pre-parsed report corpus, the same Markdown the knowledge bases ingest"""
+    passages = []
+    for source_dir, output_name in [
+        (INTERNAL_REPORTS_DIR, "internal_reports"),
+        (RESEARCH_REPORTS_DIR, "research_reports")
+    ]:
+        parsed_dir = os.path.join(preparse_reports(source_dir, output_name), PARSED_PREFIX)
+        for file_name in sorted(os.listdir(parsed_dir)):
+            if file_name.endswith(".md"):
+                with open(os.path.join(parsed_dir, file_name)) as f:
+                    passages += split_passages(f.read())
+
+    random.Random(SEED).shuffle(passages)
+    return passages[:sample]
+
+
+def make_queries(passages, count):
+    """Questions stand in as the opening sentence of random passages"""
+    rng = random.Random(SEED + 1)
+    queries = []
+    for passage in rng.sample(passages, min(count, len(passages))):
+        text = re.sub(r"[#*|]", " ", passage)
+        queries.append(" ".join(text.split())[:QUERY_CHARS])
+    return queries
+
+
+def hashed_embeddings(texts, dimensions):
+    """Deterministic bag of words embeddings for running the benchmark without Bedrock access
+
+    Leading coordinates carry the most variance, so fewer dimensions lose detail as lower Titan outputs do.
+    """
+    counts = np.zeros((len(texts), HASH_BUCKETS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            bucket = hash_token(token)
+            counts[row, bucket % HASH_BUCKETS] += 1 if bucket & (1 << 31) else -1
+
+    projection = np.random.default_rng(SEED).standard_normal((HASH_BUCKETS, REFERENCE_DIMENSIONS))
+    projection *= np.linspace(1.0, 0.25, REFERENCE_DIMENSIONS)
+    vectors = (np.log1p(np.abs(counts)) * np.sign(counts)) @ projection[:, :dimensions].astype(np.float32)
+    return normalize(vectors)
+
+
+def hash_token(token):
+    # Python's own hash is salted per process
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "little")
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def embed(texts, dimensions, offline):
+    if offline:
+        return hashed_embeddings(texts, dimensions)
+    client = EmbeddingClient(EmbeddingCache(dimensions=dimensions))
+    vectors = client.embed_many(texts)
+    print(f"Embeddings at {dimensions} dimensions: {client.stats()}")
+    return vectors
+
+
+def exact_neighbors(corpus, queries, k):
+    """Ground truth neighbors by exact inner product, the vectors being normalized"""
+    return np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+
+
+def build_faiss_index(profile, corpus):
+    metric = faiss.METRIC_INNER_PRODUCT if profile["space_type"] == "innerproduct" else faiss.METRIC_L2
+    if profile["data_type"] == "binary":
+        index = faiss.IndexBinaryHNSW(profile["dimensions"], profile["m"])
+    elif profile["encoder"] == "fp16":
+        index = faiss.IndexHNSWSQ(profile["dimensions"], faiss.ScalarQuantizer.QT_fp16, profile["m"], metric)
+    else:
+        index = faiss.IndexHNSWFlat(profile["dimensions"], profile["m"], metric)
+
+    index.hnsw.efConstruction = profile["ef_construction"]
+    if profile["data_type"] == "binary":
+        index.add(np.packbits(corpus > 0, axis=1))
+    else:
+        index.train(corpus)
+        index.add(corpus)
+    index.hnsw.efSearch = profile["ef_search"]
+
+    serialize = faiss.serialize_index_binary if profile["data_type"] == "binary" else faiss.serialize_index
+    return index, serialize(index).nbytes
+
+
+def build_numpy_index(profile, corpus):
+    """Flat index over the quantized vectors, it shows quantization loss but not HNSW graph loss"""
+    if profile["data_type"] == "binary":
+        vectors = np.packbits(corpus > 0, axis=1)
+    elif profile["encoder"] == "fp16":
+        vectors = corpus.astype(np.float16)
+    else:
+        vectors = corpus
+    return vectors, vectors.nbytes
+
+
+def search(profile, index, query, k):
+    if faiss is not None:
+        if profile["data_type"] == "binary":
+            return index.search(np.packbits(query > 0, axis=1), k)[1][0]
+        return index.search(query, k)[1][0]
+
+    if profile["data_type"] == "binary":
+        bits = np.packbits(query > 0, axis=1)
+        distances = np.unpackbits(np.bitwise_xor(index, bits), axis=1).sum(axis=1)
+    elif profile["space_type"] == "innerproduct":
+        distances = -(index.astype(np.float32) @ query[0])
+    else:
+        distances = ((index.astype(np.float32) - query[0]) ** 2).sum(axis=1)
+    return np.argsort(distances, kind="stable")[:k]
+
+
+def benchmark_profile(profile, corpus, queries, truth, k):
+    """Build a profile's index over the corpus and measure recall@k, query latency and memory"""
+    started = time.perf_counter()
+    build = build_faiss_index if faiss is not None else build_numpy_index
+    index, index_bytes = build(profile, corpus)
+    build_seconds = time.perf_counter() - started
+
+    recalls, timings = [], []
+    for row in range(len(queries)):
+        query = queries[row:row + 1]
+        started = time.perf_counter()
+        neighbors = search(profile, index, query, k)
+        timings.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(set(neighbors) & set(truth[row])) / k)
+
+    return {
+        "engine": "faiss-hnsw" if faiss is not None else "numpy-flat",
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+        "build_seconds": round(build_seconds, 2),
+        "index_bytes": index_bytes,
+        "estimated_opensearch_bytes": estimated_memory_bytes(profile, len(corpus))
+    }
+
+
+def run_benchmark(sample, query_count, k, offline, profiles=None):
+    passages = load_passages(sample)
+    queries = make_queries(passages, query_count)
+    profiles = profiles or list(INDEX_PROFILES)
+    print(f"{len(passages)} passages, {len(queries)} queries, k={k}")
+
+    # Titan v2 produces each dimension natively, every dimension is embedded once
+    dimensions = sorted({REFERENCE_DIMENSIONS} | {INDEX_PROFILES[name]["dimensions"] for name in profiles})
+    embeddings = {
+        dimension: (embed(passages, dimension, offline), embed(queries, dimension, offline))
+        for dimension in dimensions
+    }
+    truth = exact_neighbors(*embeddings[REFERENCE_DIMENSIONS], k)
+
+    results = {}
+    for name in profiles:
+        profile = INDEX_PROFILES[name]
+        corpus, query_vectors = embeddings[profile["dimensions"]]
+        results[name] = {**profile, **benchmark_profile(profile, corpus, query_vectors, truth, k)}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the vector index profiles over a sample of the reports")
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE, help="passages to index")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="queries to run")
+    parser.add_argument("-k", type=int, default=DEFAULT_K, help="neighbors per query for recall@k")
+    parser.add_argument("--profile", action="append", choices=list(INDEX_PROFILES),
+                        help="profile to benchmark, all profiles by default")
+    parser.add_argument("--offline", action="store_true",
+                        help="use hashed bag of words embeddings instead of calling Titan")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if faiss is None:
+        print("faiss is not installed, measuring flat NumPy search over the quantized vectors")
+
+    results = run_benchmark(args.sample, args.queries, args.k, args.offline, args.profile)
+
+    print(f"{'profile':12} {'engine':11} {'dims':>5} {'type':7} {'recall@k':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'index KiB':>10} {'est. KiB':>9}")
+    for name, result in results.items():
+        data_type = "fp16" if result["encoder"] == "fp16" else result["data_type"]
+        print(f"{name:12} {result['engine']:11} {result['dimensions']:5d} {data_type:7} "
+              f"{result['recall_at_k']:8.3f} {result['p50_ms']:8.3f} {result['p95_ms']:8.3f} "
+              f"{result['index_bytes'] / 1024:10.1f} {result['estimated_opensearch_bytes'] / 1024:9.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
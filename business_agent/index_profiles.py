@@ -0,0 +1,157 @@
+import json
+
+from business_agent.documents import REPORT_METADATA_FIELDS
+
+# Named vector index profiles, each a Titan v2 output format together with the faiss HNSW index that stores it.
+# high_recall is the original 1024 dimension float32 index. balanced halves the dimensions and stores them as
+# fp16, compact keeps 1024 dimensions as Titan binary embeddings compared by hamming distance.
+INDEX_PROFILES = {
+    "high_recall": {
+        "dimensions": 1024,
+        "data_type": "float",
+        "encoder": None,
+        "space_type": "l2",
+        "m": 16,
+        "ef_construction": 512,
+        "ef_search": 512
+    },
+    "balanced": {
+        "dimensions": 512,
+        "data_type": "float",
+        "encoder": "fp16",
+        "space_type": "innerproduct",
+        "m": 16,
+        "ef_construction": 256,
+        "ef_search": 128
+    },
+    "compact": {
+        "dimensions": 1024,
+        "data_type": "binary",
+        "encoder": None,
+        "space_type": "hamming",
+        "m": 16,
+        "ef_construction": 256,
+        "ef_search": 256
+    }
+}
+
+# The original index stays the default. balanced trades recall for a quarter of the memory, measure it with the
+# index benchmark and opt an index into it with the vectorIndexProfiles context.
+DEFAULT_INDEX_PROFILE = "high_recall"
+
+# Bedrock writes either float32 or binary embeddings into the index
+EMBEDDING_DATA_TYPES = {"float": "FLOAT32", "binary": "BINARY"}
+
+# Fields Bedrock adds to every chunk next to the metadata attributes of its document
+BEDROCK_METADATA_FIELDS = {
+    "x-amz-bedrock-kb-source-uri": "keyword",
+    "x-amz-bedrock-kb-data-source-id": "keyword",
+    "x-amz-bedrock-kb-document-page-number": "integer"
+}
+
+# OpenSearch sizes native HNSW memory as 1.1 * (vector bytes + 8 * m) per vector
+HNSW_MEMORY_OVERHEAD = 1.1
+
+
+def get_profile(name):
+    if name not in INDEX_PROFILES:
+        raise ValueError(f"Unknown index profile {name}, expected one of {', '.join(INDEX_PROFILES)}")
+    return INDEX_PROFILES[name]
+
+
+def resolve_profiles(indices, overrides=None):
+    """Profile name of every index, the default unless overridden
+
+    Overrides come from the vectorIndexProfiles context, either a dict or its JSON, keyed by index.
+    """
+    if isinstance(overrides, str):
+        overrides = json.loads(overrides)
+    overrides = overrides or {}
+
+    unknown = set(overrides) - set(indices)
+    if unknown:
+        raise ValueError(f"vectorIndexProfiles names unknown indices: {', '.join(sorted(unknown))}")
+
+    profiles = {index: overrides.get(index, DEFAULT_INDEX_PROFILE) for index in indices}
+    for name in profiles.values():
+        get_profile(name)
+    return profiles
+
+
+def index_name(index, profile_name):
+    """Physical index name, a new profile needs a new index since an existing mapping cannot change
+
+    The default profile is the original index and keeps its name, so an existing deployment keeps its vectors.
+    """
+    return index if profile_name == DEFAULT_INDEX_PROFILE else f"{index}_{profile_name}"
+
+
+def vector_bytes(profile):
+    if profile["data_type"] == "binary":
+        return profile["dimensions"] // 8
+    return profile["dimensions"] * (2 if profile["encoder"] == "fp16" else 4)
+
+
+def estimated_memory_bytes(profile, vectors):
+    """Native memory an HNSW index of this profile needs for the given number of vectors"""
+    return int(HNSW_MEMORY_OVERHEAD * (vector_bytes(profile) + 8 * profile["m"]) * vectors)
+
+
+def embedding_model_configuration(profile):
+    """Titan v2 output the knowledge base has to produce for an index of this profile"""
+    return {
+        "dimensions": profile["dimensions"],
+        "embedding_data_type": EMBEDDING_DATA_TYPES[profile["data_type"]]
+    }
+
+
+def index_mapping(profile):
+    """OpenSearch index body with the text, metadata and knn vector fields of a profile
+
+    The report metadata fields are typed so filtered knn queries pre-filter on exact values, and the faiss
+    engine searches only the matching documents when the filter is selective.
+    """
+    parameters = {
+        "ef_construction": profile["ef_construction"],
+        "m": profile["m"]
+    }
+    if profile["encoder"] == "fp16":
+        parameters["encoder"] = {"name": "sq", "parameters": {"type": "fp16"}}
+
+    vector_field = {
+        "type": "knn_vector",
+        "dimension": profile["dimensions"],
+        "method": {
+            "engine": "faiss",
+            "name": "hnsw",
+            "parameters": parameters,
+            "space_type": profile["space_type"]
+        }
+    }
+    if profile["data_type"] != "float":
+        vector_field["data_type"] = profile["data_type"]
+
+    return {
+        "settings": {
+            "index.knn": True,
+            "index.knn.algo_param.ef_search": profile["ef_search"]
+        },
+        "mappings": {
+            "properties": {
+                "content": {
+                    "type": "text",
+                    "analyzer": "standard"
+                },
+                "content_embedding": vector_field,
+                # Bedrock keeps the JSON of all attributes here, only for returning them
+                "metadata": {
+                    "type": "text",
+                    "index": False
+                },
+                **{
+                    field: {"type": field_type}
+                    for field, field_type in {**BEDROCK_METADATA_FIELDS, **REPORT_METADATA_FIELDS}.items()
+                }
+            }
+        }
+    }
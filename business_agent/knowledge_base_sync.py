@@ -0,0 +1,54 @@
+from aws_cdk import (
+    aws_iam as iam
+)
+from constructs import Construct
+from business_agent.bootstrap_stack import BootstrapStack, BootstrapTask
+import json
+
+
+class KnowledgeBaseSync(Construct):
+    """Ingests the documents of each knowledge base data source and waits until all of them finish
+
+    Every source is a dict with the knowledge_base and data_source to sync. Sources that also carry the
+    bucket and the document manifest of its contents are synced incrementally: after the first full
+    ingestion job only documents whose hash changed are ingested again, and removed documents are deleted.
+    """
+
+    def __init__(self, scope: Construct, construct_id: str, *, bootstrap: BootstrapStack, sources) -> None:
+        super().__init__(scope, construct_id)
+
+        # Sync the knowledge bases with the kb_sync task, polled until every ingestion finishes.
+        # A changed manifest updates the resource, an unchanged one leaves it and the documents untouched
+        kb_sync_task = BootstrapTask(
+            self, 'KBSyncTask',
+            bootstrap=bootstrap,
+            task='kb_sync',
+            properties={
+                'Sources': [
+                    {
+                        'KnowledgeBaseId': source['knowledge_base'].attr_knowledge_base_id,
+                        'DataSourceId': source['data_source'].attr_data_source_id,
+                        **({
+                            'Bucket': source['bucket'].bucket_name,
+                            'Manifest': json.dumps(source['manifest'], sort_keys=True)
+                        } if source.get('manifest') is not None else {})
+                    } for source in sources
+                ]
+            },
+            statements=[iam.PolicyStatement(
+                actions=[
+                    'bedrock:StartIngestionJob',
+                    'bedrock:GetIngestionJob',
+                    'bedrock:ListIngestionJobs',
+                    'bedrock:IngestKnowledgeBaseDocuments',
+                    'bedrock:DeleteKnowledgeBaseDocuments',
+                    'bedrock:GetKnowledgeBaseDocuments',
+                ],
+                resources=['*'],
+            )]
+        )
+        self.resource = kb_sync_task.resource
+
+        for source in sources:
+            self.resource.node.add_dependency(source['knowledge_base'])
+            self.resource.node.add_dependency(source['data_source'])
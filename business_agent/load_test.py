@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from business_agent.orchestrator import STACK_NAME, Orchestrator, knowledge_base_ids
+from business_agent.query_benchmark import QUERY_FILES, load_query_pairs
+from business_agent.router import SOURCES, get_router
+from business_agent.router_benchmark import ROUTER_QUESTIONS_PATH
+
+# Questions of the curated set are asked more often than the long tail of query pairs. The query files only
+# hold financial data questions, the hand labelled router questions bring the ones the report knowledge bases
+# answer, so routing leaves every source with a share of the load.
+DEFAULT_WEIGHTS = {"curated_queries": 3.0, "query_pairs": 1.0, "router_questions": 3.0}
+
+DEFAULT_CONCURRENCY = 50
+DEFAULT_DURATION = 60  # seconds
+
+# A throttled analyst waits a random time up to this backoff before the next question, doubled after every
+# throttled question up to the maximum, like the adaptive retries of the SDK clients
+THROTTLE_BACKOFF = 0.5  # seconds
+MAX_THROTTLE_BACKOFF = 20  # seconds
+
+# Error codes Bedrock, AOSS and the Redshift Data API return when a capacity limit is hit
+THROTTLE_CODES = {
+    "ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException",
+    "ServiceUnavailableException", "ActiveStatementsExceededException"
+}
+
+# Latency of every source of the local stub as a log-normal distribution, with the calls it serves at once
+# and the calls it queues before it throttles. The SQL knowledge base generates SQL and runs it on Redshift.
+STUB_PROFILES = {
+    "financial_data": {"median": 4.0, "sigma": 0.5, "capacity": 8, "max_queue": 32},
+    "internal_reports": {"median": 0.4, "sigma": 0.3, "capacity": 20, "max_queue": 100},
+    "research_reports": {"median": 0.4, "sigma": 0.3, "capacity": 20, "max_queue": 100}
+}
+
+
+class Throttled(Exception):
+    pass
+
+
+def weighted_questions(weights=None):
+    """Every question of the query files with the weight of its file"""
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    questions = []
+    for key, question, _ in load_query_pairs(QUERY_FILES):
+        questions.append((question, weights[key.split("#")[0]]))
+    with open(ROUTER_QUESTIONS_PATH) as f:
+        questions += [(item["question"], weights["router_questions"]) for item in json.load(f)["questions"]]
+    return questions
+
+
+class StubBackend:
+    """Knowledge bases simulated locally with bounded capacity, queueing and throttling"""
+
+    def __init__(self, profiles=None, scale=1.0, seed=0, route=True):
+        self.profiles = {source: {**STUB_PROFILES[source], **(profiles or {}).get(source, {})} for source in SOURCES}
+        self.scale = scale
+        self.route = route
+        self.rng = random.Random(seed)
+        self.slots = {source: asyncio.Semaphore(int(profile["capacity"])) for source, profile in self.profiles.items()}
+        self.waiting = {source: 0 for source in SOURCES}
+
+    def sources(self, question):
+        return get_router().route(question)[0] if self.route else list(SOURCES)
+
+    async def call(self, source, question):
+        profile = self.profiles[source]
+        if self.waiting[source] >= profile["max_queue"]:
+            raise Throttled(f"{source} queue is full")
+        self.waiting[source] += 1
+        try:
+            await self.slots[source].acquire()
+        finally:
+            self.waiting[source] -= 1
+        try:
+            await asyncio.sleep(self.rng.lognormvariate(np.log(profile["median"]), profile["sigma"]) * self.scale)
+        finally:
+            self.slots[source].release()
+
+
+class DeployedBackend:
+    """The knowledge bases of the deployed stack, queried like the orchestrator does without retries"""
+
+    def __init__(self, stack_name=STACK_NAME, route=True, concurrency=DEFAULT_CONCURRENCY):
+        self.orchestrator = Orchestrator(
+            knowledge_base_ids(stack_name), route=route, max_attempts=1,
+            max_connections=concurrency * len(SOURCES)
+        )
+        self.route = route
+
+    def sources(self, question):
+        return get_router().route(question)[0] if self.route else list(SOURCES)
+
+    async def call(self, source, question):
+        if source == "financial_data":
+            function, args = self.orchestrator.query_financial_data, (question,)
+        else:
+            function, args = self.orchestrator.query_reports, (source, question)
+        try:
+            await asyncio.to_thread(function, *args)
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if code in THROTTLE_CODES:
+                raise Throttled(code) from e
+            raise
+
+
+class LoadTest:
+    """Replays weighted questions against a backend and records every knowledge base call"""
+
+    def __init__(self, backend, questions, concurrency, rate=None, duration=DEFAULT_DURATION, requests=None,
+                 seed=0):
+        self.backend = backend
+        self.texts = [question for question, _ in questions]
+        self.weights = [weight for _, weight in questions]
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.requests = requests
+        self.rng = random.Random(seed)
+        self.calls = {source: [] for source in SOURCES}
+        self.latencies = []
+        self.failed = {"throttled": 0, "error": 0}
+        self.sent = 0
+
+    def next_question(self):
+        if self.requests is not None and self.sent >= self.requests:
+            return None
+        self.sent += 1
+        return self.rng.choices(self.texts, self.weights)[0]
+
+    async def timed_call(self, source, question):
+        started = time.perf_counter()
+        try:
+            await self.backend.call(source, question)
+            outcome = "ok"
+        except Throttled:
+            outcome = "throttled"
+        except Exception as e:
+            outcome = "error"
+            print(f"{source} error: {type(e).__name__}: {e}")
+        self.calls[source].append((time.perf_counter() - started, outcome))
+        return outcome
+
+    async def request(self, question, arrived):
+        """One analyst question, its sources called concurrently like the orchestrator does
+
+        Only questions whose calls all succeeded count towards the latency and throughput, a throttled call
+        returns at once and would make an overloaded backend look fast.
+        """
+        outcomes = await asyncio.gather(
+            *(self.timed_call(source, question) for source in self.backend.sources(question))
+        )
+        if "throttled" in outcomes:
+            self.failed["throttled"] += 1
+        elif "error" in outcomes:
+            self.failed["error"] += 1
+        else:
+            self.latencies.append(time.perf_counter() - arrived)
+        return "throttled" not in outcomes
+
+    async def closed_loop(self, deadline):
+        """Every analyst asks the next question once the previous one is answered, backing off when throttled"""
+        async def analyst():
+            backoff = THROTTLE_BACKOFF
+            while time.perf_counter() < deadline:
+                question = self.next_question()
+                if question is None:
+                    return
+                if await self.request(question, time.perf_counter()):
+                    backoff = THROTTLE_BACKOFF
+                    continue
+                await asyncio.sleep(min(self.rng.uniform(0, backoff), max(deadline - time.perf_counter(), 0)))
+                backoff = min(backoff * 2, MAX_THROTTLE_BACKOFF)
+        await asyncio.gather(*(analyst() for _ in range(self.concurrency)))
+
+    async def open_loop(self, deadline):
+        """Questions arrive at the given rate, at most concurrency of them in flight"""
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def limited(question, arrived):
+            async with slots:
+                await self.request(question, arrived)
+
+        tasks = []
+        while time.perf_counter() < deadline:
+            question = self.next_question()
+            if question is None:
+                break
+            tasks.append(asyncio.create_task(limited(question, time.perf_counter())))
+            await asyncio.sleep(self.rng.expovariate(self.rate))
+        await asyncio.gather(*tasks)
+
+    async def run(self):
+        # Blocking client calls need a thread each
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(self.concurrency * len(SOURCES)))
+        started = time.perf_counter()
+        deadline = started + self.duration
+        await (self.open_loop(deadline) if self.rate else self.closed_loop(deadline))
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        def percentiles(values):
+            if not values:
+                return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+            values = np.array(values) * 1000
+            return {f"p{p}_ms": round(float(np.percentile(values, p)), 1) for p in (50, 95, 99)}
+
+        sources = {}
+        for source, calls in self.calls.items():
+            outcomes = [outcome for _, outcome in calls]
+            sources[source] = {
+                "calls": len(calls),
+                "throughput_per_s": round(outcomes.count("ok") / elapsed, 3),
+                "throttle_rate": round(outcomes.count("throttled") / len(calls), 4) if calls else None,
+                "error_rate": round(outcomes.count("error") / len(calls), 4) if calls else None,
+                **percentiles([latency for latency, outcome in calls if outcome == "ok"])
+            }
+
+        return {
+            "requests": len(self.latencies),
+            "failed_requests": sum(self.failed.values()),
+            "throttled_requests": self.failed["throttled"],
+            "elapsed_s": round(elapsed, 2),
+            "throughput_per_s": round(len(self.latencies) / elapsed, 3),
+            "concurrency": self.concurrency,
+            "arrival_rate_per_s": self.rate,
+            "mean_ms": round(statistics.mean(self.latencies) * 1000, 1) if self.latencies else None,
+            **percentiles(self.latencies),
+            "sources": sources
+        }
+
+
+def parse_overrides(values, parser):
+    """SOURCE.FIELD=NUMBER overrides of the stub profiles"""
+    profiles = {}
+    for value in values:
+        name, _, number = value.partition("=")
+        source, _, field = name.partition(".")
+        if source not in STUB_PROFILES or field not in STUB_PROFILES[source]:
+            parser.error(f"unknown stub setting {name}, expected SOURCE.FIELD with FIELD one of "
+                         f"{', '.join(STUB_PROFILES['financial_data'])}")
+        profiles.setdefault(source, {})[field] = float(number)
+    return profiles
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay concurrent analyst questions against the knowledge bases")
+    parser.add_argument("--backend", choices=["stub", "deployed"], default="stub", help="what to load")
+    parser.add_argument("--stack-name", default=STACK_NAME, help="deployed stack whose knowledge bases to load")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="analysts asking at once")
+    parser.add_argument("--rate", type=float, help="questions per second, closed loop at full concurrency if unset")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="seconds to generate load")
+    parser.add_argument("--requests", type=int, help="stop after this many questions")
+    parser.add_argument("--weight", action="append", default=[], metavar="FILE=WEIGHT",
+                        help="weight of the questions of one query file, for example query_pairs=2")
+    parser.add_argument("--no-route", action="store_true", help="call every knowledge base for every question")
+    parser.add_argument("--stub", action="append", default=[], metavar="SOURCE.FIELD=NUMBER",
+                        help="stub setting, for example financial_data.capacity=16")
+    parser.add_argument("--stub-scale", type=float, default=1.0, help="multiply the stub latencies")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the question mix and arrivals")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    weights = {}
+    for value in args.weight:
+        name, _, weight = value.partition("=")
+        if name not in DEFAULT_WEIGHTS:
+            parser.error(f"unknown query file {name}, expected one of {', '.join(DEFAULT_WEIGHTS)}")
+        weights[name] = float(weight)
+
+    async def run():
+        if args.backend == "stub":
+            backend = StubBackend(parse_overrides(args.stub, parser), args.stub_scale, args.seed, not args.no_route)
+        else:
+            backend = DeployedBackend(args.stack_name, not args.no_route, args.concurrency)
+        load_test = LoadTest(
+            backend, weighted_questions(weights), args.concurrency, args.rate, args.duration, args.requests,
+            args.seed
+        )
+        return await load_test.run()
+
+    report = asyncio.run(run())
+
+    print(f"{report['requests']} questions answered in {report['elapsed_s']} s: {report['throughput_per_s']}/s, "
+          f"p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms")
+    print(f"{report['failed_requests']} questions failed, {report['throttled_requests']} of them throttled")
+    print(f"{'source':17} {'calls':>6} {'per s':>7} {'throttled':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9}")
+    for source, stats in report["sources"].items():
+        def rate(value):
+            return f"{value:.1%}" if value is not None else "-"
+        print(f"{source:17} {stats['calls']:6d} {stats['throughput_per_s']:7.2f} {rate(stats['throttle_rate']):>9} "
+              f"{rate(stats['error_rate']):>7} {str(stats['p50_ms']):>9} {str(stats['p95_ms']):>9} "
+              f"{str(stats['p99_ms']):>9}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import os
+
+import duckdb
+
+from business_agent.datalake import (
+    FINANCIAL_DATA_DIR, FINANCIAL_DATA_LAKE_DIR, PARTITION_COLUMN, build_financial_data_lake
+)
+from business_agent.rollups import GLUE_DATABASE, ROLLUP_DATABASE, ROLLUP_SCHEMA, ROLLUPS, SPECTRUM_SCHEMA
+
+# Catalog the SQL knowledge base queries the Glue tables through
+DATA_CATALOG = "awsdatacatalog"
+
+
+def connect(source_dir=FINANCIAL_DATA_DIR, data_lake_dir=FINANCIAL_DATA_LAKE_DIR, rollups=True):
+    """Open an in-process DuckDB connection laid out like the Redshift query engine
+
+    The Parquet data lake is exposed as awsdatacatalog.financial_data_db.<table>, and as bare
+    table names for the query pairs that omit the catalog. With rollups enabled the materialized
+    views are built as financial_data_db.financial_rollups.<rollup>.
+    """
+    data_lake_dir = build_financial_data_lake(source_dir, data_lake_dir)
+    connection = duckdb.connect(":memory:")
+
+    connection.execute(f"ATTACH ':memory:' AS {DATA_CATALOG}")
+    connection.execute(f"CREATE SCHEMA {DATA_CATALOG}.{GLUE_DATABASE}")
+
+    for table_name in sorted(os.listdir(data_lake_dir)):
+        table_dir = os.path.join(data_lake_dir, table_name)
+        files = os.path.join(table_dir, "**", "*.parquet").replace("'", "''")
+        partitioned = any(entry.startswith(f"{PARTITION_COLUMN}=") for entry in os.listdir(table_dir))
+        options = f", hive_partitioning = true, hive_types = {{'{PARTITION_COLUMN}': INTEGER}}" if partitioned else ""
+        connection.execute(
+            f"CREATE VIEW {DATA_CATALOG}.{GLUE_DATABASE}.{table_name} AS "
+            f"SELECT * FROM read_parquet('{files}'{options})"
+        )
+
+    if rollups:
+        connection.execute(f"ATTACH ':memory:' AS {ROLLUP_DATABASE}")
+        connection.execute(f"CREATE SCHEMA {ROLLUP_DATABASE}.{ROLLUP_SCHEMA}")
+        connection.execute(f"CREATE SCHEMA {ROLLUP_DATABASE}.{SPECTRUM_SCHEMA}")
+
+        for table_name in sorted(os.listdir(data_lake_dir)):
+            connection.execute(
+                f"CREATE VIEW {ROLLUP_DATABASE}.{SPECTRUM_SCHEMA}.{table_name} AS "
+                f"SELECT * FROM {DATA_CATALOG}.{GLUE_DATABASE}.{table_name}"
+            )
+
+        connection.execute(f"USE {ROLLUP_DATABASE}.main")
+        for rollup in ROLLUPS:
+            connection.execute(
+                f"CREATE TABLE {ROLLUP_SCHEMA}.{rollup['name']} AS "
+                + rollup["sql"].format(spectrum_schema=SPECTRUM_SCHEMA)
+            )
+
+    connection.execute(f"USE {DATA_CATALOG}.{GLUE_DATABASE}")
+    return connection
+
+
+def execute(connection, sql):
+    """Run one Redshift style query and return its column names and rows"""
+    cursor = connection.execute(sql)
+    columns = [column[0] for column in cursor.description]
+    return columns, cursor.fetchall()
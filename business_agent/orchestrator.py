@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import boto3
+from botocore.config import Config
+
+from business_agent.answering import (
+    DEFAULT_NUMBER_OF_RESULTS, DEFAULT_TIMEOUTS, NO_CONTEXT_ANSWER, SQL_MODEL_ID, answer_request, merge_context,
+    model_arn, query_financial_data, query_reports
+)
+from business_agent.report_retrieval import report_catalog
+from business_agent.router import get_router
+
+STACK_NAME = "BusinessAgentStack"
+
+
+def knowledge_base_ids(stack_name=STACK_NAME, cloudformation=None):
+    """IDs of the three knowledge bases from the outputs of the deployed stack"""
+    cloudformation = cloudformation or boto3.client("cloudformation")
+    outputs = {
+        output["OutputKey"]: output["OutputValue"]
+        for output in cloudformation.describe_stacks(StackName=stack_name)["Stacks"][0]["Outputs"]
+    }
+    return {
+        "financial_data": outputs["financialdatakbid"],
+        "internal_reports": outputs["internalreportskbid"],
+        "research_reports": outputs["researchreportskbid"]
+    }
+
+
+class Orchestrator:
+    """Answers a business question from the SQL knowledge base and both report knowledge bases at once
+
+    The three sources are queried concurrently, each under its own timeout, so a question costs about as
+    long as its slowest source. A source that fails or times out is reported and left out of the context,
+    the answer is generated from whatever the other sources returned. Unless routing is turned off, the
+    local router skips the sources a question clearly does not need. With a semantic cache, a rephrasing
+    of an earlier question is answered from the cache without calling any source.
+    """
+
+    def __init__(self, kb_ids, timeouts=None, number_of_results=DEFAULT_NUMBER_OF_RESULTS, session=None, route=True,
+                 cache=None, max_attempts=None, max_connections=None):
+        self.kb_ids = kb_ids
+        self.route = route
+        self.cache = cache
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.number_of_results = number_of_results
+        self.catalog = report_catalog()
+
+        session = session or boto3.Session()
+        self.region = session.region_name
+        # Enough pooled connections for every source running at the same time
+        retries = {"mode": "adaptive", **({"max_attempts": max_attempts} if max_attempts else {})}
+        config = Config(max_pool_connections=max_connections or len(DEFAULT_TIMEOUTS) * 2, retries=retries)
+        self.agent_runtime = session.client("bedrock-agent-runtime", config=config)
+        self.runtime = session.client("bedrock-runtime", config=config)
+
+    def query_financial_data(self, question):
+        return query_financial_data(
+            self.agent_runtime, self.kb_ids["financial_data"], model_arn(self.region, SQL_MODEL_ID), question
+        )
+
+    def query_reports(self, source, question):
+        return query_reports(self.agent_runtime, self.kb_ids[source], question, self.catalog, self.number_of_results)
+
+    async def run_source(self, source, function, *args):
+        """Run one blocking client call in a thread under the source's timeout"""
+        started = time.perf_counter()
+        try:
+            results = await asyncio.wait_for(asyncio.to_thread(function, *args), self.timeouts[source])
+            status, error = "ok", None
+        except asyncio.TimeoutError:
+            # The thread finishes in the background, its result is discarded
+            results, status, error = [], "timeout", f"no response within {self.timeouts[source]}s"
+        except Exception as e:
+            results, status, error = [], "error", f"{type(e).__name__}: {e}"
+
+        return source, {
+            "status": status,
+            "error": error,
+            "results": results,
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+
+    async def gather(self, question):
+        """Query the routed sources concurrently, a failing source never fails the others"""
+        calls = {
+            "financial_data": (self.query_financial_data, question),
+            "internal_reports": (self.query_reports, "internal_reports", question),
+            "research_reports": (self.query_reports, "research_reports", question)
+        }
+        routed = get_router().route(question)[0] if self.route else list(calls)
+
+        sources = dict(await asyncio.gather(
+            *(self.run_source(source, *calls[source]) for source in routed)
+        ))
+        skipped = {"status": "skipped", "error": None, "results": [], "seconds": 0.0}
+        return {source: sources.get(source, skipped) for source in calls}
+
+    def generate_answer(self, question, context):
+        response = self.runtime.converse(**answer_request(question, context))
+        return response["output"]["message"]["content"][0]["text"]
+
+    async def answer(self, question):
+        """Answer a question with the merged context of every source that returned in time"""
+        started = time.perf_counter()
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.lookup, question)
+            if cached:
+                return {
+                    "question": question,
+                    "answer": cached["answer"],
+                    "sql": cached["sql"],
+                    "cached": {"question": cached["question"], "similarity": cached["similarity"]},
+                    "sources": {},
+                    "retrieval_seconds": 0.0,
+                    "total_seconds": round(time.perf_counter() - started, 3)
+                }
+
+        sources = await self.gather(question)
+        retrieval_seconds = time.perf_counter() - started
+
+        context = merge_context({source: outcome["results"] for source, outcome in sources.items()})
+        if context:
+            answer = await asyncio.to_thread(self.generate_answer, question, context)
+        else:
+            answer = NO_CONTEXT_ANSWER
+
+        sql = [query for result in sources["financial_data"]["results"] for query in result.get("queries", [])]
+        # Only complete answers are cached, a partial one would outlive the outage that caused it
+        if self.cache is not None and all(outcome["status"] in ("ok", "skipped") for outcome in sources.values()):
+            await asyncio.to_thread(self.cache.put, question, answer, sql)
+
+        return {
+            "question": question,
+            "answer": answer,
+            "sql": sql,
+            "cached": None,
+            "sources": {
+                source: {key: value for key, value in outcome.items() if key != "results"}
+                for source, outcome in sources.items()
+            },
+            "retrieval_seconds": round(retrieval_seconds, 3),
+            "total_seconds": round(time.perf_counter() - started, 3)
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a business question from all three knowledge bases")
+    parser.add_argument("question", help="the business question")
+    parser.add_argument("--stack-name", default=STACK_NAME, help="stack whose outputs hold the knowledge base IDs")
+    parser.add_argument("--timeout", action="append", default=[], metavar="SOURCE=SECONDS",
+                        help="override the timeout of one source, for example research_reports=5")
+    parser.add_argument("--results", type=int, default=DEFAULT_NUMBER_OF_RESULTS, help="chunks per report source")
+    parser.add_argument("--no-route", action="store_true", help="query every knowledge base regardless of the question")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    args = parser.parse_args(argv)
+
+    timeouts = {}
+    for override in args.timeout:
+        source, _, seconds = override.partition("=")
+        if source not in DEFAULT_TIMEOUTS:
+            parser.error(f"unknown source {source}, expected one of {', '.join(DEFAULT_TIMEOUTS)}")
+        timeouts[source] = float(seconds)
+
+    orchestrator = Orchestrator(knowledge_base_ids(args.stack_name), timeouts, args.results, route=not args.no_route)
+    result = asyncio.run(orchestrator.answer(args.question))
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    print(result["answer"])
+    print()
+    for source, outcome in result["sources"].items():
+        print(f"{source:17} {outcome['status']:8} {outcome['seconds']:7.2f} s  {outcome['error'] or ''}")
+    sequential = sum(outcome["seconds"] for outcome in result["sources"].values())
+    print(f"retrieval {result['retrieval_seconds']:.2f} s (sequential would be {sequential:.2f} s), "
+          f"total {result['total_seconds']:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+import docx
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from pypdf import PdfReader, PdfWriter
+
+from business_agent.documents import METADATA_SUFFIX, PARSED_REPORTS_DIR, file_hash
+
+# Parsed documents by content hash. The cache is local rather than in the supplemental data bucket: parsing
+# runs at synth, before that bucket exists on a first deploy, and Bedrock owns the bucket's layout for the
+# images it extracts. Each entry holds the same parsed/ and multimodal/ layout the data sources ingest.
+PARSE_CACHE_DIR = "./.build/parse_cache"
+
+# Bump whenever the extraction changes so cached output is regenerated
+PARSER_VERSION = "2"
+
+# Key prefixes the knowledge base data sources ingest from, each with its own parsing strategy
+PARSED_PREFIX = "parsed"
+MULTIMODAL_PREFIX = "multimodal"
+
+# A PDF page goes to multimodal parsing when a picture dominates it or when it is drawn as a vector chart,
+# chart pages consist of many form XObjects
+IMAGE_PAGE_MAX_TEXT_CHARS = 1000
+CHART_PAGE_MIN_FORMS = 20
+
+# Bold, explicitly sized docx paragraphs are headings, mapped to a level by font size in points
+HEADING_SIZES = [(20, 1), (16, 2), (12, 3)]
+
+# Report type by the first keyword found in the title, anything else is a plain report
+REPORT_TYPES = [
+    ("feasibility", "feasibility_study"),
+    ("pilot", "pilot"),
+    ("survey", "survey"),
+    ("assessment", "assessment"),
+    ("review", "review"),
+    ("strategy", "strategy"),
+    ("research", "research"),
+    ("results", "results")
+]
+
+DATE_PATTERN = re.compile(r"Date:\s*[A-Za-z]+ \d{1,2}, ((?:19|20)\d{2})")
+YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+
+
+def normalize_text(text):
+    """Collapse the whitespace left behind by text extraction"""
+    text = re.sub(r"[ \t ]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def markdown_table(rows):
+    """Render table rows as a Markdown table, the first row being the header"""
+    rows = [[" ".join(cell.split()).replace("|", "\\|") for cell in row] for row in rows if any(row)]
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    lines = ["| " + " | ".join(rows[0]) + " |", "|" + " --- |" * width]
+    lines += ["| " + " | ".join(row) + " |" for row in rows[1:]]
+    return "\n".join(lines)
+
+
+def docx_paragraph(paragraph):
+    """Render a docx paragraph as a Markdown heading, list item or plain paragraph"""
+    runs = [run for run in paragraph.runs if run.text.strip()]
+    text = paragraph.text.strip()
+    if not text:
+        return ""
+
+    style = paragraph.style.name if paragraph.style is not None else ""
+    if style == "Title":
+        return f"# {text}"
+    if style.startswith("Heading") and style[-1:].isdigit():
+        return f"{'#' * (int(style[-1]) + 1)} {text}"
+
+    sizes = [run.font.size.pt for run in runs if run.font.size]
+    if runs and all(run.bold for run in runs) and sizes:
+        for min_size, level in HEADING_SIZES:
+            if max(sizes) >= min_size:
+                return f"{'#' * level} {text}"
+
+    # Bold runs are labels such as "Markets:", keep their emphasis around the text but not its whitespace
+    rendered = ""
+    for bold, group in groupby(paragraph.runs, key=lambda run: bool(run.bold)):
+        text_run = "".join(run.text for run in group).replace("\n", " ")
+        if bold and text_run.strip():
+            leading, core, trailing = re.match(r"(\s*)(.*?)(\s*)$", text_run, re.S).groups()
+            text_run = f"{leading}**{core}**{trailing}"
+        rendered += text_run
+    rendered = " ".join(rendered.split())
+
+    numbering = paragraph._p.pPr.numPr if paragraph._p.pPr is not None else None
+    if numbering is not None:
+        level = numbering.ilvl.val if numbering.ilvl is not None else 0
+        return f"{'  ' * level}- {rendered}"
+    return rendered
+
+
+def parse_docx(path):
+    """Extract the paragraphs and tables of a docx file in document order as Markdown"""
+    document = docx.Document(path)
+    blocks = []
+    for element in document.element.body.iterchildren():
+        if element.tag.endswith("}p"):
+            blocks.append(docx_paragraph(Paragraph(element, document)))
+        elif element.tag.endswith("}tbl"):
+            table = Table(element, document)
+            blocks.append(markdown_table([[cell.text for cell in row.cells] for row in table.rows]))
+
+    # A docx that is mostly pictures is better served by the foundation model
+    text_chars = sum(len(block) for block in blocks)
+    image_heavy = len(document.inline_shapes) > 0 and text_chars < IMAGE_PAGE_MAX_TEXT_CHARS
+
+    return [block for block in blocks if block], image_heavy
+
+
+def page_visuals(page):
+    """Count the image and form XObjects drawn on a PDF page"""
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    if not xobjects:
+        return 0, 0
+    subtypes = [xobject.get_object().get("/Subtype") for xobject in xobjects.get_object().values()]
+    return subtypes.count("/Image"), subtypes.count("/Form")
+
+
+def is_visual_page(text, images, forms):
+    return (images > 0 and len(text) < IMAGE_PAGE_MAX_TEXT_CHARS) or forms >= CHART_PAGE_MIN_FORMS
+
+
+def report_type(title):
+    words = title.lower()
+    return next((report_type for keyword, report_type in REPORT_TYPES if keyword in words), "report")
+
+
+def document_year(blocks, title, created=None):
+    """Year of a report from its Date: line or its title, otherwise from the file's creation date"""
+    for block in blocks[:5]:
+        match = DATE_PATTERN.search(block)
+        if match:
+            return int(match.group(1))
+    years = YEAR_PATTERN.findall(title)
+    if years:
+        return max(int(year) for year in years)
+    return created.year if created else None
+
+
+def document_attributes(path, source_kb, blocks, title=None, created=None):
+    """Filterable metadata of a report, shared by every document the pre-parser writes for it"""
+    file_name = os.path.basename(path)
+    name = " ".join(re.split(r"[-_\s]+", os.path.splitext(file_name)[0])).strip()
+    title = title or next((block[2:] for block in blocks if block.startswith("# ")), name)
+
+    attributes = {
+        "source_document": file_name,
+        "content_hash": file_hash(path),
+        "document_title": name,
+        "source_kb": source_kb,
+        "report_type": report_type(f"{title} {name}")
+    }
+    year = document_year(blocks, f"{title} {name}", created)
+    if year:
+        attributes["year"] = year
+    return attributes
+
+
+def write_metadata(path, attributes):
+    """Write the Bedrock metadata sidecar of an output document"""
+    with open(f"{path}{METADATA_SUFFIX}", "w") as f:
+        json.dump({"metadataAttributes": attributes}, f, indent=2, sort_keys=True)
+
+
+def is_list_item(block):
+    return block.lstrip().startswith("- ")
+
+
+def write_markdown(output_dir, stem, blocks, attributes):
+    """Write the Markdown of a document, keeping consecutive list items in one list"""
+    text = ""
+    for previous, block in zip([None] + blocks, blocks):
+        if previous is not None:
+            text += "\n" if is_list_item(previous) and is_list_item(block) else "\n\n"
+        text += block
+
+    path = os.path.join(output_dir, PARSED_PREFIX, f"{stem}.md")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text + "\n")
+    write_metadata(path, attributes)
+
+
+def parse_document(path, output_dir, source_kb):
+    """Split one report into locally extracted Markdown and single pages left to multimodal parsing"""
+    # Encrypted PDFs warn about every font they cannot fully decode, the text is still extracted
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+
+    file_name = os.path.basename(path)
+    stem, extension = os.path.splitext(file_name)
+
+    if extension.lower() == ".docx":
+        blocks, image_heavy = parse_docx(path)
+        attributes = document_attributes(path, source_kb, blocks)
+        if image_heavy:
+            target = os.path.join(output_dir, MULTIMODAL_PREFIX, file_name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(path, target)
+            write_metadata(target, {**attributes, "parser": "multimodal"})
+        else:
+            write_markdown(output_dir, stem, blocks, {**attributes, "parser": "local"})
+        return
+
+    if extension.lower() == ".pdf":
+        reader = PdfReader(path)
+        blocks, visual_pages = [], []
+        for number, page in enumerate(reader.pages, start=1):
+            text = normalize_text(page.extract_text() or "")
+            if is_visual_page(text, *page_visuals(page)):
+                visual_pages.append(number)
+                continue
+            blocks.append(f"## Page {number}\n\n{text}")
+
+        metadata = reader.metadata
+        attributes = document_attributes(
+            path, source_kb, blocks,
+            title=metadata.title if metadata else None,
+            created=metadata.creation_date if metadata else None
+        )
+
+        if blocks:
+            write_markdown(output_dir, stem, blocks, {
+                **attributes,
+                "parser": "local",
+                "pages": [str(number) for number in range(1, len(reader.pages) + 1) if number not in visual_pages]
+            })
+
+        for number in visual_pages:
+            target = os.path.join(output_dir, MULTIMODAL_PREFIX, stem, f"page-{number:03d}.pdf")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            writer = PdfWriter()
+            writer.add_page(reader.pages[number - 1])
+            with open(target, "wb") as f:
+                writer.write(f)
+            write_metadata(target, {**attributes, "parser": "multimodal", "pages": [str(number)]})
+        return
+
+    # Anything else is ingested as is with the foundation model
+    attributes = document_attributes(path, source_kb, [])
+    target = os.path.join(output_dir, MULTIMODAL_PREFIX, file_name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copyfile(path, target)
+    write_metadata(target, {**attributes, "parser": "multimodal"})
+
+
+def cache_key(path, source_kb):
+    digest = hashlib.sha256(f"{PARSER_VERSION}\n{source_kb}\n{os.path.basename(path)}\n".encode())
+    digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+
+def parse_to_cache(path, cache_dir, source_kb):
+    """Parse a document into its content addressed cache entry, written atomically"""
+    entry = os.path.join(cache_dir, cache_key(path, source_kb))
+    staging = f"{entry}.{os.getpid()}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    parse_document(path, staging, source_kb)
+    os.makedirs(staging, exist_ok=True)
+    try:
+        os.rename(staging, entry)
+    except OSError:
+        # Another process produced the same entry first
+        shutil.rmtree(staging, ignore_errors=True)
+    return entry
+
+
+def preparse_reports(source_dir, output_name, output_root=PARSED_REPORTS_DIR, cache_dir=PARSE_CACHE_DIR):
+    """Pre-parse every report of source_dir into output_root/output_name, reusing cached documents
+
+    The output holds parsed/ Markdown for the default parser and multimodal/ files for foundation model
+    parsing, each with a Bedrock metadata sidecar whose attributes name output_name as the source knowledge
+    base. Documents are parsed in parallel processes and only when their content changed.
+    """
+    paths = sorted(
+        os.path.join(source_dir, file_name) for file_name in os.listdir(source_dir)
+        if os.path.isfile(os.path.join(source_dir, file_name))
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+
+    entries = {path: os.path.join(cache_dir, cache_key(path, output_name)) for path in paths}
+    missing = [path for path, entry in entries.items() if not os.path.isdir(entry)]
+    if missing:
+        with ProcessPoolExecutor(max_workers=min(len(missing), os.cpu_count() or 1)) as executor:
+            list(executor.map(parse_to_cache, missing, [cache_dir] * len(missing), [output_name] * len(missing)))
+
+    output_dir = os.path.join(output_root, output_name)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    for entry in entries.values():
+        shutil.copytree(entry, output_dir, dirs_exist_ok=True)
+
+    return output_dir
@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from business_agent.local_sql import connect, execute
+
+QUERY_FILES = [
+    "./structured_knoledgebase_artifacts/curated_queries.json",
+    "./structured_knoledgebase_artifacts/query_pairs.json"
+]
+BASELINE_PATH = "./structured_knoledgebase_artifacts/query_benchmark_baseline.json"
+
+# A query regresses when its best of many runs is both relatively and absolutely slower than its baseline.
+# The best run is the one least disturbed by the rest of the machine, and the floor keeps the millisecond
+# queries from failing on a slower or busier CI runner.
+DEFAULT_REPEATS = 25
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_MIN_DELTA_MS = 25.0
+
+
+def load_query_pairs(paths=QUERY_FILES):
+    """Yield a stable key, the question and the SQL of every query pair"""
+    for path in paths:
+        with open(path) as f:
+            query_pairs = json.load(f)["queryPairs"]
+        source = os.path.splitext(os.path.basename(path))[0]
+        for index, query in enumerate(query_pairs):
+            yield f"{source}#{index}", query["naturalLanguage"], query["sqlQuery"]
+
+
+def run_query(connection, sql, repeats):
+    """Execute a query once to warm up, then time it and report the best and median latency"""
+    columns, rows = execute(connection, sql)
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        execute(connection, sql)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "columns": columns,
+        "rows": len(rows),
+        "best_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3)
+    }
+
+
+def run_benchmark(repeats=DEFAULT_REPEATS):
+    """Run every query pair against the local engine and collect the results by key"""
+    connection = connect()
+    results = {}
+    for key, question, sql in load_query_pairs():
+        result = {"question": question, "sql": sql}
+        try:
+            result.update(run_query(connection, sql, repeats))
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        results[key] = result
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """List the queries that changed row count or slowed down beyond the tolerance"""
+    regressions = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if "error" in result or not expected or expected["sql"] != result["sql"]:
+            continue
+
+        if result["rows"] != expected["rows"]:
+            regressions.append(f"{key}: returned {result['rows']} rows, baseline {expected['rows']}")
+
+        slowdown = result["best_ms"] - expected["best_ms"]
+        if result["best_ms"] > expected["best_ms"] * (1 + tolerance) and slowdown > min_delta_ms:
+            regressions.append(
+                f"{key}: best {result['best_ms']:.1f} ms, baseline {expected['best_ms']:.1f} ms"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run every curated query pair against the local data lake")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="timed runs per query")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown of the best latency")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="slowdowns below this many milliseconds are never regressions")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--output", help="also write the full results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.repeats)
+
+    for key, result in results.items():
+        if "error" in result:
+            print(f"ERROR {key}: {result['error']}")
+        else:
+            print(f"{result['best_ms']:9.2f} ms best {result['median_ms']:9.2f} ms median {result['rows']:6d} rows  "
+                  f"{key}  {result['question']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    errors = [key for key, result in results.items() if "error" in result]
+
+    if args.update_baseline:
+        if errors:
+            print(f"Not updating the baseline, {len(errors)} queries failed")
+            return 1
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {
+                    key: {
+                        "sql": result["sql"], "rows": result["rows"], "best_ms": result["best_ms"],
+                        "median_ms": result["median_ms"]
+                    }
+                    for key, result in results.items()
+                },
+                f,
+                indent=2
+            )
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+    else:
+        print(f"No baseline at {args.baseline}, only checking for errors")
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    print(f"{len(results)} queries, {len(errors)} errors, {len(regressions)} regressions")
+    return 1 if errors or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
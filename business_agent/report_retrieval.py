@@ -0,0 +1,86 @@
+import json
+import os
+import re
+
+from business_agent.documents import METADATA_SUFFIX, PARSED_REPORTS_DIR
+
+DEFAULT_NUMBER_OF_RESULTS = 5
+
+# Attributes that scope a question, the rest of the sidecar describes a single output document
+CATALOG_ATTRIBUTES = ("document_title", "source_kb", "report_type", "year")
+
+
+def normalize_title(text):
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def report_catalog(reports_root=PARSED_REPORTS_DIR):
+    """Scoping attributes of every pre-parsed report, keyed by document title"""
+    catalog = {}
+    for root, _, file_names in os.walk(reports_root):
+        for file_name in file_names:
+            if not file_name.endswith(METADATA_SUFFIX):
+                continue
+            with open(os.path.join(root, file_name)) as f:
+                attributes = json.load(f)["metadataAttributes"]
+            if "document_title" in attributes:
+                catalog[attributes["document_title"]] = {
+                    key: attributes[key] for key in CATALOG_ATTRIBUTES if key in attributes
+                }
+    return dict(sorted(catalog.items()))
+
+
+def mentioned_titles(question, catalog):
+    """Titles of the reports a question names, "in the Bioplastic Packaging Initiative report" names one"""
+    text = f" {normalize_title(question)} "
+    return [title for title in catalog if f" {normalize_title(title)} " in text]
+
+
+def metadata_filter(document_titles=None, years=None, report_types=None, source_kb=None):
+    """Bedrock retrieval filter matching all of the given attribute values, or None when nothing is given"""
+    conditions = []
+    for key, values in [
+        ("document_title", document_titles),
+        ("year", years),
+        ("report_type", report_types),
+        ("source_kb", [source_kb] if source_kb else None)
+    ]:
+        values = list(dict.fromkeys(values or []))
+        if len(values) == 1:
+            conditions.append({"equals": {"key": key, "value": values[0]}})
+        elif values:
+            conditions.append({"in": {"key": key, "value": values}})
+
+    if not conditions:
+        return None
+    # andAll needs at least two conditions
+    return conditions[0] if len(conditions) == 1 else {"andAll": conditions}
+
+
+def scope_filter(question, catalog, years=None, report_types=None):
+    """Filter for the reports a question names, so the knn search only visits their chunks"""
+    return metadata_filter(mentioned_titles(question, catalog), years, report_types)
+
+
+def retrieve(bedrock_agent_runtime, knowledge_base_id, question, number_of_results=DEFAULT_NUMBER_OF_RESULTS,
+             retrieval_filter=None):
+    """Retrieve the chunks closest to a question, pre-filtered on report metadata when a filter is given"""
+    configuration = {"numberOfResults": number_of_results}
+    if retrieval_filter:
+        configuration["filter"] = retrieval_filter
+
+    response = bedrock_agent_runtime.retrieve(
+        knowledgeBaseId=knowledge_base_id,
+        retrievalQuery={"text": question},
+        retrievalConfiguration={"vectorSearchConfiguration": configuration}
+    )
+    return response["retrievalResults"]
+
+
+def retrieve_reports(bedrock_agent_runtime, knowledge_base_id, question, catalog=None,
+                     number_of_results=DEFAULT_NUMBER_OF_RESULTS):
+    """Retrieve from a report knowledge base, scoped to the reports the question names if it names any"""
+    catalog = report_catalog() if catalog is None else catalog
+    return retrieve(
+        bedrock_agent_runtime, knowledge_base_id, question, number_of_results, scope_filter(question, catalog)
+    )
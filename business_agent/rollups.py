@@ -0,0 +1,151 @@
+ROLLUP_DATABASE = "financial_data_db"
+ROLLUP_SCHEMA = "financial_rollups"
+
+# External schema that exposes the Glue catalog tables to the materialized views
+SPECTRUM_SCHEMA = "financial_data_spectrum"
+GLUE_DATABASE = "financial_data_db"
+
+# Aggregates behind the curated queries, precomputed so generated SQL can skip the Spectrum scans
+ROLLUPS = [
+    {
+        "name": "cost_yearly",
+        "description": "Yearly totals and averages of the monthly operational cost data",
+        "source_tables": ["cost_data"],
+        "columns": {
+            "year": "Calendar year",
+            "total_raw_materials": "Total raw materials cost in dollars for the year",
+            "total_labor": "Total labor cost in dollars for the year",
+            "total_overhead": "Total overhead cost in dollars for the year",
+            "total_maintenance_cost": "Total equipment maintenance cost in dollars for the year",
+            "total_production_volume": "Total number of units produced during the year",
+            "avg_cost_per_unit": "Average of the monthly total cost per unit",
+            "avg_waste_rate": "Average of the monthly waste rate (decimal format)",
+            "estimated_waste_cost": "Sum of waste rate times production volume times cost per unit in dollars",
+            "avg_shipping_cost_per_unit": "Average of the monthly shipping cost per unit in dollars",
+            "avg_carbon_footprint_per_unit": "Average of the monthly carbon footprint per unit",
+            "total_machine_hours": "Total machine operating hours for the year",
+            "total_labor_hours": "Total labor hours for the year"
+        },
+        "sql": """
+            SELECT year,
+                   SUM(raw_materials) AS total_raw_materials,
+                   SUM(labor) AS total_labor,
+                   SUM(overhead) AS total_overhead,
+                   SUM(maintenance_cost) AS total_maintenance_cost,
+                   SUM(production_volume) AS total_production_volume,
+                   AVG(total_cost_per_unit) AS avg_cost_per_unit,
+                   AVG(waste_rate) AS avg_waste_rate,
+                   SUM(waste_rate * production_volume * total_cost_per_unit) AS estimated_waste_cost,
+                   AVG(shipping_cost_per_unit) AS avg_shipping_cost_per_unit,
+                   AVG(carbon_footprint_per_unit) AS avg_carbon_footprint_per_unit,
+                   SUM(machine_hours) AS total_machine_hours,
+                   SUM(labor_hours) AS total_labor_hours
+            FROM {spectrum_schema}.cost_data
+            GROUP BY year
+        """
+    },
+    {
+        "name": "equipment_yearly",
+        "description": "Yearly efficiency, downtime and maintenance figures per machine",
+        "source_tables": ["equipment_history"],
+        "columns": {
+            "machine_id": "Unique identifier matching the equipment table",
+            "year": "Calendar year",
+            "avg_efficiency_percentage": "Average monthly operational efficiency percentage",
+            "total_downtime_hours": "Total hours the machine was non-operational during the year",
+            "total_operating_hours": "Total hours the machine was in operation during the year",
+            "total_parts_replaced_cost": "Total cost of replacement parts during the year in dollars",
+            "max_annual_maintenance_cost": "Highest annual maintenance cost recorded during the year",
+            "avg_energy_consumption_kwh": "Average energy usage rate during the year"
+        },
+        "sql": """
+            SELECT machine_id,
+                   year,
+                   AVG(efficiency_percentage) AS avg_efficiency_percentage,
+                   SUM(downtime_hours_per_month) AS total_downtime_hours,
+                   SUM(operating_hours_per_month) AS total_operating_hours,
+                   SUM(parts_replaced_cost) AS total_parts_replaced_cost,
+                   MAX(annual_maintenance_cost) AS max_annual_maintenance_cost,
+                   AVG(energy_consumption_kwh) AS avg_energy_consumption_kwh
+            FROM {spectrum_schema}.equipment_history
+            GROUP BY machine_id, year
+        """
+    },
+    {
+        "name": "warehouse_utilization_yearly",
+        "description": "Yearly storage utilization, turnover and damage figures per warehouse facility",
+        "source_tables": ["warehouses_history"],
+        "columns": {
+            "facility_id": "Unique identifier matching the warehouses table",
+            "year": "Calendar year",
+            "avg_storage_utilization_percentage": "Average percentage of allocated storage space utilized",
+            "avg_inventory_turnover_rate": "Average monthly inventory turnover rate",
+            "avg_packaging_damage_percentage": "Average percentage of packaging damaged",
+            "total_throughput": "Total units processed through the facility during the year",
+            "total_labor_hours": "Total labor hours used in the facility during the year"
+        },
+        "sql": """
+            SELECT facility_id,
+                   year,
+                   AVG(storage_utilization_percentage) AS avg_storage_utilization_percentage,
+                   AVG(inventory_turnover_rate) AS avg_inventory_turnover_rate,
+                   AVG(packaging_damage_percentage) AS avg_packaging_damage_percentage,
+                   SUM(average_monthly_throughput) AS total_throughput,
+                   SUM(labor_hours_per_month) AS total_labor_hours
+            FROM {spectrum_schema}.warehouses_history
+            GROUP BY facility_id, year
+        """
+    },
+    {
+        "name": "material_price_trend_yearly",
+        "description": "Yearly price statistics per packaging material type",
+        "source_tables": ["material_cost_trends"],
+        "columns": {
+            "material_type": "Category of packaging material",
+            "year": "Calendar year",
+            "avg_cost_per_ton": "Average cost in dollars per metric ton during the year",
+            "min_cost_per_ton": "Lowest monthly cost in dollars per metric ton during the year",
+            "max_cost_per_ton": "Highest monthly cost in dollars per metric ton during the year",
+            "stddev_cost_per_ton": "Standard deviation of the monthly cost per metric ton during the year"
+        },
+        "sql": """
+            SELECT material_type,
+                   year,
+                   AVG(cost_per_ton) AS avg_cost_per_ton,
+                   MIN(cost_per_ton) AS min_cost_per_ton,
+                   MAX(cost_per_ton) AS max_cost_per_ton,
+                   STDDEV_SAMP(cost_per_ton) AS stddev_cost_per_ton
+            FROM {spectrum_schema}.material_cost_trends
+            GROUP BY material_type, year
+        """
+    }
+]
+
+
+def rollup_table_name(rollup):
+    """Fully qualified name of a rollup as the SQL knowledge base refers to it"""
+    return f"{ROLLUP_DATABASE}.{ROLLUP_SCHEMA}.{rollup['name']}"
+
+
+def rollup_groups():
+    """One group per materialized view that (re)creates it, the views do not depend on each other"""
+    groups = []
+    for rollup in ROLLUPS:
+        view = f"{ROLLUP_SCHEMA}.{rollup['name']}"
+        select = " ".join(rollup["sql"].format(spectrum_schema=SPECTRUM_SCHEMA).split())
+        groups.append({
+            "Name": f"rollups/{rollup['name']}",
+            "Statements": [
+                f"DROP MATERIALIZED VIEW IF EXISTS {view}",
+                f"CREATE MATERIALIZED VIEW {view} AUTO REFRESH NO AS {select}"
+            ]
+        })
+    return groups
+
+
+def rollup_stats_groups():
+    """One group per materialized view that refreshes its planner statistics once it is created"""
+    return [
+        {"Name": f"stats/{rollup['name']}", "Statements": [f"ANALYZE {ROLLUP_SCHEMA}.{rollup['name']}"]}
+        for rollup in ROLLUPS
+    ]
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+
+import numpy as np
+
+from business_agent.datalake import TABLE_DESCRIPTIONS_PATH, table_name_from_key
+from business_agent.documents import INTERNAL_REPORTS_DIR, RESEARCH_REPORTS_DIR
+
+CURATED_QUERIES_PATH = "./structured_knoledgebase_artifacts/curated_queries.json"
+
+SOURCES = ("financial_data", "internal_reports", "research_reports")
+
+# Words that point at a source beyond the vocabulary of its artifacts
+SOURCE_CUES = {
+    "financial_data": [
+        "cost", "spend", "spending", "revenue", "price", "pricing", "total", "average", "trend", "ratio",
+        "monthly", "yearly", "quarter", "volume", "utilization", "throughput", "budget", "dollar", "rate"
+    ],
+    "internal_reports": [
+        "internal", "initiative", "pilot", "project", "program", "assessment", "feasibility", "lesson learned",
+        "recommendation", "recommended", "next step", "team", "internal report", "phase", "achievement", "risk"
+    ],
+    "research_reports": [
+        "consumer", "survey", "research", "industry", "market", "shopper", "attitude", "think", "willing pay",
+        "perception", "perceive", "expect", "expectation", "future", "respondent", "country", "people",
+        "buying", "label", "recyclable", "compostable", "smart bottle", "edible box"
+    ]
+}
+
+STOPWORDS = set(
+    "a an and are as at be by did do does for from has have how in is it its of on or our over that the "
+    "their this to was we what when which who why will with".split()
+)
+
+# Cue terms count this many times more than terms taken from the artifacts
+CUE_WEIGHT = 2.0
+
+# Sparse hashed features of words and word pairs, compared by cosine similarity
+FEATURE_BUCKETS = 1 << 14
+
+# A source is called when its score clears the threshold or comes close to the best source, a question
+# that matches no source well is sent to all of them
+KEYWORD_WEIGHT = 0.6
+SIMILARITY_WEIGHT = 0.4
+ROUTE_THRESHOLD = 0.4
+RELATIVE_THRESHOLD = 0.7
+MIN_CONFIDENCE = 0.15
+
+
+def tokens(text):
+    """Lowercase content words, plural forms folded onto their singular"""
+    words = re.findall(r"[a-z0-9]+", text.lower().replace("_", " "))
+    return [word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+            for word in words if word not in STOPWORDS]
+
+
+def terms(text):
+    words = tokens(text)
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def bucket(term):
+    # Stable across processes, unlike the salted built-in hash
+    return int.from_bytes(hashlib.blake2b(term.encode(), digest_size=4).digest(), "little") % FEATURE_BUCKETS
+
+
+def report_titles(reports_dir):
+    """Titles of the reports in a directory from their file names"""
+    return [
+        " ".join(re.split(r"[-_\s]+", os.path.splitext(file_name)[0])).strip()
+        for file_name in sorted(os.listdir(reports_dir))
+        if not file_name.startswith(".")
+    ]
+
+
+def router_artifacts(table_descriptions_path=TABLE_DESCRIPTIONS_PATH, curated_queries_path=CURATED_QUERIES_PATH,
+                     report_dirs=None):
+    """Example texts of every source, built from the catalog descriptions, curated questions and report titles"""
+    report_dirs = report_dirs or {"internal_reports": INTERNAL_REPORTS_DIR, "research_reports": RESEARCH_REPORTS_DIR}
+
+    with open(table_descriptions_path) as f:
+        descriptions = json.load(f)
+    with open(curated_queries_path) as f:
+        questions = [query["naturalLanguage"] for query in json.load(f)["queryPairs"]]
+
+    examples = {source: list(SOURCE_CUES[source]) for source in SOURCES}
+    for key, columns in descriptions.items():
+        table = table_name_from_key(key)
+        examples["financial_data"].append(table)
+        examples["financial_data"] += [f"{table} {column} {description}" for column, description in columns.items()]
+    examples["financial_data"] += questions
+    for source, reports_dir in report_dirs.items():
+        examples[source] += report_titles(reports_dir)
+    return examples
+
+
+def artifact_fingerprint(paths):
+    """Size and modification time of every artifact, report directories contributing each of their files"""
+    fingerprint = []
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in sorted(os.scandir(path), key=lambda entry: entry.name):
+                stat = entry.stat()
+                fingerprint.append((entry.path, stat.st_mtime_ns, stat.st_size))
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+class Router:
+    """Decides which knowledge bases a question needs without calling any of them
+
+    Every source has a weighted vocabulary and a matrix of precomputed, normalized feature vectors of its
+    example texts. A question scores a source by the share of its known terms that belong to the source
+    and by its best cosine similarity to one of the source's examples.
+    """
+
+    def __init__(self, examples):
+        self.sources = list(examples)
+        source_terms = {source: set() for source in self.sources}
+        for source, texts in examples.items():
+            for text in texts:
+                source_terms[source].update(terms(text))
+
+        # Terms shared by every source, such as packaging, say little about where to look
+        frequency = {}
+        for vocabulary in source_terms.values():
+            for term in vocabulary:
+                frequency[term] = frequency.get(term, 0) + 1
+        cues = {term for texts in SOURCE_CUES.values() for text in texts for term in terms(text)}
+        self.weights = {
+            term: math.log(1 + len(self.sources) / count) * (CUE_WEIGHT if term in cues else 1.0)
+            for term, count in frequency.items()
+        }
+        self.membership = {
+            term: np.array([term in source_terms[source] for source in self.sources], dtype=np.float32)
+            for term in frequency
+        }
+
+        rows, owners = [], []
+        for index, source in enumerate(self.sources):
+            for text in examples[source]:
+                rows.append(self.vectorize(text))
+                owners.append(index)
+        self.examples = np.zeros((len(rows), FEATURE_BUCKETS), dtype=np.float32)
+        for row, (columns, values) in enumerate(rows):
+            self.examples[row, columns] = values
+        self.owners = np.array(owners)
+        # Column major so a question only touches the columns of its own features
+        self.examples = np.asfortranarray(self.examples)
+
+    def vectorize(self, text):
+        """Sparse normalized feature vector as bucket indices and values"""
+        counts = {}
+        for term in terms(text):
+            column = bucket(term)
+            counts[column] = counts.get(column, 0.0) + self.weights.get(term, math.log(1 + len(self.sources)))
+        if not counts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        columns = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return columns, values / np.linalg.norm(values)
+
+    def scores(self, question):
+        """Score of every source between 0 and 1"""
+        question_terms = set(terms(question))
+        known = [term for term in question_terms if term in self.membership]
+        keyword = np.zeros(len(self.sources), dtype=np.float32)
+        if known:
+            total = sum(self.weights[term] for term in known)
+            keyword = sum(self.weights[term] * self.membership[term] for term in known) / total
+
+        columns, values = self.vectorize(question)
+        similarity = np.zeros(len(self.sources), dtype=np.float32)
+        if len(columns):
+            example_scores = self.examples[:, columns] @ values
+            np.maximum.at(similarity, self.owners, example_scores)
+
+        combined = KEYWORD_WEIGHT * keyword + SIMILARITY_WEIGHT * similarity
+        return dict(zip(self.sources, combined.tolist()))
+
+    def route(self, question):
+        """Sources to call for a question, every source when none of them matches with confidence"""
+        scores = self.scores(question)
+        best = max(scores.values())
+        if best < MIN_CONFIDENCE:
+            return list(self.sources), scores
+        selected = [
+            source for source, score in scores.items()
+            if score >= ROUTE_THRESHOLD or score >= best * RELATIVE_THRESHOLD
+        ]
+        return selected, scores
+
+
+_router = None
+_router_fingerprint = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Router built from the current artifacts, cached in memory until one of them changes"""
+    global _router, _router_fingerprint
+    fingerprint = artifact_fingerprint(
+        [TABLE_DESCRIPTIONS_PATH, CURATED_QUERIES_PATH, INTERNAL_REPORTS_DIR, RESEARCH_REPORTS_DIR]
+    )
+    with _router_lock:
+        if _router is None or fingerprint != _router_fingerprint:
+            _router = Router(router_artifacts())
+            _router_fingerprint = fingerprint
+        return _router
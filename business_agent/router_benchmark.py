@@ -0,0 +1,92 @@
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from business_agent.query_benchmark import QUERY_FILES, load_query_pairs
+from business_agent.router import SOURCES, CURATED_QUERIES_PATH, get_router
+
+ROUTER_QUESTIONS_PATH = "./structured_knoledgebase_artifacts/router_questions.json"
+
+# Every question is routed this many times for stable latency percentiles
+DEFAULT_REPEATS = 20
+
+
+def labelled_questions(path=ROUTER_QUESTIONS_PATH):
+    """Hand labelled questions plus every query pair outside the curated set, which only need financial data"""
+    with open(path) as f:
+        questions = [(item["question"], set(item["sources"])) for item in json.load(f)["questions"]]
+    held_out = [file for file in QUERY_FILES if file != CURATED_QUERIES_PATH]
+    questions += [(question, {"financial_data"}) for _, question, _ in load_query_pairs(held_out)]
+    return questions
+
+
+def run_benchmark(questions, repeats):
+    started = time.perf_counter()
+    router = get_router()
+    build_ms = (time.perf_counter() - started) * 1000
+
+    results, timings = [], []
+    for question, expected in questions:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            selected, scores = get_router().route(question)
+            timings.append((time.perf_counter() - started) * 1000)
+        results.append({
+            "question": question,
+            "expected": sorted(expected),
+            "selected": sorted(selected),
+            "scores": {source: round(score, 3) for source, score in scores.items()}
+        })
+
+    exact = sum(set(result["selected"]) == set(result["expected"]) for result in results)
+    covered = sum(set(result["expected"]) <= set(result["selected"]) for result in results)
+    calls = sum(len(result["selected"]) for result in results)
+    return {
+        "questions": len(results),
+        "exact_accuracy": round(exact / len(results), 4),
+        "coverage": round(covered / len(results), 4),
+        "calls_per_question": round(calls / len(results), 3),
+        "calls_saved": round(1 - calls / (len(results) * len(SOURCES)), 4),
+        "build_ms": round(build_ms, 2),
+        "p50_ms": round(statistics.median(timings), 4),
+        "p95_ms": round(float(np.percentile(timings, 95)), 4),
+        "p99_ms": round(float(np.percentile(timings, 99)), 4),
+        "cached_router": router is get_router(),
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure routing accuracy and latency on labelled questions")
+    parser.add_argument("--questions", default=ROUTER_QUESTIONS_PATH, help="labelled questions JSON")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="timed routes per question")
+    parser.add_argument("--verbose", action="store_true", help="print every misrouted question")
+    parser.add_argument("--output", help="also write the full results to this JSON file")
+    args = parser.parse_args(argv)
+
+    summary = run_benchmark(labelled_questions(args.questions), args.repeats)
+
+    if args.verbose:
+        for result in summary["results"]:
+            if result["selected"] != result["expected"]:
+                print(f"MISROUTED {result['question']}\n  expected {result['expected']} "
+                      f"selected {result['selected']} scores {result['scores']}")
+
+    print(f"{summary['questions']} questions: exact {summary['exact_accuracy']:.1%}, "
+          f"coverage {summary['coverage']:.1%}, {summary['calls_per_question']:.2f} of {len(SOURCES)} "
+          f"knowledge bases called ({summary['calls_saved']:.1%} saved)")
+    print(f"build {summary['build_ms']:.1f} ms, route p50 {summary['p50_ms'] * 1000:.0f} us, "
+          f"p95 {summary['p95_ms'] * 1000:.0f} us, p99 {summary['p99_ms'] * 1000:.0f} us")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
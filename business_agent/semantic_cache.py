@@ -0,0 +1,256 @@
+import argparse
+import hashlib
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+
+from business_agent.documents import INTERNAL_REPORTS_DIR, RESEARCH_REPORTS_DIR, document_manifest
+from business_agent.embedding_cache import EMBEDDING_CACHE_DIR, EmbeddingCache, EmbeddingClient
+
+# Questions are embedded at Titan's smallest size, plenty to tell phrasings of the same question apart
+CACHE_DIMENSIONS = 256
+
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 100_000
+
+# A 64 bit random hyperplane sketch of every vector narrows a lookup down to the entries within a Hamming
+# distance that a match above the threshold stays under with a margin of SKETCH_SIGMAS standard deviations,
+# only those get the exact cosine similarity
+SKETCH_BITS = 64
+SKETCH_SIGMAS = 4
+MAX_CANDIDATES = 4096
+
+# The data hash is recomputed at most this often
+VERSION_CHECK_SECONDS = 60
+
+# Years, amounts and counts of a question. Phrasings close in embedding space can differ only in these,
+# "cost breakdown 2023" and "cost breakdown 2022" ask for different answers
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def data_version(paths=None):
+    """Hash of the financial data and the report corpus, any changed file changes it"""
+    if paths is None:
+        # Imported here so the answer stream Lambda, which gets the data version at deploy time, needs no pyarrow
+        from business_agent.datalake import FINANCIAL_DATA_DIR
+        paths = [FINANCIAL_DATA_DIR, INTERNAL_REPORTS_DIR, RESEARCH_REPORTS_DIR]
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(json.dumps(document_manifest(path), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def question_numbers(question):
+    return sorted(NUMBER_PATTERN.findall(question))
+
+
+def numbers_key(numbers):
+    """64 bit hash of the numbers of a question, compared for every candidate in one vectorized pass"""
+    return np.frombuffer(hashlib.blake2b("\0".join(numbers).encode(), digest_size=8).digest(), dtype=np.uint64)[0]
+
+
+def popcount(words):
+    """Set bits of every 64 bit word"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    # NumPy before 2.0 has no popcount, the bytes of each word are unpacked instead
+    return np.unpackbits(words.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def sketch_planes(dimensions):
+    return np.random.default_rng(0).standard_normal((dimensions, SKETCH_BITS)).astype(np.float32)
+
+
+def sketch(vectors, planes):
+    """Side of each random hyperplane a vector falls on, packed into one 64 bit word"""
+    return np.packbits(np.asarray(vectors) @ planes > 0, axis=-1).view(np.uint64)
+
+
+def max_sketch_distance(threshold):
+    """Sketch distance a pair with the threshold's cosine similarity stays under"""
+    flip = np.arccos(np.clip(threshold, -1.0, 1.0)) / np.pi
+    return int(np.ceil(SKETCH_BITS * flip + SKETCH_SIGMAS * np.sqrt(SKETCH_BITS * flip * (1 - flip))))
+
+
+class SemanticCache:
+    """Answers of earlier questions, found again by the embedding similarity of a new phrasing
+
+    Entries live in preallocated NumPy arrays so a lookup is a few vectorized passes: the Hamming distance
+    of one 64 bit sketch per entry narrows the cache down to a few candidates, their exact cosine similarity
+    decides the hit. A hit also needs the same numbers in both questions, so a question about another year
+    never gets the answer of this one. Entries expire after the TTL, the least recently used entry makes room
+    when the cache is full, and every entry is dropped once the hash of the underlying data changes.
+    """
+
+    def __init__(self, embed, threshold=DEFAULT_THRESHOLD, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES, dimensions=CACHE_DIMENSIONS, version=data_version,
+                 clock=time.monotonic):
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version = version
+        self.clock = clock
+        self.lock = threading.Lock()
+
+        self.vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self.planes = sketch_planes(dimensions)
+        self.max_distance = max_sketch_distance(threshold)
+        self.sketches = np.zeros(max_entries, dtype=np.uint64)
+        self.numbers = np.zeros(max_entries, dtype=np.uint64)
+        self.expires = np.full(max_entries, -np.inf)
+        self.last_used = np.full(max_entries, -np.inf)
+        self.entries = [None] * max_entries
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.current_version = version() if version else None
+        self.version_checked = clock()
+
+    def __len__(self):
+        now = self.clock()
+        return int(np.count_nonzero(self.expires[:self.size] > now))
+
+    def check_version(self):
+        """Drop every entry once the data changed, checked at most every VERSION_CHECK_SECONDS"""
+        now = self.clock()
+        if not self.version or now - self.version_checked < VERSION_CHECK_SECONDS:
+            return
+        self.version_checked = now
+        current = self.version()
+        if current != self.current_version:
+            self.current_version = current
+            self.clear()
+
+    def clear(self):
+        self.expires[:] = -np.inf
+        self.last_used[:] = -np.inf
+        self.entries = [None] * self.max_entries
+        self.size = 0
+
+    def search(self, vector, numbers=None):
+        """Best live entry for a normalized vector and its cosine similarity, or (None, -1)
+
+        Given the numbers of a question, only entries whose question has the same numbers are considered.
+        """
+        if self.size == 0:
+            return None, -1.0
+
+        distances = popcount(np.bitwise_xor(self.sketches[:self.size], sketch(vector, self.planes)))
+        candidates = np.flatnonzero(distances <= self.max_distance)
+        if len(candidates) > MAX_CANDIDATES:
+            candidates = candidates[np.argpartition(distances[candidates], MAX_CANDIDATES - 1)[:MAX_CANDIDATES]]
+        candidates = candidates[self.expires[candidates] > self.clock()]
+        if numbers is not None:
+            candidates = candidates[self.numbers[candidates] == numbers_key(numbers)]
+        if not len(candidates):
+            return None, -1.0
+
+        similarities = self.vectors[candidates] @ vector
+        best = int(np.argmax(similarities))
+        return int(candidates[best]), float(similarities[best])
+
+    def lookup(self, question):
+        """Stored answer of the closest earlier question above the threshold, or None"""
+        vector = np.asarray(self.embed(question), dtype=np.float32)
+        with self.lock:
+            self.check_version()
+            slot, similarity = self.search(vector, question_numbers(question))
+            if slot is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.last_used[slot] = self.clock()
+            return {**self.entries[slot], "similarity": round(similarity, 4)}
+
+    def free_slot(self):
+        """Next unused slot, else an expired one, else the least recently used entry"""
+        if self.size < self.max_entries:
+            self.size += 1
+            return self.size - 1
+        expired = np.flatnonzero(self.expires <= self.clock())
+        if len(expired):
+            return int(expired[0])
+        return int(np.argmin(self.last_used))
+
+    def put(self, question, answer, sql=None, vector=None):
+        """Store the answer and SQL of a question"""
+        vector = np.asarray(self.embed(question) if vector is None else vector, dtype=np.float32)
+        with self.lock:
+            self.check_version()
+            now = self.clock()
+            slot = self.free_slot()
+            self.vectors[slot] = vector
+            self.sketches[slot] = sketch(vector, self.planes)[0]
+            self.numbers[slot] = numbers_key(question_numbers(question))
+            self.expires[slot] = now + self.ttl_seconds
+            self.last_used[slot] = now
+            self.entries[slot] = {"question": question, "answer": answer, "sql": sql or []}
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "entries": len(self)
+        }
+
+
+def titan_semantic_cache(bedrock_runtime=None, cache_dir=EMBEDDING_CACHE_DIR, **kwargs):
+    """Semantic cache over Titan embeddings of the questions, themselves cached on disk"""
+    client = EmbeddingClient(EmbeddingCache(dimensions=CACHE_DIMENSIONS, cache_dir=cache_dir), bedrock_runtime)
+    return SemanticCache(client.embed, dimensions=CACHE_DIMENSIONS, **kwargs)
+
+
+def benchmark(entries, lookups, dimensions=CACHE_DIMENSIONS):
+    """Fill a cache with random normalized vectors and time lookups of perturbed copies of them"""
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((entries, dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    queries = {}
+    cache = SemanticCache(lambda question: queries[question], max_entries=entries, dimensions=dimensions,
+                          version=None)
+    for row in range(entries):
+        cache.put(f"question {row}", f"answer {row}", vector=vectors[row])
+
+    timings, correct = [], 0
+    for row in rng.integers(0, entries, lookups):
+        query = vectors[row] + rng.standard_normal(dimensions).astype(np.float32) * 0.01
+        # A rephrasing of the entry's question, the numbers in it stay the same
+        queries[f"question {row}"] = query / np.linalg.norm(query)
+        started = time.perf_counter()
+        hit = cache.lookup(f"question {row}")
+        timings.append((time.perf_counter() - started) * 1000)
+        correct += hit is not None and hit["answer"] == f"answer {row}"
+
+    return {
+        "entries": entries,
+        "hit_accuracy": round(correct / lookups, 4),
+        "p50_ms": round(statistics.median(timings), 4),
+        "p95_ms": round(float(np.percentile(timings, 95)), 4)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure semantic cache lookup latency on synthetic entries")
+    parser.add_argument("--entries", type=int, default=DEFAULT_MAX_ENTRIES, help="cached entries")
+    parser.add_argument("--lookups", type=int, default=1000, help="timed lookups")
+    args = parser.parse_args(argv)
+
+    result = benchmark(args.entries, args.lookups)
+    print(f"{result['entries']} entries: lookup p50 {result['p50_ms']:.3f} ms, p95 {result['p95_ms']:.3f} ms, "
+          f"{result['hit_accuracy']:.1%} of lookups hit their own entry")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import os
+
+SQL_BOOTSTRAP_DIR = "./sql/bootstrap"
+SQL_ACCESS_DIR = "./sql/access"
+
+
+def split_statements(sql):
+    """Statements of a script, without comment lines. Statements end with a semicolon at the end of a line"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    statements, current = [], []
+    for line in lines:
+        current.append(line)
+        if line.rstrip().endswith(";"):
+            statements.append(" ".join(" ".join(current).split())[:-1])
+            current = []
+    if " ".join(current).strip():
+        statements.append(" ".join(" ".join(current).split()))
+    return statements
+
+
+def load_stages(directory, parameters, generated=None, roles=()):
+    """Ordered stages of statement groups, read from the NN_stage directories of .sql scripts
+
+    Stages run one after another. The scripts of one stage are independent of each other, every script is a
+    group of statements that runs as one transaction next to the other groups of its stage. Placeholders like
+    {rollup_schema} are filled from parameters. A script with a {role} placeholder becomes one group per role,
+    so the same grants reach every role that reads the data. Generated groups are added to the stage of their
+    name, so SQL built in Python runs between the scripts.
+    """
+    stages = {}
+    for stage in sorted(os.listdir(directory)):
+        stage_dir = os.path.join(directory, stage)
+        if not os.path.isdir(stage_dir):
+            continue
+        stages[stage] = []
+        for file_name in sorted(os.listdir(stage_dir)):
+            if not file_name.endswith(".sql"):
+                continue
+            with open(os.path.join(stage_dir, file_name)) as f:
+                script = f.read()
+            name = f"{stage}/{file_name}"
+            if "{role}" in script:
+                groups = [(f"{name}/{index}", {**parameters, "role": role}) for index, role in enumerate(roles)]
+            else:
+                groups = [(name, parameters)]
+            for group_name, group_parameters in groups:
+                statements = split_statements(script.format(**group_parameters))
+                if statements:
+                    stages[stage].append({"Name": group_name, "Statements": statements})
+
+    for stage, groups in (generated or {}).items():
+        stages.setdefault(stage, []).extend(groups)
+
+    return [stages[stage] for stage in sorted(stages) if stages[stage]]
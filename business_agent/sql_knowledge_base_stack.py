@@ -0,0 +1,332 @@
+from aws_cdk import (
+    NestedStack,
+    aws_bedrock as bedrock,
+    aws_iam as iam,
+    aws_redshiftserverless as redshiftserverless,
+    aws_secretsmanager as secretsmanager,
+    RemovalPolicy
+)
+from constructs import Construct
+from business_agent.bootstrap_stack import BootstrapStack, BootstrapTask
+from business_agent.capacity_profiles import (
+    DEFAULT_CAPACITY_PROFILE, QUERY_EXECUTION_TIMEOUT, config_parameters, get_capacity_profile
+)
+from business_agent.data_lake_stack import DataLakeStack
+from business_agent.datalake import table_definitions
+from business_agent.financial_data_append import FinancialDataAppend
+from business_agent.knowledge_base_sync import KnowledgeBaseSync
+from business_agent.rollups import (
+    GLUE_DATABASE, ROLLUPS, ROLLUP_DATABASE, ROLLUP_SCHEMA, SPECTRUM_SCHEMA, rollup_groups, rollup_stats_groups,
+    rollup_table_name
+)
+from business_agent.sql_bootstrap import SQL_ACCESS_DIR, SQL_BOOTSTRAP_DIR, load_stages
+from business_agent.sql_lint import CURATED_QUERIES_PATH, checked_query_pairs
+from business_agent.table_profiles import column_description, table_description, table_profiles
+import json
+
+
+class SqlKnowledgeBaseStack(NestedStack):
+    """Redshift Serverless query engine, the financial rollups and the SQL knowledge base on top of them"""
+
+    def __init__(self, scope: Construct, construct_id: str, *, data_lake: DataLakeStack, bootstrap: BootstrapStack,
+                 **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        # Create a secret holding the Redshift admin credentials, used by the SQL bootstrap
+        redshift_admin_secret = secretsmanager.Secret(
+            self, "RedshiftAdminSecret",
+            generate_secret_string=secretsmanager.SecretStringGenerator(
+                secret_string_template=json.dumps({"username": "admin_user"}),
+                generate_string_key="password",
+                exclude_punctuation=True,
+                require_each_included_type=True
+            ),
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # Create a role Redshift uses to read the financial data catalog and files through Spectrum
+        redshift_spectrum_role = iam.Role(
+            self, "RedshiftSpectrumRole",
+            assumed_by=iam.CompositePrincipal(
+                iam.ServicePrincipal("redshift.amazonaws.com"),
+                iam.ServicePrincipal("redshift-serverless.amazonaws.com")
+            )
+        )
+
+        redshift_spectrum_role.add_to_policy(
+            iam.PolicyStatement(
+                actions=[
+                    "glue:GetDatabase",
+                    "glue:GetDatabases",
+                    "glue:GetTable",
+                    "glue:GetTables",
+                    "glue:GetPartition",
+                    "glue:GetPartitions",
+                    "glue:BatchGetPartition"
+                ],
+                resources=["*"]
+            )
+        )
+
+        data_lake.financial_data_bucket.grant_read(redshift_spectrum_role)
+
+        # Create a Redshift Serverless namespace
+        redshift_namespace = redshiftserverless.CfnNamespace(
+            self, "FinancialDataNamespace",
+            namespace_name="financial-data-namespace",
+            admin_username="admin_user",
+            admin_user_password=redshift_admin_secret.secret_value_from_json("password").unsafe_unwrap(),
+            db_name=ROLLUP_DATABASE,
+            iam_roles=[redshift_spectrum_role.role_arn],
+            default_iam_role_arn=redshift_spectrum_role.role_arn
+        )
+
+        # Size the workgroup with a named capacity profile, chosen with the redshiftCapacityProfile context
+        capacity_profile = get_capacity_profile(
+            self.node.try_get_context("redshiftCapacityProfile") or DEFAULT_CAPACITY_PROFILE
+        )
+
+        # Create a Redshift Serverless workgroup that aborts runaway generated SQL
+        redshift_workgroup = redshiftserverless.CfnWorkgroup(
+            self, "FinancialDataWorkgroup",
+            workgroup_name="financial-data-workgroup",
+            namespace_name=redshift_namespace.namespace_name,
+            base_capacity=capacity_profile["base_capacity"],
+            max_capacity=capacity_profile["max_capacity"],
+            config_parameters=[
+                redshiftserverless.CfnWorkgroup.ConfigParameterProperty(**parameter)
+                for parameter in config_parameters(capacity_profile)
+            ],
+            enhanced_vpc_routing=False,
+            publicly_accessible=False
+        )
+
+        # Add dependency to ensure namespace is created before the workgroup
+        redshift_workgroup.add_dependency(redshift_namespace)
+
+        # Cap the RPU hours the workgroup uses per period, CloudFormation has no resource for usage limits
+        for usage_limit in capacity_profile["usage_limits"]:
+            BootstrapTask(
+                self, f"RedshiftUsageLimit{usage_limit['period'].capitalize()}",
+                bootstrap=bootstrap,
+                task="usage_limit",
+                properties={
+                    "WorkgroupArn": redshift_workgroup.attr_workgroup_workgroup_arn,
+                    "Amount": usage_limit["rpu_hours"],
+                    "Period": usage_limit["period"],
+                    "BreachAction": usage_limit["breach_action"]
+                },
+                statements=[iam.PolicyStatement(
+                    actions=[
+                        "redshift-serverless:CreateUsageLimit",
+                        "redshift-serverless:UpdateUsageLimit",
+                        "redshift-serverless:DeleteUsageLimit"
+                    ],
+                    resources=["*"]
+                )]
+            )
+
+        # The sql task runs statements as the admin user through the Redshift Data API
+        sql_task_statements = [
+            iam.PolicyStatement(
+                actions=[
+                    "redshift-data:BatchExecuteStatement",
+                    "redshift-data:DescribeStatement",
+                    "redshift-serverless:GetCredentials"
+                ],
+                resources=["*"]
+            ),
+            iam.PolicyStatement(
+                actions=["secretsmanager:GetSecretValue", "secretsmanager:DescribeSecret"],
+                resources=[redshift_admin_secret.secret_arn]
+            )
+        ]
+
+        sql_task_properties = {
+            "Workgroup": redshift_workgroup.workgroup_name,
+            "Database": ROLLUP_DATABASE,
+            "SecretArn": redshift_admin_secret.secret_arn
+        }
+
+        sql_parameters = {
+            "glue_database": GLUE_DATABASE,
+            "spectrum_schema": SPECTRUM_SCHEMA,
+            "rollup_schema": ROLLUP_SCHEMA
+        }
+
+        # Run the scripts under sql/bootstrap with the materialized rollups behind the curated queries and their
+        # planner statistics, re-run whenever any of their SQL changes
+        redshift_bootstrap_resource = BootstrapTask(
+            self, "RedshiftBootstrap",
+            bootstrap=bootstrap,
+            task="sql",
+            properties={
+                **sql_task_properties,
+                "Name": "financial-bootstrap",
+                "Stages": load_stages(
+                    SQL_BOOTSTRAP_DIR, sql_parameters,
+                    generated={"20_rollups": rollup_groups(), "40_stats": rollup_stats_groups()}
+                )
+            },
+            statements=sql_task_statements
+        ).resource
+
+        redshift_bootstrap_resource.node.add_dependency(redshift_workgroup)
+
+        # Append monthly files dropped into the data lake and refresh the rollups built from them
+        FinancialDataAppend(
+            self, "FinancialDataAppend",
+            data_lake=data_lake,
+            workgroup_name=redshift_workgroup.workgroup_name,
+            database=ROLLUP_DATABASE,
+            secret=redshift_admin_secret
+        )
+
+        # Create IAM role for Bedrock Knowledge Base
+        knowledge_base_role = iam.Role(
+            self, 'KnowledgeBaseRole',
+            assumed_by=iam.ServicePrincipal('bedrock.amazonaws.com'),
+        )
+
+        # Add Bedrock permissions to the role
+        knowledge_base_role.add_to_policy(iam.PolicyStatement(
+            actions=[
+                'bedrock:*',
+                'glue:*',
+                'redshift-serverless:*',
+                'redshift-data:*',
+                'sqlworkbench:*',
+                's3:*'
+            ],
+            resources=['*'],
+        ))
+
+        # Create Knowledge Base
+        # Curated queries are checked against the catalog and rewritten into pruning friendly predicates,
+        # an invalid pair fails the synth
+        curated_queries = checked_query_pairs(CURATED_QUERIES_PATH)
+
+        # Column statistics, time spans and join keys profiled from the source data give the query generator
+        # the values it would otherwise guess
+        profiles = table_profiles()
+
+        financial_data_kb_name = 'financial-data-knowledge-base'
+        self.financial_data_kb = bedrock.CfnKnowledgeBase(
+            self, 'FinancialDataKb',
+            name=financial_data_kb_name,
+            role_arn=knowledge_base_role.role_arn,
+            knowledge_base_configuration=bedrock.CfnKnowledgeBase.KnowledgeBaseConfigurationProperty(
+                type="SQL",
+                sql_knowledge_base_configuration=bedrock.CfnKnowledgeBase.SqlKnowledgeBaseConfigurationProperty(
+                    type="REDSHIFT",
+                    redshift_configuration=bedrock.CfnKnowledgeBase.RedshiftConfigurationProperty(
+                        query_engine_configuration=bedrock.CfnKnowledgeBase.RedshiftQueryEngineConfigurationProperty(
+                            type="SERVERLESS",
+                            serverless_configuration=bedrock.CfnKnowledgeBase.RedshiftServerlessConfigurationProperty(
+                                auth_configuration=bedrock.CfnKnowledgeBase.RedshiftServerlessAuthConfigurationProperty(
+                                    type="IAM",
+                                ),
+                                workgroup_arn=redshift_workgroup.attr_workgroup_workgroup_arn
+                            )
+                        ),
+                        storage_configurations=[bedrock.CfnKnowledgeBase.RedshiftQueryEngineStorageConfigurationProperty(
+                            type="AWS_DATA_CATALOG",
+                            aws_data_catalog_configuration=bedrock.CfnKnowledgeBase.RedshiftQueryEngineAwsDataCatalogStorageConfigurationProperty(
+                                table_names=[f"{GLUE_DATABASE}.*"]
+                            )
+                        ), bedrock.CfnKnowledgeBase.RedshiftQueryEngineStorageConfigurationProperty(
+                            type="REDSHIFT",
+                            redshift_configuration=bedrock.CfnKnowledgeBase.RedshiftQueryEngineRedshiftStorageConfigurationProperty(
+                                database_name=ROLLUP_DATABASE
+                            )
+                        )],
+                        query_generation_configuration=bedrock.CfnKnowledgeBase.QueryGenerationConfigurationProperty(
+                            execution_timeout_seconds=QUERY_EXECUTION_TIMEOUT,
+                            generation_context=bedrock.CfnKnowledgeBase.QueryGenerationContextProperty(
+                                curated_queries=[
+                                    bedrock.CfnKnowledgeBase.CuratedQueryProperty(
+                                        natural_language=query["naturalLanguage"],
+                                        sql=query["sqlQuery"]
+                                    ) for query in curated_queries
+                                ],
+                                tables=[
+                                    bedrock.CfnKnowledgeBase.QueryGenerationTableProperty(
+                                        name=f"awsdatacatalog.{GLUE_DATABASE}.{table['name']}",
+                                        columns=[
+                                            bedrock.CfnKnowledgeBase.QueryGenerationColumnProperty(
+                                                name=column["name"],
+                                                description=column_description(
+                                                    column["description"],
+                                                    profiles["tables"][table["name"]]["columns"].get(column["name"])
+                                                )
+                                            ) for column in table["columns"] + table["partition_keys"]
+                                        ],
+                                        description=table_description(table["name"], profiles)
+                                    ) for table in table_definitions()
+                                ] + [
+                                    bedrock.CfnKnowledgeBase.QueryGenerationTableProperty(
+                                        name=rollup_table_name(rollup),
+                                        columns=[
+                                            bedrock.CfnKnowledgeBase.QueryGenerationColumnProperty(
+                                                name=column_name,
+                                                description=column_description
+                                            ) for column_name, column_description in rollup["columns"].items()
+                                        ],
+                                        description=f"Materialized view: {rollup['description']}, prefer it over "
+                                                    f"aggregating {', '.join(rollup['source_tables'])} directly"
+                                    ) for rollup in ROLLUPS
+                                ]
+                            )
+                        )
+                    )
+                )
+            )
+        )
+
+        # Add dependencies to ensure resources are created in correct order
+        self.financial_data_kb.node.add_dependency(redshift_workgroup)
+        self.financial_data_kb.node.add_dependency(knowledge_base_role)
+
+        financial_data_data_source = bedrock.CfnDataSource(
+            self, 'FinancialDataDataSource',
+            data_source_configuration=bedrock.CfnDataSource.DataSourceConfigurationProperty(
+                type="REDSHIFT_METADATA",
+            ),
+            knowledge_base_id=self.financial_data_kb.attr_knowledge_base_id,
+            name='financial-data-datasource',
+            description='Data source for financial data',
+        )
+
+        financial_data_data_source.node.add_dependency(self.financial_data_kb)
+
+        # Sync the table metadata once the rollups it describes exist
+        kb_sync = KnowledgeBaseSync(
+            self, 'KBSync',
+            bootstrap=bootstrap,
+            sources=[{"knowledge_base": self.financial_data_kb, "data_source": financial_data_data_source}]
+        )
+
+        kb_sync.resource.node.add_dependency(redshift_bootstrap_resource)
+
+        # Run the grants under sql/access for the knowledge base role and the reader roles named in the
+        # redshiftReaderRoles context, letting each read the data catalog through Redshift. A reader role must
+        # have connected to the workgroup once, like the knowledge base role does during the sync.
+        reader_roles = self.node.try_get_context('redshiftReaderRoles') or []
+        if isinstance(reader_roles, str):
+            reader_roles = json.loads(reader_roles)
+        redshift_authorizer_resource = BootstrapTask(
+            self, 'RedshiftAuthorizer',
+            bootstrap=bootstrap,
+            task='sql',
+            properties={
+                **sql_task_properties,
+                'Name': 'financial-access',
+                'Stages': load_stages(
+                    SQL_ACCESS_DIR, sql_parameters, roles=[knowledge_base_role.role_name, *reader_roles]
+                )
+            },
+            statements=sql_task_statements
+        ).resource
+
+        # Grant access once the synced metadata exists
+        redshift_authorizer_resource.node.add_dependency(kb_sync.resource)
@@ -0,0 +1,229 @@
+import argparse
+import json
+import re
+import sys
+
+from business_agent.datalake import DATE_COLUMN, PARTITION_COLUMN, table_definitions
+from business_agent.local_sql import connect
+from business_agent.query_benchmark import QUERY_FILES
+from business_agent.router import CURATED_QUERIES_PATH
+
+LIKE_OPERATORS = {"~~", "!~~", "~~*", "!~~*"}
+
+# Questions about a development over time, their SQL must not pin the data to a single year
+OVER_TIME = re.compile(r"\b(over time|trend|changed?|past \d+ years|year over year)\b", re.IGNORECASE)
+
+# Every table with a monthly date column is partitioned by the year of that date, so a year taken from the
+# date is the partition column. Each rewrite keeps the table qualifier of the column it replaces.
+QUALIFIED_DATE = rf"((?:\w+\.)?){DATE_COLUMN}"
+YEAR_OF_DATE = (
+    rf"(?:EXTRACT\(\s*YEAR\s+FROM\s+{QUALIFIED_DATE}\s*\)"
+    rf"|(?:DATE_PART|DATEPART)\(\s*'?year'?\s*,\s*{QUALIFIED_DATE}\s*\)"
+    rf"|YEAR\(\s*{QUALIFIED_DATE}\s*\)"
+    rf"|(?:SUBSTRING|SUBSTR|LEFT)\(\s*(?:CAST\(\s*)?{QUALIFIED_DATE}(?:\s+AS\s+\w+\s*\))?(?:\s*,\s*1)?\s*,\s*4\s*\))"
+)
+REWRITES = [
+    (
+        "month prefix LIKE on the date",
+        re.compile(rf"{QUALIFIED_DATE}\s+LIKE\s+'(\d{{4}})-(\d{{2}})-?%'", re.IGNORECASE),
+        lambda m: f"{m[1]}{PARTITION_COLUMN} = {m[2]} AND {m[1]}{DATE_COLUMN} = DATE '{m[2]}-{m[3]}-01'"
+    ),
+    (
+        "year prefix LIKE on the date",
+        re.compile(rf"{QUALIFIED_DATE}\s+LIKE\s+'(\d{{4}})-?%'", re.IGNORECASE),
+        lambda m: f"{m[1]}{PARTITION_COLUMN} = {m[2]}"
+    ),
+    (
+        "year of the date compared to a string",
+        re.compile(rf"{YEAR_OF_DATE}\s*(=|<>|!=|>=|<=|>|<)\s*'(\d{{4}})'", re.IGNORECASE),
+        lambda m: f"{next(group for group in m.groups()[:4] if group is not None)}{PARTITION_COLUMN} "
+                  f"{m[5]} {m[6]}"
+    ),
+    (
+        "year computed from the date",
+        re.compile(YEAR_OF_DATE, re.IGNORECASE),
+        lambda m: f"{next(group for group in m.groups() if group is not None)}{PARTITION_COLUMN}"
+    )
+]
+
+
+def rewrite(sql):
+    """Pruning friendly SQL and the names of the rewrites applied to it"""
+    applied = []
+    for name, pattern, replacement in REWRITES:
+        sql, count = pattern.subn(replacement, sql)
+        if count:
+            applied.append(name)
+    return sql, applied
+
+
+def parse(connection, sql):
+    """Statements of a query as DuckDB's syntax tree"""
+    tree = json.loads(connection.execute("SELECT json_serialize_sql(?)", [sql]).fetchone()[0])
+    if tree.get("error"):
+        raise ValueError(tree.get("error_message", "the query does not parse"))
+    return tree["statements"]
+
+
+def walk(node):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from walk(value)
+
+
+def column(node):
+    return node["column_names"][-1].lower() if node.get("class") == "COLUMN_REF" else None
+
+
+def constant(node):
+    return node["value"].get("value") if node.get("class") == "CONSTANT" else None
+
+
+def predicates(statements):
+    """Filter and join conditions of every select in the statements, subqueries included"""
+    for node in walk(statements):
+        if node.get("type") == "SELECT_NODE":
+            if node.get("where_clause"):
+                yield node["where_clause"]
+            if node.get("having"):
+                yield node["having"]
+        if node.get("condition") and node.get("type") == "JOIN":
+            yield node["condition"]
+
+
+def non_sargable(statements):
+    """Descriptions of predicates that hide the date or partition column behind a function or a LIKE"""
+    findings = []
+    for predicate in predicates(statements):
+        for node in walk(predicate):
+            children = node.get("children", [])
+            if node.get("class") == "CAST":
+                children = [node["child"]]
+            wrapped = [column(child) for child in children if column(child) in (DATE_COLUMN, PARTITION_COLUMN)]
+            if not wrapped:
+                continue
+            if node.get("class") == "FUNCTION" and node["function_name"] in LIKE_OPERATORS:
+                findings.append(f"LIKE on {wrapped[0]}")
+            elif node.get("class") == "CAST" or (node.get("class") == "FUNCTION" and not node["is_operator"]):
+                name = node["function_name"] if node.get("class") == "FUNCTION" else "CAST"
+                findings.append(f"{name}({wrapped[0]}) in a predicate")
+    return findings
+
+
+def pinned_years(statements):
+    """Years the filters compare the partition column to with equality, per table qualifier"""
+    years = set()
+    for predicate in predicates(statements):
+        for node in walk(predicate):
+            if node.get("type") == "COMPARE_EQUAL" and column(node["left"]) == PARTITION_COLUMN:
+                years.add((tuple(node["left"]["column_names"][:-1]), constant(node["right"])))
+    return years
+
+
+def catalog_errors(definitions):
+    """Columns of the data lake without a description in table_column_description.json"""
+    return [
+        f"{table['name']}.{column_definition['name']} has no description"
+        for table in definitions for column_definition in table["columns"] if not column_definition["description"]
+    ]
+
+
+def lint_query(connection, question, sql):
+    """Rewritten SQL, warnings about what could not be rewritten and errors that make the pair invalid"""
+    rewritten, applied = rewrite(sql)
+    result = {"sql": rewritten, "rewrites": applied, "warnings": [], "errors": []}
+
+    try:
+        statements = parse(connection, rewritten)
+        # Binding the query against the catalog checks its tables and columns without scanning any data
+        connection.execute(f"EXPLAIN {rewritten}")
+    except Exception as e:
+        result["errors"].append(f"{type(e).__name__}: {str(e).splitlines()[0]}")
+        return result
+
+    result["warnings"] = non_sargable(statements)
+
+    years = pinned_years(statements)
+    if OVER_TIME.search(question) and len(years) == 1:
+        result["errors"].append(
+            f"the question asks about a change over time but the query only reads {PARTITION_COLUMN} "
+            f"{next(iter(years))[1]}"
+        )
+    return result
+
+
+def lint_query_pairs(path, connection=None):
+    """Lint every query pair of a file, returning the pairs with rewritten SQL and the report by index"""
+    connection = connection or connect()
+    with open(path) as f:
+        query_pairs = json.load(f)["queryPairs"]
+
+    rewritten, report = [], {}
+    for index, query in enumerate(query_pairs):
+        result = lint_query(connection, query["naturalLanguage"], query["sqlQuery"])
+        rewritten.append({**query, "sqlQuery": result["sql"]})
+        if result["rewrites"] or result["warnings"] or result["errors"]:
+            report[index] = {"question": query["naturalLanguage"], **result}
+    return rewritten, report
+
+
+def checked_query_pairs(path=CURATED_QUERIES_PATH):
+    """Query pairs with pruning friendly SQL, raising when a pair references unknown tables or columns
+
+    Used at synth time, so the examples the query generator copies are valid and fast.
+    """
+    errors = catalog_errors(table_definitions())
+    query_pairs, report = lint_query_pairs(path)
+
+    for index, result in report.items():
+        for name in result["rewrites"]:
+            print(f"{path}#{index}: rewrote {name}")
+        for warning in result["warnings"]:
+            print(f"{path}#{index}: {warning}")
+        errors += [f"{path}#{index} ({result['question']}): {error}" for error in result["errors"]]
+
+    if errors:
+        raise ValueError("Invalid curated query pairs:\n" + "\n".join(errors))
+    return query_pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lint query pairs for invalid references and unprunable predicates")
+    parser.add_argument("paths", nargs="*", default=QUERY_FILES)
+    parser.add_argument("--fix", action="store_true", help="write the rewritten SQL back into the files")
+    args = parser.parse_args()
+
+    connection = connect()
+    errors = catalog_errors(table_definitions())
+    for error in errors:
+        print(f"error: {error}")
+    failed = bool(errors)
+    for path in args.paths:
+        query_pairs, report = lint_query_pairs(path, connection)
+        for index, result in report.items():
+            print(f"{path}#{index}: {result['question']}")
+            for name in result["rewrites"]:
+                print(f"  rewrote {name}: {result['sql']}")
+            for warning in result["warnings"]:
+                print(f"  warning: {warning}")
+            for error in result["errors"]:
+                print(f"  error: {error}")
+            failed = failed or bool(result["errors"])
+
+        if args.fix and any(result["rewrites"] for result in report.values()):
+            with open(path) as f:
+                content = json.load(f)
+            content["queryPairs"] = query_pairs
+            with open(path, "w") as f:
+                json.dump(content, f, indent=2)
+                f.write("\n")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import argparse
+import collections
+import json
+import os
+import re
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+
+from business_agent.datalake import (
+    DATE_COLUMN, FINANCIAL_DATA_DIR, PARTITION_COLUMN, source_files, source_hash, typed_columns
+)
+
+TABLE_PROFILES_PATH = "./.build/table_profiles.json"
+
+# CSVs are read in blocks of this many bytes, so a table is profiled without loading all of it
+BLOCK_SIZE = 16 * 1024 * 1024
+
+# Distinct values are counted exactly up to this many per column, beyond it only the lower bound is known
+MAX_TRACKED_VALUES = 10000
+TOP_VALUES = 5
+
+# Column types are inferred from the first block only. A later value that does not fit, a 1.5 in a column of
+# whole numbers, fails the conversion, the column is then read as the next wider type and the table again.
+CONVERSION_ERROR = re.compile(r"In CSV column #(\d+): .*CSV conversion error to (\w+)")
+WIDER_TYPES = {"int64": pa.float64()}
+
+# Columns with this suffix that appear in more than one table are join keys
+JOIN_KEY_SUFFIX = "_id"
+
+# Bedrock accepts descriptions of query generation tables and columns up to this many characters
+DESCRIPTION_LIMIT = 200
+
+
+class ColumnProfile:
+    """Statistics of one column, updated batch by batch"""
+
+    def __init__(self, data_type):
+        self.type = data_type
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.values = collections.Counter()
+        self.overflow = False
+
+    def update(self, array):
+        self.count += len(array)
+        self.nulls += array.null_count
+        if self.nulls == self.count:
+            return
+
+        min_max = pc.min_max(array).as_py()
+        if min_max["min"] is not None:
+            self.min = min_max["min"] if self.min is None else min(self.min, min_max["min"])
+            self.max = min_max["max"] if self.max is None else max(self.max, min_max["max"])
+
+        if self.overflow:
+            return
+        for entry in pc.value_counts(array.drop_null()).to_pylist():
+            self.values[entry["values"]] += entry["counts"]
+        if len(self.values) > MAX_TRACKED_VALUES:
+            # Only the lower bound of the distinct count is kept from here on
+            self.overflow = True
+            self.values = collections.Counter(dict(self.values.most_common(MAX_TRACKED_VALUES)))
+
+    def to_dict(self):
+        profile = {
+            "type": str(self.type),
+            "count": self.count,
+            "nulls": self.nulls,
+            "min": self.min.isoformat() if hasattr(self.min, "isoformat") else self.min,
+            "max": self.max.isoformat() if hasattr(self.max, "isoformat") else self.max,
+            "distinct": len(self.values),
+            "distinct_is_lower_bound": self.overflow
+        }
+        if pa.types.is_string(self.type) or pa.types.is_boolean(self.type):
+            profile["top_values"] = [value for value, _ in self.values.most_common(TOP_VALUES)]
+        return profile
+
+
+class NarrowColumn(Exception):
+    """A value of a CSV column does not fit the type inferred from the first block"""
+
+    def __init__(self, header, wider_type):
+        super().__init__(f"{header} needs {wider_type}")
+        self.header = header
+        self.wider_type = wider_type
+
+
+def scan_table(paths, block_size, column_types):
+    columns = {}
+    rows = 0
+    for path in paths:
+        reader = pv.open_csv(
+            path,
+            read_options=pv.ReadOptions(block_size=block_size),
+            convert_options=pv.ConvertOptions(column_types=column_types)
+        )
+        try:
+            for batch in reader:
+                table = typed_columns(pa.Table.from_batches([batch]))
+                rows += table.num_rows
+                for name in table.column_names:
+                    if name not in columns:
+                        columns[name] = ColumnProfile(table.schema.field(name).type)
+                    for chunk in table[name].chunks:
+                        columns[name].update(chunk)
+        except pa.ArrowInvalid as e:
+            match = CONVERSION_ERROR.search(str(e))
+            if not match:
+                raise
+            raise NarrowColumn(reader.schema.names[int(match[1])], WIDER_TYPES.get(match[2], pa.string())) from e
+
+    return {"rows": rows, "columns": {name: column.to_dict() for name, column in columns.items()}}
+
+
+def profile_table(paths, block_size=BLOCK_SIZE):
+    """Row count and column statistics of one table, streaming its CSV files block by block"""
+    column_types = {}
+    while True:
+        try:
+            return scan_table(paths, block_size, column_types)
+        except NarrowColumn as e:
+            if column_types.get(e.header) == e.wider_type:
+                raise
+            column_types[e.header] = e.wider_type
+
+
+def join_keys(profiles):
+    """Tables of every identifier column that appears in more than one table"""
+    tables = collections.defaultdict(list)
+    for table_name, profile in profiles.items():
+        for name in profile["columns"]:
+            if name.endswith(JOIN_KEY_SUFFIX):
+                tables[name].append(table_name)
+    return {name: sorted(names) for name, names in sorted(tables.items()) if len(names) > 1}
+
+
+def build_table_profiles(source_dir=FINANCIAL_DATA_DIR, block_size=BLOCK_SIZE):
+    profiles = {
+        table_name: profile_table(paths, block_size) for table_name, paths in source_files(source_dir).items()
+    }
+    return {"tables": profiles, "join_keys": join_keys(profiles)}
+
+
+def table_profiles(source_dir=FINANCIAL_DATA_DIR, profiles_path=TABLE_PROFILES_PATH):
+    """Profiles of every financial data table, profiled again only when the CSV sources changed"""
+    current_hash = source_hash(source_dir)
+    if os.path.exists(profiles_path):
+        with open(profiles_path) as f:
+            cached = json.load(f)
+        if cached.get("source_hash") == current_hash:
+            return cached["profiles"]
+
+    profiles = build_table_profiles(source_dir)
+    os.makedirs(os.path.dirname(profiles_path), exist_ok=True)
+    with open(profiles_path, "w") as f:
+        json.dump({"source_hash": current_hash, "profiles": profiles}, f, indent=2)
+    return profiles
+
+
+def truncate(text, limit=DESCRIPTION_LIMIT):
+    return text if len(text) <= limit else text[:limit - 3].rstrip(" ,;") + "..."
+
+
+def format_value(value):
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def column_summary(column):
+    """Short statistics of a column for the query generation context"""
+    parts = []
+    if column.get("top_values"):
+        distinct = f"{column['distinct']}+" if column["distinct_is_lower_bound"] else str(column["distinct"])
+        parts.append(f"{distinct} distinct, e.g. {', '.join(map(str, column['top_values']))}")
+    elif column["min"] is not None:
+        parts.append(f"{format_value(column['min'])} to {format_value(column['max'])}")
+    if column["nulls"]:
+        parts.append(f"{column['nulls'] / column['count']:.0%} null")
+    return "; ".join(parts)
+
+
+def column_description(description, column):
+    """Hand-written description of a column followed by its profile"""
+    summary = column_summary(column) if column else ""
+    text = f"{description.rstrip('. ')}. {summary}" if description and summary else description or summary
+    return truncate(text)
+
+
+def table_description(table_name, profiles):
+    """Row count, first period and join keys of a table for the query generation context
+
+    Only the start of the data is given, months appended after the deploy would make an end date wrong.
+    """
+    profile = profiles["tables"][table_name]
+    parts = [f"{table_name}: {profile['rows']} rows"]
+
+    span = profile["columns"].get(DATE_COLUMN) or profile["columns"].get(PARTITION_COLUMN)
+    if span and span["min"] is not None:
+        grain = "monthly" if DATE_COLUMN in profile["columns"] else "yearly"
+        parts.append(f"{grain} from {span['min']} onward")
+
+    joins = [
+        f"{key} joins {', '.join(name for name in tables if name != table_name)}"
+        for key, tables in profiles["join_keys"].items() if table_name in tables
+    ]
+    return truncate("; ".join([", ".join(parts)] + joins))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the financial data tables for SQL generation")
+    parser.add_argument("--source-dir", default=FINANCIAL_DATA_DIR)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE, help="bytes of CSV read per block")
+    parser.add_argument("--context", action="store_true",
+                        help="print the table descriptions injected into the knowledge base")
+    args = parser.parse_args()
+
+    profiles = build_table_profiles(args.source_dir, args.block_size)
+    if args.context:
+        for table_name in profiles["tables"]:
+            print(table_description(table_name, profiles))
+    else:
+        print(json.dumps(profiles, indent=2))
+
+
+if __name__ == "__main__":
+    main()
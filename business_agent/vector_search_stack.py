@@ -0,0 +1,141 @@
+from aws_cdk import (
+    NestedStack,
+    aws_opensearchserverless as opensearchserverless,
+    aws_iam as iam,
+    CfnDeletionPolicy
+)
+from constructs import Construct
+from business_agent.bootstrap_stack import BootstrapStack, BootstrapTask
+from business_agent.index_profiles import get_profile, index_mapping, index_name, resolve_profiles
+import json
+
+COLLECTION_NAME = "business-agent-collection"
+
+# AOSS policy names are limited to 32 characters and must stay stable across deployments
+ENCRYPTION_POLICY_NAME = "business-agent-encryption"
+NETWORK_POLICY_NAME = "business-agent-network"
+DATA_ACCESS_POLICY_NAME = "business-agent-data-access"
+
+RESEARCH_REPORTS_INDEX = "research_reports_index"
+INTERNAL_REPORTS_INDEX = "internal_reports_index"
+
+
+class VectorSearchStack(NestedStack):
+    """OpenSearch Serverless collection and the vector indices the document knowledge bases write to"""
+
+    def __init__(self, scope: Construct, construct_id: str, *, bootstrap: BootstrapStack, **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        self.collection_name = COLLECTION_NAME
+
+        # Every index uses a named profile, overridable per index with the vectorIndexProfiles context
+        profile_names = resolve_profiles(
+            [RESEARCH_REPORTS_INDEX, INTERNAL_REPORTS_INDEX],
+            self.node.try_get_context("vectorIndexProfiles")
+        )
+        self.research_reports_profile = get_profile(profile_names[RESEARCH_REPORTS_INDEX])
+        self.internal_reports_profile = get_profile(profile_names[INTERNAL_REPORTS_INDEX])
+        self.research_reports_index = index_name(RESEARCH_REPORTS_INDEX, profile_names[RESEARCH_REPORTS_INDEX])
+        self.internal_reports_index = index_name(INTERNAL_REPORTS_INDEX, profile_names[INTERNAL_REPORTS_INDEX])
+
+        # Create security policy for the AOSS collection
+        security_policy = opensearchserverless.CfnSecurityPolicy(
+            self, "CollectionEncryptionPolicy",
+            name=ENCRYPTION_POLICY_NAME,
+            type="encryption",
+            policy=json.dumps({
+                "Rules": [{
+                    "ResourceType": "collection",
+                    "Resource": [f"collection/{self.collection_name}"]
+                }],
+                "AWSOwnedKey": True
+            })
+        )
+
+        security_policy.cfn_options.deletion_policy = CfnDeletionPolicy.DELETE
+
+        # Create network policy for the AOSS collection
+        network_policy = opensearchserverless.CfnSecurityPolicy(
+            self, "CollectionNetworkPolicy",
+            name=NETWORK_POLICY_NAME,
+            type="network",
+            policy=json.dumps([{
+                "Rules": [{
+                    "ResourceType": "collection",
+                    "Resource": [f"collection/{self.collection_name}"]
+                }, {
+                    "ResourceType": "dashboard",
+                    "Resource": [f"collection/{self.collection_name}"]
+                }],
+                "AllowFromPublic": True  # For demo purposes only
+            }])
+        )
+
+        network_policy.cfn_options.deletion_policy = CfnDeletionPolicy.DELETE
+
+        # Create OpenSearch Serverless collection
+        self.collection = opensearchserverless.CfnCollection(
+            self,
+            "BusinessAgentCollection",
+            name=self.collection_name,
+            type="VECTORSEARCH",
+            description="Business Agent Collection",
+        )
+
+        self.collection.add_dependency(security_policy)
+        self.collection.add_dependency(network_policy)
+
+        # Create data access policy for the AOSS collection
+        data_access_policy = opensearchserverless.CfnAccessPolicy(
+            self, "CollectionAccessPolicy",
+            name=DATA_ACCESS_POLICY_NAME,
+            type="data",
+            policy=json.dumps([{
+                "Rules": [
+                    {
+                        "ResourceType": "index",
+                        "Resource": [f"index/{self.collection_name}/*"],
+                        "Permission": ["aoss:*"]
+                    },
+                    {
+                        "ResourceType": "collection",
+                        "Resource": [f"collection/{self.collection_name}"],
+                        "Permission": ["aoss:*"]
+                    }
+                ],
+                "Principal": [
+                    bootstrap.role.role_arn,
+                    f"arn:aws:iam::{self.account}:root"
+                ]
+            }])
+        )
+
+        data_access_policy.add_dependency(self.collection)
+        data_access_policy.cfn_options.deletion_policy = CfnDeletionPolicy.DELETE
+
+        # Create the indices with the index_init task once the data access policy is in place
+        index_init_task = BootstrapTask(
+            self, "IndexInit",
+            bootstrap=bootstrap,
+            task="index_init",
+            # A different profile is a different index, which has to be created before its knowledge base
+            properties={
+                "CollectionEndpoint": self.collection.attr_collection_endpoint,
+                "CollectionName": self.collection_name,
+                "Indices": [self.research_reports_index, self.internal_reports_index],
+                "Mappings": json.dumps({
+                    self.research_reports_index: index_mapping(self.research_reports_profile),
+                    self.internal_reports_index: index_mapping(self.internal_reports_profile)
+                }, separators=(",", ":"))
+            },
+            statements=[iam.PolicyStatement(
+                actions=[
+                    "aoss:APIAccessAll",
+                    "aoss:BatchGetCollection"
+                ],
+                resources=["*"]
+            )]
+        )
+        self.index_init_trigger = index_init_task.resource
+
+        self.index_init_trigger.node.add_dependency(data_access_policy)
@@ -0,0 +1,224 @@
+import boto3
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from business_agent.answering import (
+    DEFAULT_TIMEOUTS, NO_CONTEXT_ANSWER, answer_request, merge_context, model_arn, query_financial_data, query_reports
+)
+from business_agent.semantic_cache import titan_semantic_cache
+
+EXCERPT_CHARS = 300
+
+# The answer cache lives as long as the execution environment. A deploy with changed data or reports changes
+# DATA_VERSION and so replaces every environment, months appended since the deploy are picked up once the
+# entries expire.
+ANSWER_CACHE_TTL_SECONDS = 60 * 60
+ANSWER_CACHE_MAX_ENTRIES = 10_000
+EMBEDDING_CACHE_DIR = '/tmp/embedding_cache'
+
+# Catalog of the pre-parsed reports, written next to this file when the asset is built
+REPORT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_catalog.json')
+
+agent_runtime = boto3.client('bedrock-agent-runtime', region_name=os.environ.get('REGION'))
+bedrock_runtime = boto3.client('bedrock-runtime', region_name=os.environ.get('REGION'))
+
+
+def report_catalog():
+    if not os.path.exists(REPORT_CATALOG_PATH):
+        return {}
+    with open(REPORT_CATALOG_PATH) as f:
+        return json.load(f)
+
+
+catalog = report_catalog()
+
+
+def retrieve_sources(question, kb_ids, client):
+    """Yield the events of every source as soon as it answers, fails or runs out of time"""
+    region = os.environ.get('REGION') or client.meta.region_name
+    calls = {
+        'financial_data': (query_financial_data, model_arn(region, os.environ['SQL_MODEL_ID']), question),
+        'internal_reports': (query_reports, question, catalog),
+        'research_reports': (query_reports, question, catalog)
+    }
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=len(calls))
+    pending = {
+        executor.submit(calls[source][0], client, kb_ids[source], *calls[source][1:]): source
+        for source in calls if kb_ids.get(source)
+    }
+    try:
+        while pending:
+            deadline = min(started + DEFAULT_TIMEOUTS[source] for source in pending.values())
+            done, _ = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    yield source, future.result(), None
+                except Exception as e:
+                    yield source, [], f"{type(e).__name__}: {e}"
+
+            for future, source in list(pending.items()):
+                if time.monotonic() >= started + DEFAULT_TIMEOUTS[source]:
+                    del pending[future]
+                    yield source, [], f"no response within {DEFAULT_TIMEOUTS[source]}s"
+    finally:
+        # Calls that timed out finish in the background, their results are discarded
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def answer_cache():
+    return titan_semantic_cache(
+        bedrock_runtime, cache_dir=EMBEDDING_CACHE_DIR, version=None, ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+        max_entries=ANSWER_CACHE_MAX_ENTRIES
+    )
+
+
+def stream_answer(question, kb_ids, client=None, runtime=None, cache=None):
+    """Yield server-sent events: retrieved sources and SQL results as they arrive, then the answer tokens
+
+    With a cache, a rephrasing of an earlier question is answered from it without calling any source.
+    """
+    client = client or agent_runtime
+    runtime = runtime or bedrock_runtime
+    started = time.monotonic()
+    yield 'start', {'question': question}
+
+    if cache is not None:
+        cached = cache.lookup(question)
+        if cached:
+            yield 'cached', {'question': cached['question'], 'similarity': cached['similarity'], 'sql': cached['sql']}
+            yield 'token', {'text': cached['answer']}
+            yield 'done', {
+                'retrieval_seconds': 0.0,
+                'first_token_seconds': round(time.monotonic() - started, 3),
+                'total_seconds': round(time.monotonic() - started, 3)
+            }
+            return
+
+    results = {}
+    failed = False
+    for source, source_results, error in retrieve_sources(question, kb_ids, client):
+        if error:
+            failed = True
+            yield 'source_error', {'source': source, 'error': error}
+            continue
+        results[source] = source_results
+        if source == 'financial_data':
+            yield 'sql', {'source': source, **source_results[0]}
+        else:
+            yield 'sources', {
+                'source': source,
+                'results': [{**result, 'text': result['text'][:EXCERPT_CHARS]} for result in source_results]
+            }
+
+    retrieval_seconds = time.monotonic() - started
+    yield 'retrieval_complete', {'seconds': round(retrieval_seconds, 3), 'sources': sorted(results)}
+
+    context = merge_context(results)
+    first_token_seconds = None
+    tokens = []
+    if context:
+        response = runtime.converse_stream(**answer_request(question, context, os.environ['ANSWER_MODEL_ID']))
+        for event in response['stream']:
+            text = event.get('contentBlockDelta', {}).get('delta', {}).get('text')
+            if text:
+                if first_token_seconds is None:
+                    first_token_seconds = round(time.monotonic() - started, 3)
+                tokens.append(text)
+                yield 'token', {'text': text}
+    else:
+        tokens.append(NO_CONTEXT_ANSWER)
+        yield 'token', {'text': NO_CONTEXT_ANSWER}
+
+    # Only complete answers are cached, a partial one would outlive the outage that caused it
+    if cache is not None and not failed:
+        sql = [query for result in results.get('financial_data', []) for query in result.get('queries', [])]
+        cache.put(question, ''.join(tokens), sql)
+
+    yield 'done', {
+        'retrieval_seconds': round(retrieval_seconds, 3),
+        'first_token_seconds': first_token_seconds,
+        'total_seconds': round(time.monotonic() - started, 3)
+    }
+
+
+def knowledge_base_ids():
+    return {
+        'financial_data': os.environ.get('FINANCIAL_DATA_KB_ID'),
+        'internal_reports': os.environ.get('INTERNAL_REPORTS_KB_ID'),
+        'research_reports': os.environ.get('RESEARCH_REPORTS_KB_ID')
+    }
+
+
+class AnswerStreamHandler(BaseHTTPRequestHandler):
+    """Serves the answer of a question as a chunked server-sent event stream
+
+    The Lambda Web Adapter forwards function URL requests to this server and streams the chunks back
+    as they are written. GET takes the question from the q parameter, POST from a JSON body.
+    """
+    protocol_version = 'HTTP/1.1'
+    client = None
+    runtime = None
+    cache = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/health':
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.stream(parse_qs(url.query).get('q', [''])[0])
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.stream(json.loads(body or b'{}').get('question', ''))
+
+    def stream(self, question):
+        if not question.strip():
+            body = json.dumps({'error': 'question is required'}).encode()
+            self.send_response(400)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        try:
+            for event, data in stream_answer(
+                question, knowledge_base_ids(), self.client, self.runtime, self.cache
+            ):
+                self.write_chunk(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+        except Exception as e:
+            print(f"Answer stream failed: {e}")
+            self.write_chunk(f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n".encode())
+        self.wfile.write(b'0\r\n\r\n')
+
+    def write_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        print(format % args)
+
+
+def serve(port=None):
+    AnswerStreamHandler.cache = answer_cache()
+    server = ThreadingHTTPServer(('0.0.0.0', int(port or os.environ.get('PORT', 8080))), AnswerStreamHandler)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    serve()
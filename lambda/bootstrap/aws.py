@@ -0,0 +1,46 @@
+import hashlib
+import json
+
+import boto3
+import urllib3
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+
+# Clients and the HTTP pool live at module scope, a warm container reuses them across tasks and invocations
+session = boto3.Session()
+clients = {}
+http = urllib3.PoolManager(maxsize=10)
+
+
+def client(service_name):
+    if service_name not in clients:
+        clients[service_name] = session.client(service_name)
+    return clients[service_name]
+
+
+class Response:
+    """Status and body of a signed request"""
+
+    def __init__(self, response):
+        self.status_code = response.status
+        self.text = response.data.decode('utf-8', errors='replace')
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise RuntimeError(f"Request failed with status {self.status_code}: {self.text}")
+
+
+def signed_request(method, url, service, body=None):
+    """Send a request signed with botocore's SigV4, the way the AWS SDK signs its own calls"""
+    data = json.dumps(body) if body is not None else None
+    request = AWSRequest(method=method, url=url, data=data, headers={
+        'Content-Type': 'application/json',
+        # OpenSearch Serverless requires the hash of the payload as a header
+        'X-Amz-Content-SHA256': hashlib.sha256((data or '').encode()).hexdigest()
+    })
+    SigV4Auth(session.get_credentials().get_frozen_credentials(), service, session.region_name).add_auth(request)
+    return Response(http.request(method, url, body=data, headers=dict(request.headers.items()), retries=False))
@@ -0,0 +1,32 @@
+import importlib
+import json
+
+# Every bootstrap custom resource names its task, a module under tasks/ with on_event and optionally
+# is_complete. Tasks without is_complete finish as soon as on_event returns.
+TASKS = {
+    'crawl': 'tasks.crawl',
+    'index_init': 'tasks.index_init',
+    'kb_sync': 'tasks.kb_sync',
+    'sql': 'tasks.sql',
+    'usage_limit': 'tasks.usage_limit'
+}
+
+
+def task(event):
+    name = event['ResourceProperties'].get('Task')
+    if name not in TASKS:
+        raise ValueError(f"Unknown bootstrap task {name}, expected one of {', '.join(TASKS)}")
+    # Imported on first use and kept for the life of the warm container
+    return importlib.import_module(TASKS[name])
+
+
+def on_event(event, context):
+    print(f"Received event: {json.dumps(event)}")
+    return task(event).on_event(event, context) or {}
+
+
+def is_complete(event, context):
+    module = task(event)
+    if not hasattr(module, 'is_complete'):
+        return {'IsComplete': True}
+    return module.is_complete(event, context)
@@ -0,0 +1,80 @@
+import time
+
+from aws import client
+
+
+def on_event(event, context):
+    """Start the crawler and hand completion tracking over to is_complete"""
+    glue_client = client('glue')
+    crawler_name = event['ResourceProperties'].get('CrawlerName')
+    if not crawler_name:
+        raise ValueError("CrawlerName property is missing or empty")
+
+    if event['RequestType'] == 'Delete':
+        # Nothing to do for Delete
+        return {'PhysicalResourceId': event.get('PhysicalResourceId', crawler_name)}
+
+    requested_at = time.time()
+
+    try:
+        glue_client.start_crawler(Name=crawler_name)
+        print(f"Crawler {crawler_name} started")
+    except glue_client.exceptions.CrawlerRunningException:
+        # A crawl that is already running will pick up the same data, so accept its result
+        print(f"Crawler {crawler_name} is already running")
+        requested_at = 0
+
+    return {
+        'PhysicalResourceId': crawler_name,
+        'Data': {'CrawlRequestedAt': str(requested_at)}
+    }
+
+
+def is_complete(event, context):
+    """Report completion once the crawl has finished and its tables are in the catalog"""
+    if event['RequestType'] == 'Delete':
+        return {'IsComplete': True}
+
+    glue_client = client('glue')
+    properties = event['ResourceProperties']
+    crawler_name = properties['CrawlerName']
+    database_name = properties['DatabaseName']
+    expected_tables = properties.get('ExpectedTables', [])
+    requested_at = float(event.get('Data', {}).get('CrawlRequestedAt', 0))
+
+    crawler = glue_client.get_crawler(Name=crawler_name)['Crawler']
+    crawler_state = crawler['State']
+    last_crawl = crawler.get('LastCrawl', {})
+    print(f"Crawler state: {crawler_state}, last crawl: {last_crawl.get('Status')}")
+
+    # RUNNING and STOPPING both mean the crawl has not settled yet
+    if crawler_state != 'READY':
+        return {'IsComplete': False}
+
+    # The crawler can briefly report READY before our crawl is recorded
+    last_crawl_started = last_crawl.get('StartTime')
+    if last_crawl_started is None or last_crawl_started.timestamp() < requested_at - 60:
+        return {'IsComplete': False}
+
+    if last_crawl.get('Status') != 'SUCCEEDED':
+        raise RuntimeError(
+            f"Crawler {crawler_name} finished with status {last_crawl.get('Status')}: "
+            f"{last_crawl.get('ErrorMessage', 'no error message')}"
+        )
+
+    table_names = set()
+    paginator = glue_client.get_paginator('get_tables')
+    for page in paginator.paginate(DatabaseName=database_name):
+        table_names.update(table['Name'] for table in page['TableList'])
+
+    missing_tables = [table for table in expected_tables if table not in table_names]
+    if missing_tables:
+        raise RuntimeError(
+            f"Crawler {crawler_name} succeeded but tables are missing from {database_name}: {missing_tables}"
+        )
+
+    print(f"Crawler {crawler_name} completed successfully")
+    return {
+        'IsComplete': True,
+        'Data': {'Tables': ','.join(sorted(table_names))}
+    }
@@ -0,0 +1,158 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aws import client, signed_request
+
+# Retry delays grow exponentially up to the cap, with full jitter
+BACKOFF_BASE = 1  # seconds
+BACKOFF_CAP = 20  # seconds
+
+# Leave enough time to report a readable error before the Lambda times out
+SAFETY_MARGIN_MS = 10000
+
+# Status codes AOSS returns while the collection or its data access policy is still propagating
+NOT_READY_STATUS_CODES = {401, 403, 404, 429, 502, 503, 504}
+
+
+def on_event(event, context):
+    """Create the OpenSearch indices once the collection and its data access policy are ready"""
+    if event['RequestType'] == 'Delete':
+        # Indices are removed together with the collection
+        return {'PhysicalResourceId': event.get('PhysicalResourceId')}
+
+    properties = event['ResourceProperties']
+    collection_endpoint = properties['CollectionEndpoint']
+    collection_name = properties['CollectionName']
+    # Index name to the mapping of its vector index profile
+    indices = json.loads(properties['Mappings'])
+
+    def deadline_reached(delay):
+        return context.get_remaining_time_in_millis() < delay * 1000 + SAFETY_MARGIN_MS
+
+    wait_for_collection(collection_name, deadline_reached)
+
+    with ThreadPoolExecutor(max_workers=len(indices)) as executor:
+        futures = [
+            executor.submit(initialize_index, collection_endpoint, index_name, mapping, deadline_reached)
+            for index_name, mapping in indices.items()
+        ]
+        for future in futures:
+            future.result()
+
+    print(f"Successfully created/verified indices: {list(indices)}")
+
+    return {
+        'PhysicalResourceId': collection_name,
+        'Data': {'Indices': ','.join(indices)}
+    }
+
+
+def aoss_request(method, url, body=None):
+    """Request to the collection's data plane, signed for OpenSearch Serverless over the pooled connections"""
+    return signed_request(method, url, 'aoss', body)
+
+
+def backoff(attempt, deadline_reached, description):
+    """Sleep for a jittered, exponentially growing delay or fail once the deadline is near"""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    if deadline_reached(delay):
+        raise TimeoutError(f"Gave up waiting for {description}")
+    time.sleep(delay)
+
+
+def wait_for_collection(collection_name, deadline_reached):
+    """Wait until the collection reports ACTIVE"""
+    attempt = 0
+    while True:
+        collections = client('opensearchserverless').batch_get_collection(names=[collection_name])['collectionDetails']
+        status = collections[0]['status'] if collections else 'MISSING'
+        print(f"Collection {collection_name} status: {status}")
+
+        if status == 'ACTIVE':
+            return
+        if status == 'FAILED':
+            raise RuntimeError(f"Collection {collection_name} failed to create")
+
+        backoff(attempt, deadline_reached, f"collection {collection_name} to become active")
+        attempt += 1
+
+
+def initialize_index(endpoint, index_name, mapping, deadline_reached):
+    """Create the index and wait until it is visible through the data plane"""
+    url = f"{endpoint}/{index_name}"
+    create_index(url, index_name, mapping, deadline_reached)
+
+    attempt = 0
+    while True:
+        response = aoss_request('GET', url)
+        if response.status_code == 200:
+            print(f"Index {index_name} is visible")
+            return
+        print(f"Index {index_name} not visible yet: {response.status_code}")
+        backoff(attempt, deadline_reached, f"index {index_name} to become visible")
+        attempt += 1
+
+
+def update_mapping(url, index_name, mapping, current):
+    """Add the fields of the mapping that the existing index does not have, logging the ones typed differently"""
+    properties = mapping['mappings']['properties']
+    current_properties = next(iter(current.values()), {}).get('mappings', {}).get('properties', {})
+
+    conflicts = [
+        f"{name} is {current_properties[name].get('type')}, the profile expects {field.get('type')}"
+        for name, field in properties.items()
+        if name in current_properties and current_properties[name].get('type') != field.get('type')
+    ]
+    if conflicts:
+        print(f"Index {index_name} keeps fields that differ from its index profile, delete the index or deploy "
+              f"with the profile it was created with to change them: {conflicts}")
+
+    missing = {name: field for name, field in properties.items() if name not in current_properties}
+    if not missing:
+        print(f"Index {index_name} already exists, its mapping is up to date")
+        return
+
+    response = aoss_request('PUT', f"{url}/_mapping", {'properties': missing})
+    if response.ok:
+        print(f"Index {index_name} already exists, added the fields {sorted(missing)}")
+    else:
+        print(f"Index {index_name} already exists, adding the fields {sorted(missing)} failed with "
+              f"{response.status_code}: {response.text}")
+
+
+def create_index(url, index_name, mapping, deadline_reached):
+    """Create OpenSearch index with mapping if it doesn't exist, else add the fields it is missing"""
+    attempt = 0
+    while True:
+        # Check if index exists
+        response = aoss_request('HEAD', url)
+        if response.status_code == 200:
+            # An index created by an earlier deploy lacks the fields added since, such as the typed report
+            # metadata. Only those are added, fields that exist already, including the ones Bedrock mapped
+            # dynamically, are left as they are.
+            response = aoss_request('GET', f"{url}/_mapping")
+            if response.ok:
+                update_mapping(url, index_name, mapping, json.loads(response.text))
+                return
+
+        # Create the index with mapping
+        elif response.status_code == 404:
+            response = aoss_request('PUT', url, mapping)
+            print(f"Index {index_name} creation status code: {response.status_code}")
+
+            if response.ok:
+                print(f"Created index {index_name} with mapping")
+                return
+            if 'resource_already_exists_exception' in response.text:
+                print(f"Index {index_name} was created concurrently")
+                return
+
+        # Anything else means the data access policy has not propagated yet
+        if response.status_code not in NOT_READY_STATUS_CODES:
+            print(f"Response body: {response.text}")
+            response.raise_for_status()
+
+        backoff(attempt, deadline_reached, f"permission to create index {index_name}")
+        attempt += 1
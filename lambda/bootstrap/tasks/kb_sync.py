@@ -0,0 +1,277 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aws import client
+
+TERMINAL_STATUSES = {'COMPLETE', 'FAILED', 'STOPPED'}
+
+# Document level ingestion, a document is settled once it left the pending and in progress states
+SETTLED_DOCUMENT_STATUSES = {
+    'INDEXED', 'PARTIALLY_INDEXED', 'FAILED', 'METADATA_PARTIALLY_INDEXED',
+    'METADATA_UPDATE_FAILED', 'IGNORED', 'NOT_FOUND'
+}
+FAILED_DOCUMENT_STATUSES = {'FAILED', 'METADATA_UPDATE_FAILED'}
+
+# The document APIs accept at most this many documents per call
+DOCUMENT_BATCH_SIZE = 10
+
+METADATA_SUFFIX = '.metadata.json'
+
+# Polling starts quickly and backs off while jobs are still running
+INITIAL_POLL_INTERVAL = 5  # seconds
+MAX_POLL_INTERVAL = 60  # seconds
+BACKOFF_FACTOR = 1.5
+
+# Leave enough time to return the progress to the provider framework
+SAFETY_MARGIN_MS = 15000
+
+
+def get_sources(properties):
+    """Knowledge base data sources of the custom resource, with their document manifest if they have one"""
+    return [
+        {
+            'knowledgeBaseId': source['KnowledgeBaseId'],
+            'dataSourceId': source['DataSourceId'],
+            'bucket': source.get('Bucket'),
+            'manifest': json.loads(source['Manifest']) if source.get('Manifest') else None
+        } for source in (properties or {}).get('Sources', [])
+    ]
+
+
+def plan_sources(event):
+    """Decide per data source between a full ingestion job and ingesting only the changed documents
+
+    A document level plan is only possible when the same data source was synced before with a manifest,
+    a new or replaced data source always gets a full ingestion job and an existing data source without
+    a manifest is not synced again.
+    """
+    old_sources = {
+        (source['knowledgeBaseId'], source['dataSourceId']): source
+        for source in get_sources(event.get('OldResourceProperties'))
+    } if event['RequestType'] == 'Update' else {}
+
+    plans = []
+    for source in get_sources(event['ResourceProperties']):
+        old_source = old_sources.get((source['knowledgeBaseId'], source['dataSourceId']))
+
+        if not old_source or (source['manifest'] is not None and old_source['manifest'] is None):
+            plans.append({**source, 'mode': 'job'})
+            continue
+        if source['manifest'] is None:
+            # Without a manifest there is nothing to compare, an existing data source is left as it is
+            print(f"Knowledge base {source['knowledgeBaseId']} is unchanged, skipping")
+            continue
+
+        # Metadata sidecars are not documents, a changed sidecar re-ingests the document it describes
+        manifest, old_manifest = source['manifest'], old_source['manifest']
+        documents = [key for key in manifest if not key.endswith(METADATA_SUFFIX)]
+        changed = sorted(
+            key for key in documents
+            if old_manifest.get(key) != manifest[key]
+            or old_manifest.get(key + METADATA_SUFFIX) != manifest.get(key + METADATA_SUFFIX)
+        )
+        deleted = sorted(key for key in old_manifest if key not in manifest and not key.endswith(METADATA_SUFFIX))
+
+        plans.append({
+            **source,
+            'mode': 'documents',
+            'ingest': [f"s3://{source['bucket']}/{key}" for key in changed],
+            'metadata': [f"s3://{source['bucket']}/{key}" for key in changed if key + METADATA_SUFFIX in manifest],
+            'delete': [f"s3://{old_source['bucket']}/{key}" for key in deleted],
+            'unchanged': len(documents) - len(changed)
+        })
+
+    return plans
+
+
+def batches(items):
+    return [items[i:i + DOCUMENT_BATCH_SIZE] for i in range(0, len(items), DOCUMENT_BATCH_SIZE)]
+
+
+def start_job(plan):
+    kb_id, ds_id = plan['knowledgeBaseId'], plan['dataSourceId']
+    response = client('bedrock-agent').start_ingestion_job(
+        knowledgeBaseId=kb_id,
+        dataSourceId=ds_id
+    )
+    ingestion_job_id = response['ingestionJob']['ingestionJobId']
+    print(f"Started ingestion job {ingestion_job_id} for knowledge base {kb_id}")
+    return {
+        'knowledgeBaseId': kb_id,
+        'dataSourceId': ds_id,
+        'ingestionJobId': ingestion_job_id,
+        'status': response['ingestionJob']['status']
+    }
+
+
+def document(uri, has_metadata):
+    """Document level ingestion request for an S3 object, with its metadata sidecar if it has one"""
+    request = {'content': {'dataSourceType': 'S3', 's3': {'s3Location': {'uri': uri}}}}
+    if has_metadata:
+        request['metadata'] = {'type': 'S3_LOCATION', 's3Location': {'uri': uri + METADATA_SUFFIX}}
+    return request
+
+
+def start_documents(plan):
+    """Ingest the added and changed documents and remove the deleted ones"""
+    kb_id, ds_id = plan['knowledgeBaseId'], plan['dataSourceId']
+
+    for batch in batches(plan['ingest']):
+        client('bedrock-agent').ingest_knowledge_base_documents(
+            knowledgeBaseId=kb_id,
+            dataSourceId=ds_id,
+            documents=[document(uri, uri in plan['metadata']) for uri in batch]
+        )
+
+    for batch in batches(plan['delete']):
+        client('bedrock-agent').delete_knowledge_base_documents(
+            knowledgeBaseId=kb_id,
+            dataSourceId=ds_id,
+            documentIdentifiers=[{'dataSourceType': 'S3', 's3': {'uri': uri}} for uri in batch]
+        )
+
+    print(f"Knowledge base {kb_id}: ingesting {len(plan['ingest'])}, deleting {len(plan['delete'])}, "
+          f"skipping {plan['unchanged']} unchanged documents")
+
+
+def describe_job(job):
+    response = client('bedrock-agent').get_ingestion_job(
+        knowledgeBaseId=job['knowledgeBaseId'],
+        dataSourceId=job['dataSourceId'],
+        ingestionJobId=job['ingestionJobId']
+    )['ingestionJob']
+
+    statistics = response.get('statistics', {})
+    started_at = response.get('startedAt')
+    updated_at = response.get('updatedAt')
+
+    return {
+        **job,
+        'status': response['status'],
+        'failureReasons': response.get('failureReasons', []),
+        'documentsScanned': statistics.get('numberOfDocumentsScanned', 0),
+        'documentsIndexed': statistics.get('numberOfNewDocumentsIndexed', 0)
+                            + statistics.get('numberOfModifiedDocumentsIndexed', 0),
+        'documentsDeleted': statistics.get('numberOfDocumentsDeleted', 0),
+        'documentsFailed': statistics.get('numberOfDocumentsFailed', 0),
+        'durationSeconds': round((updated_at - started_at).total_seconds(), 1)
+                           if started_at and updated_at else None
+    }
+
+
+def describe_documents(plan):
+    """Current status of every document a document level plan ingested or deleted"""
+    statuses = {}
+    for batch in batches(plan['ingest'] + plan['delete']):
+        response = client('bedrock-agent').get_knowledge_base_documents(
+            knowledgeBaseId=plan['knowledgeBaseId'],
+            dataSourceId=plan['dataSourceId'],
+            documentIdentifiers=[{'dataSourceType': 'S3', 's3': {'uri': uri}} for uri in batch]
+        )
+        for detail in response['documentDetails']:
+            statuses[detail['identifier']['s3']['uri']] = (detail['status'], detail.get('statusReason'))
+
+    ingested = [statuses.get(uri, ('PENDING', None)) for uri in plan['ingest']]
+    deleted = [statuses.get(uri, ('NOT_FOUND', None)) for uri in plan['delete']]
+    settled = all(status in SETTLED_DOCUMENT_STATUSES for status, _ in ingested) and \
+        all(status in SETTLED_DOCUMENT_STATUSES for status, _ in deleted)
+    failures = [
+        f"{plan['dataSourceId']} {uri} {status} {reason}" for uri, (status, reason) in zip(plan['ingest'] + plan['delete'], ingested + deleted)
+        if status in FAILED_DOCUMENT_STATUSES
+    ]
+
+    return {
+        'knowledgeBaseId': plan['knowledgeBaseId'],
+        'dataSourceId': plan['dataSourceId'],
+        'ingestionJobId': None,
+        'status': ('FAILED' if failures else 'COMPLETE') if settled else 'IN_PROGRESS',
+        'failureReasons': failures,
+        'documentsScanned': len(plan['ingest']) + len(plan['delete']),
+        'documentsIndexed': sum(status in ('INDEXED', 'PARTIALLY_INDEXED') for status, _ in ingested),
+        'documentsDeleted': sum(status == 'NOT_FOUND' for status, _ in deleted),
+        'documentsFailed': len(failures),
+        'documentsSkipped': plan['unchanged'],
+        'durationSeconds': None
+    }
+
+
+def on_event(event, context):
+    """Start a full ingestion job for new data sources and document level ingestion for changed documents"""
+    if event['RequestType'] == 'Delete':
+        # Nothing to do for Delete
+        return {}
+
+    plans = plan_sources(event)
+    job_plans = [plan for plan in plans if plan['mode'] == 'job']
+    document_plans = [plan for plan in plans if plan['mode'] == 'documents']
+
+    with ThreadPoolExecutor(max_workers=max(len(plans), 1)) as executor:
+        jobs = list(executor.map(start_job, job_plans))
+        list(executor.map(start_documents, document_plans))
+
+    return {'Data': {'Jobs': json.dumps(jobs)}}
+
+
+def is_complete(event, context):
+    """Poll every running ingestion until all of them finish or the invocation runs out of time"""
+    if event['RequestType'] == 'Delete':
+        return {'IsComplete': True}
+
+    jobs = json.loads(event['Data']['Jobs'])
+    # The document plans are derived again from the resource properties, they can be too large for Data
+    document_plans = [
+        plan for plan in plan_sources(event) if plan['mode'] == 'documents' and (plan['ingest'] or plan['delete'])
+    ]
+    poll_interval = INITIAL_POLL_INTERVAL
+
+    with ThreadPoolExecutor(max_workers=max(len(jobs) + len(document_plans), 1)) as executor:
+        while True:
+            running = [job for job in jobs if job['status'] not in TERMINAL_STATUSES]
+            refreshed = {
+                (job['knowledgeBaseId'], job['ingestionJobId']): job
+                for job in executor.map(describe_job, running)
+            }
+            jobs = [refreshed.get((job['knowledgeBaseId'], job['ingestionJobId']), job) for job in jobs]
+            documents = list(executor.map(describe_documents, document_plans))
+
+            for job in jobs + documents:
+                print(f"Knowledge base {job['knowledgeBaseId']} data source {job['dataSourceId']} "
+                      f"job {job['ingestionJobId'] or 'documents'}: {job['status']}")
+
+            if all(job['status'] in TERMINAL_STATUSES for job in jobs + documents):
+                break
+
+            # Hand control back to the provider framework before the Lambda times out,
+            # the next invocation picks the same jobs up again from the on_event output
+            if context.get_remaining_time_in_millis() < poll_interval * 1000 + SAFETY_MARGIN_MS:
+                return {'IsComplete': False}
+
+            time.sleep(poll_interval)
+            poll_interval = min(poll_interval * BACKOFF_FACTOR, MAX_POLL_INTERVAL)
+
+    # A knowledge base can have several data sources, each reports its own statistics
+    statistics = {
+        f"{job['knowledgeBaseId']}/{job['dataSourceId']}": {
+            key: job.get(key, 0) for key in (
+                'ingestionJobId', 'status', 'documentsScanned', 'documentsIndexed',
+                'documentsDeleted', 'documentsFailed', 'documentsSkipped', 'durationSeconds'
+            )
+        } for job in jobs + documents
+    }
+    print(f"Ingestion statistics: {json.dumps(statistics)}")
+
+    failed = [job for job in jobs + documents if job['status'] != 'COMPLETE']
+    if failed:
+        raise RuntimeError('Ingestion did not complete: ' + '; '.join(
+            f"{job['knowledgeBaseId']}/{job['dataSourceId']} {job['status']} {job['failureReasons']}"
+            for job in failed
+        ))
+
+    return {
+        'IsComplete': True,
+        'Data': {
+            'IngestionJobIds': ','.join(job['ingestionJobId'] for job in jobs),
+            'Statistics': json.dumps(statistics)
+        }
+    }
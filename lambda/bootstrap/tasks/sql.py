@@ -0,0 +1,104 @@
+import hashlib
+import json
+import time
+
+from aws import client
+
+# Statements are described again quickly at first and less often while they keep running
+INITIAL_POLL_INTERVAL = 2  # seconds
+MAX_POLL_INTERVAL = 30  # seconds
+BACKOFF_FACTOR = 1.5
+
+# Leave enough time to return the progress to the provider framework
+SAFETY_MARGIN_MS = 15000
+
+
+def client_token(event, stage_index, group):
+    """Idempotency token of one group within one deployment request
+
+    Submitting a group again with the same token returns the statement of the first submission instead of
+    running it again, so every invocation of is_complete can resubmit the stages it reached without keeping
+    state.
+    """
+    return hashlib.sha256(f"{event['RequestId']}/{stage_index}/{group['Name']}".encode()).hexdigest()[:64]
+
+
+def submit(event, stage_index):
+    """Submit every group of a stage at once, each group runs as one transaction"""
+    properties = event['ResourceProperties']
+    statement_ids = []
+    for group in properties['Stages'][stage_index]:
+        response = client('redshift-data').batch_execute_statement(
+            WorkgroupName=properties['Workgroup'],
+            Database=properties['Database'],
+            SecretArn=properties['SecretArn'],
+            Sqls=group['Statements'],
+            StatementName=group['Name'],
+            ClientToken=client_token(event, stage_index, group)
+        )
+        statement_ids.append(response['Id'])
+    return statement_ids
+
+
+def check(statement_ids):
+    """Statement IDs still running, raising on the first that failed"""
+    running = []
+    for statement_id in statement_ids:
+        statement = client('redshift-data').describe_statement(Id=statement_id)
+        status = statement['Status']
+        if status in ['FAILED', 'ABORTED']:
+            failed = [sub for sub in statement.get('SubStatements', []) if sub['Status'] != 'FINISHED']
+            raise RuntimeError(
+                f"Statement {statement_id} {status}: {statement.get('Error', '')} "
+                f"{[(sub.get('QueryString'), sub.get('Error')) for sub in failed]}"
+            )
+        if status != 'FINISHED':
+            running.append(statement_id)
+    return running
+
+
+def on_event(event, context):
+    """Start the first stage of statement groups through the Redshift Data API
+
+    The stages are driven by is_complete, so a long stage never runs into the handler timeout.
+    """
+    if event['RequestType'] == 'Delete':
+        # Whatever the statements created is dropped together with the namespace
+        return {'PhysicalResourceId': event['PhysicalResourceId']}
+
+    properties = event['ResourceProperties']
+    statement_ids = submit(event, 0)
+    print(f"Submitted stage 1 of {len(properties['Stages'])}: {statement_ids}")
+
+    return {'PhysicalResourceId': properties['Name'], 'Data': {'StatementIds': json.dumps(statement_ids)}}
+
+
+def is_complete(event, context):
+    """Advance through the stages, submitting the next one once every group of the current one finished
+
+    Within an invocation only the statements still running are described, with a growing wait in between.
+    The provider passes the same event to every invocation, so the next one starts again from the first
+    stage's statement IDs returned by on_event. The later stages reached so far are submitted again, their
+    client tokens return the statements that already ran.
+    """
+    if event['RequestType'] == 'Delete':
+        return {'IsComplete': True}
+
+    stages = event['ResourceProperties']['Stages']
+    for stage_index in range(len(stages)):
+        statement_ids = json.loads(event['Data']['StatementIds']) if stage_index == 0 else submit(event, stage_index)
+        running = check(statement_ids)
+        poll_interval = INITIAL_POLL_INTERVAL
+        while running:
+            # Hand control back to the provider framework before the Lambda times out
+            if context.get_remaining_time_in_millis() < poll_interval * 1000 + SAFETY_MARGIN_MS:
+                print(f"Stage {stage_index + 1} of {len(stages)}: {len(running)} statements still running: "
+                      f"{running}")
+                return {'IsComplete': False}
+
+            time.sleep(poll_interval)
+            poll_interval = min(poll_interval * BACKOFF_FACTOR, MAX_POLL_INTERVAL)
+            running = check(running)
+
+    print(f"All {len(stages)} stages finished")
+    return {'IsComplete': True}
@@ -0,0 +1,35 @@
+from aws import client
+
+
+def on_event(event, context):
+    """Create, change or remove an RPU-hour usage limit of a Redshift Serverless workgroup"""
+    redshift_serverless = client('redshift-serverless')
+    properties = event['ResourceProperties']
+
+    if event['RequestType'] == 'Delete':
+        try:
+            redshift_serverless.delete_usage_limit(usageLimitId=event['PhysicalResourceId'])
+        except redshift_serverless.exceptions.ResourceNotFoundException:
+            print(f"Usage limit {event['PhysicalResourceId']} is already gone")
+        return {'PhysicalResourceId': event['PhysicalResourceId']}
+
+    old_properties = event.get('OldResourceProperties', {})
+    # The period of a limit cannot change, a new limit replaces it and CloudFormation deletes the old one
+    if event['RequestType'] == 'Update' and old_properties.get('Period') == properties['Period'] \
+            and old_properties.get('WorkgroupArn') == properties['WorkgroupArn']:
+        usage_limit = redshift_serverless.update_usage_limit(
+            usageLimitId=event['PhysicalResourceId'],
+            amount=int(properties['Amount']),
+            breachAction=properties['BreachAction']
+        )['usageLimit']
+    else:
+        usage_limit = redshift_serverless.create_usage_limit(
+            resourceArn=properties['WorkgroupArn'],
+            usageType='serverless-compute',
+            amount=int(properties['Amount']),
+            period=properties['Period'],
+            breachAction=properties['BreachAction']
+        )['usageLimit']
+
+    print(f"Usage limit {usage_limit['usageLimitId']}: {properties['Amount']} RPU hours {properties['Period']}")
+    return {'PhysicalResourceId': usage_limit['usageLimitId']}
@@ -0,0 +1,194 @@
+import io
+import json
+import os
+import time
+import urllib.parse
+
+import boto3
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+# Packaged next to this module, so the appended files are named and typed the way the data lake build does it
+from business_agent.datalake import DATE_COLUMN, GLUE_TYPES, PARQUET_COMPRESSION, PARTITION_COLUMN, column_name
+
+s3 = boto3.client('s3')
+glue = boto3.client('glue')
+redshift_data = boto3.client('redshift-data')
+
+GLUE_DATABASE = os.environ['GLUE_DATABASE']
+DATALAKE_PREFIX = os.environ['DATALAKE_PREFIX']
+INCOMING_PREFIX = os.environ['INCOMING_PREFIX']
+REJECTED_PREFIX = os.environ['REJECTED_PREFIX']
+APPEND_TABLES = os.environ['APPEND_TABLES'].split(',')
+ROLLUP_VIEWS = json.loads(os.environ['ROLLUP_VIEWS'])
+
+# Appended files carry this prefix, the deployment of the data lake leaves them in place
+APPENDED_FILE_PREFIX = 'append-'
+
+ARROW_TYPES = {glue_type: arrow_type for arrow_type, glue_type in GLUE_TYPES.items()}
+
+# Seconds between two polls of the rollup refresh, doubled after every poll up to the maximum
+POLL_INTERVAL = 1
+MAX_POLL_INTERVAL = 15
+DEADLINE_MARGIN_MS = 15 * 1000
+
+
+class ValidationError(Exception):
+    pass
+
+
+def read_month(body, columns):
+    """Read a monthly CSV and cast it to the catalog columns of its table plus the year it belongs to"""
+    try:
+        table = pv.read_csv(io.BytesIO(body))
+    except pa.ArrowInvalid as e:
+        raise ValidationError(f"Not a readable CSV: {e}")
+    table = table.rename_columns([column_name(name) for name in table.column_names])
+
+    expected = [name for name, _ in columns]
+    missing = sorted(set(expected) - set(table.column_names))
+    unexpected = sorted(set(table.column_names) - set(expected))
+    if missing or unexpected:
+        raise ValidationError(f"Columns do not match the catalog, missing {missing}, unexpected {unexpected}")
+    if table.num_rows == 0:
+        raise ValidationError("The file has no rows")
+
+    arrays = []
+    for name, glue_type in columns:
+        column = table[name]
+        try:
+            if name == DATE_COLUMN:
+                # 'YYYY-MM' strings become the first day of the month
+                column = pc.strptime(
+                    pc.binary_join_element_wise(column.cast(pa.string()), '01', '-'), format='%Y-%m-%d', unit='s'
+                ).cast(pa.date32())
+            else:
+                column = column.cast(ARROW_TYPES[glue_type])
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValidationError(f"Column {name} is not of type {glue_type}: {e}")
+        arrays.append(column)
+
+    table = pa.table(arrays, names=expected)
+    return table.append_column(PARTITION_COLUMN, pc.year(table[DATE_COLUMN]).cast(pa.int32()))
+
+
+def write_partitions(bucket, table_name, file_stem, table):
+    """Write the rows of every year as one new Parquet file of that year's partition"""
+    keys = {}
+    for year in sorted(set(table[PARTITION_COLUMN].to_pylist())):
+        rows = table.filter(pc.equal(table[PARTITION_COLUMN], year)).drop_columns([PARTITION_COLUMN])
+        buffer = io.BytesIO()
+        pq.write_table(rows, buffer, compression=PARQUET_COMPRESSION)
+        # Named after the incoming file, so dropping the same file again replaces its rows instead of adding them
+        key = f"{DATALAKE_PREFIX}/{table_name}/{PARTITION_COLUMN}={year}/{APPENDED_FILE_PREFIX}{file_stem}.parquet"
+        s3.put_object(Bucket=bucket, Key=key, Body=buffer.getvalue())
+        keys[year] = key
+    return keys
+
+
+def register_partitions(glue_table, years):
+    """Add the years that are not in the catalog yet as partitions of the table"""
+    storage_descriptor = glue_table['StorageDescriptor']
+    location = storage_descriptor['Location'].rstrip('/')
+    response = glue.batch_create_partition(
+        DatabaseName=GLUE_DATABASE,
+        TableName=glue_table['Name'],
+        PartitionInputList=[
+            {
+                'Values': [str(year)],
+                'StorageDescriptor': {**storage_descriptor, 'Location': f"{location}/{PARTITION_COLUMN}={year}/"}
+            } for year in years
+        ]
+    )
+    errors = [error for error in response.get('Errors', [])
+              if error['ErrorDetail']['ErrorCode'] != 'AlreadyExistsException']
+    if errors:
+        raise RuntimeError(f"Failed to register partitions of {glue_table['Name']}: {errors}")
+    created = len(years) - len(response.get('Errors', []))
+    print(f"Registered {created} new partitions of {glue_table['Name']}")
+
+
+def refresh_rollups(table_name, context):
+    """Refresh the materialized rollups built from the table and wait for the refresh with backoff
+
+    Raises when the refresh did not finish before the deadline, so the invocation is retried with the incoming
+    file still in place.
+    """
+    views = ROLLUP_VIEWS.get(table_name, [])
+    if not views:
+        return
+
+    statement_id = redshift_data.batch_execute_statement(
+        WorkgroupName=os.environ['WORKGROUP'],
+        Database=os.environ['DATABASE'],
+        SecretArn=os.environ['SECRET_ARN'],
+        Sqls=[f"REFRESH MATERIALIZED VIEW {view}" for view in views],
+        StatementName=f"append/{table_name}"
+    )['Id']
+    print(f"Refreshing {views} with statement ID: {statement_id}")
+
+    interval = POLL_INTERVAL
+    while context.get_remaining_time_in_millis() > DEADLINE_MARGIN_MS + interval * 1000:
+        statement = redshift_data.describe_statement(Id=statement_id)
+        if statement['Status'] == 'FINISHED':
+            print(f"Refreshed {views}")
+            return
+        if statement['Status'] in ['FAILED', 'ABORTED']:
+            raise RuntimeError(f"Refresh of {views} {statement['Status']}: {statement.get('Error', '')}")
+        time.sleep(interval)
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+    raise RuntimeError(f"Refresh {statement_id} of {views} still running at the deadline")
+
+
+def reject(bucket, key, reason):
+    """Move a file that does not fit its table to the rejected prefix, next to the reason"""
+    rejected_key = REJECTED_PREFIX + key[len(INCOMING_PREFIX):]
+    s3.copy_object(Bucket=bucket, Key=rejected_key, CopySource={'Bucket': bucket, 'Key': key})
+    s3.put_object(Bucket=bucket, Key=f"{rejected_key}.error.txt", Body=reason.encode())
+    s3.delete_object(Bucket=bucket, Key=key)
+    print(f"Rejected {key}: {reason}")
+
+
+def handler(event, context):
+    """Append a monthly CSV dropped under incoming/<table>/ to the data lake"""
+    print(f"Received event: {json.dumps(event)}")
+    bucket = event['detail']['bucket']['name']
+    key = urllib.parse.unquote_plus(event['detail']['object']['key'])
+
+    parts = key[len(INCOMING_PREFIX):].split('/')
+    if len(parts) != 2 or not parts[1].endswith('.csv'):
+        reject(bucket, key, f"Expected {INCOMING_PREFIX}<table>/<file>.csv")
+        return
+    table_name, file_name = parts
+    if table_name not in APPEND_TABLES:
+        reject(bucket, key, f"{table_name} does not take monthly appends, expected one of {APPEND_TABLES}")
+        return
+
+    glue_table = glue.get_table(DatabaseName=GLUE_DATABASE, Name=table_name)['Table']
+    columns = [(column['Name'], column['Type']) for column in glue_table['StorageDescriptor']['Columns']]
+
+    try:
+        body = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+    except s3.exceptions.NoSuchKey:
+        # A repeated event of a file that was appended and removed already, only the refresh may be missing
+        print(f"{key} was appended already, refreshing the rollups of {table_name}")
+        refresh_rollups(table_name, context)
+        return
+
+    try:
+        table = read_month(body, columns)
+    except ValidationError as e:
+        reject(bucket, key, str(e))
+        return
+
+    keys = write_partitions(bucket, table_name, file_name[:-len('.csv')], table)
+    print(f"Appended {table.num_rows} rows of {table_name}: {list(keys.values())}")
+
+    register_partitions(glue_table, sorted(keys))
+    refresh_rollups(table_name, context)
+
+    # Removed last, so a retry after a failed step finds the file and appends it again in place
+    s3.delete_object(Bucket=bucket, Key=key)
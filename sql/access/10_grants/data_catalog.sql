@@ -0,0 +1,2 @@
+-- The IAMR user of a role exists once the role first connected, so this runs after the knowledge base sync
+GRANT USAGE ON DATABASE "awsdatacatalog" TO "IAMR:{role}";
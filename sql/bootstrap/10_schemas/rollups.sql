@@ -0,0 +1 @@
+CREATE SCHEMA IF NOT EXISTS {rollup_schema};
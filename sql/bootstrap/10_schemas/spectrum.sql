@@ -0,0 +1,3 @@
+-- Glue catalog tables the materialized rollups read through Spectrum
+CREATE EXTERNAL SCHEMA IF NOT EXISTS {spectrum_schema}
+FROM DATA CATALOG DATABASE '{glue_database}' IAM_ROLE default;
@@ -0,0 +1,3 @@
+-- Rollups only hold aggregates, every database user including the knowledge base may read them
+GRANT USAGE ON SCHEMA {rollup_schema} TO PUBLIC;
+GRANT SELECT ON ALL TABLES IN SCHEMA {rollup_schema} TO PUBLIC;
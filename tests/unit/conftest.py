@@ -0,0 +1,10 @@
+import pytest
+
+from business_agent.deploy_benchmark import synth
+
+
+@pytest.fixture(scope="session")
+def cdk_out_dir(tmp_path_factory):
+    cdk_out_dir = str(tmp_path_factory.mktemp("cdk.out"))
+    synth(cdk_out_dir)
+    return cdk_out_dir
@@ -0,0 +1,127 @@
+import http.client
+import importlib.util
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from business_agent.semantic_cache import SemanticCache
+
+os.environ.setdefault("REGION", "us-east-1")
+os.environ.setdefault("ANSWER_MODEL_ID", "answer-model")
+os.environ.setdefault("SQL_MODEL_ID", "sql-model")
+os.environ.update({
+    "FINANCIAL_DATA_KB_ID": "financial",
+    "INTERNAL_REPORTS_KB_ID": "internal",
+    "RESEARCH_REPORTS_KB_ID": "research"
+})
+
+spec = importlib.util.spec_from_file_location("answer_stream", "lambda/answer_stream/app.py")
+answer_stream = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(answer_stream)
+
+TOKENS = ["Costs ", "rose ", "in ", "2023."]
+TOKEN_DELAY = 0.2  # seconds
+
+
+class StubAgentRuntime:
+    def retrieve(self, knowledgeBaseId, **kwargs):
+        return {"retrievalResults": [
+            {"content": {"text": f"{knowledgeBaseId} chunk"}, "score": 0.9, "metadata": {"document_title": "Report"}}
+        ]}
+
+    def retrieve_and_generate(self, **kwargs):
+        return {
+            "output": {"text": "Raw materials cost 1.2M in 2023"},
+            "citations": [{"retrievedReferences": [{"location": {"sqlLocation": {"query": "SELECT 1"}}}]}]
+        }
+
+
+class StubRuntime:
+    """Bedrock stream that produces one token at a time, like a model still generating"""
+
+    def converse_stream(self, **kwargs):
+        def stream():
+            yield {"messageStart": {"role": "assistant"}}
+            for token in TOKENS:
+                time.sleep(TOKEN_DELAY)
+                yield {"contentBlockDelta": {"delta": {"text": token}}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+        return {"stream": stream()}
+
+
+def test_events_arrive_in_order():
+    events = list(answer_stream.stream_answer(
+        "What did raw materials cost?", answer_stream.knowledge_base_ids(), StubAgentRuntime(), StubRuntime()
+    ))
+    names = [event for event, _ in events]
+
+    assert names[0] == "start"
+    assert names[-1] == "done"
+    assert names.index("retrieval_complete") < names.index("token")
+    assert sorted(data["source"] for event, data in events if event in ("sql", "sources")) == [
+        "financial_data", "internal_reports", "research_reports"
+    ]
+    assert "".join(data["text"] for event, data in events if event == "token") == "".join(TOKENS)
+
+
+def test_first_byte_before_generation_finishes():
+    answer_stream.AnswerStreamHandler.client = StubAgentRuntime()
+    answer_stream.AnswerStreamHandler.runtime = StubRuntime()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), answer_stream.AnswerStreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        started = time.monotonic()
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        connection.request("POST", "/", body=json.dumps({"question": "What did raw materials cost?"}))
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.getheader("Content-Type") == "text/event-stream"
+
+        response.read1()
+        first_byte = time.monotonic() - started
+        body = response.read().decode()
+        total = time.monotonic() - started
+    finally:
+        server.shutdown()
+
+    assert first_byte < TOKEN_DELAY
+    assert total >= TOKEN_DELAY * len(TOKENS)
+    assert "event: done" in body
+
+
+class CountingAgentRuntime(StubAgentRuntime):
+    def __init__(self):
+        self.calls = 0
+
+    def retrieve(self, **kwargs):
+        self.calls += 1
+        return super().retrieve(**kwargs)
+
+    def retrieve_and_generate(self, **kwargs):
+        self.calls += 1
+        return super().retrieve_and_generate(**kwargs)
+
+
+def test_cached_answer_skips_the_sources():
+    embeddings = {
+        "What did raw materials cost?": [1.0, 0.0],
+        "How much did raw materials cost?": [0.995, 0.0998]
+    }
+    cache = SemanticCache(embeddings.__getitem__, dimensions=2, version=None)
+    client = CountingAgentRuntime()
+
+    first = list(answer_stream.stream_answer(
+        "What did raw materials cost?", answer_stream.knowledge_base_ids(), client, StubRuntime(), cache
+    ))
+    assert client.calls == 3
+
+    second = list(answer_stream.stream_answer(
+        "How much did raw materials cost?", answer_stream.knowledge_base_ids(), client, StubRuntime(), cache
+    ))
+    assert client.calls == 3
+    assert [event for event, _ in second] == ["start", "cached", "token", "done"]
+    assert second[1][1]["sql"] == ["SELECT 1"]
+    assert second[2][1]["text"] == "".join(data["text"] for event, data in first if event == "token")
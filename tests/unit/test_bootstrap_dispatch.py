@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, "lambda/bootstrap")
+
+import index  # noqa: E402
+from tasks import crawl, usage_limit  # noqa: E402
+
+from business_agent.deploy_critical_path import load_templates  # noqa: E402
+
+
+def event(task, request_type="Delete"):
+    return {
+        "RequestType": request_type,
+        "PhysicalResourceId": "resource-1",
+        "ResourceProperties": {"Task": task, "CrawlerName": "financial-data-crawler"}
+    }
+
+
+def test_events_reach_the_module_of_their_task(monkeypatch):
+    monkeypatch.setattr(crawl, "client", lambda service_name: None)
+
+    assert index.on_event(event("crawl"), None) == {"PhysicalResourceId": "resource-1"}
+    assert index.is_complete(event("crawl"), None) == {"IsComplete": True}
+
+
+def test_task_without_is_complete_finishes_with_on_event():
+    assert not hasattr(usage_limit, "is_complete")
+    assert index.is_complete(event("usage_limit", "Create"), None) == {"IsComplete": True}
+
+
+def test_unknown_task_fails():
+    with pytest.raises(ValueError, match="Unknown bootstrap task reindex"):
+        index.on_event(event("reindex"), None)
+
+
+def test_every_bootstrap_resource_names_a_known_task(cdk_out_dir):
+    tasks = [
+        resource["Properties"]["Task"]
+        for resources in load_templates(cdk_out_dir).values() for resource in resources.values()
+        if resource["Type"] == "AWS::CloudFormation::CustomResource" and "Task" in resource["Properties"]
+    ]
+
+    assert tasks
+    assert set(tasks) <= set(index.TASKS)
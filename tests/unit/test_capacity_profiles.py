@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from business_agent.capacity_profiles import (
+    CAPACITY_PROFILES, QUERY_EXECUTION_TIMEOUT, QUERY_MONITORING_METRICS, QUERY_MONITORING_PARAMETERS,
+    config_parameters
+)
+from business_agent.deploy_critical_path import load_templates
+
+
+def assert_not_mixed(parameter_keys):
+    if "wlm_json_configuration" in parameter_keys:
+        assert not QUERY_MONITORING_PARAMETERS & set(parameter_keys)
+
+
+@pytest.mark.parametrize("profile_name", sorted(CAPACITY_PROFILES))
+def test_profile_keeps_the_timeout_in_the_wlm_rules(profile_name):
+    parameters = config_parameters(CAPACITY_PROFILES[profile_name])
+    assert_not_mixed([parameter["parameter_key"] for parameter in parameters])
+
+    wlm = json.loads(next(
+        parameter["parameter_value"] for parameter in parameters
+        if parameter["parameter_key"] == "wlm_json_configuration"
+    ))
+    predicates = [predicate for queue in wlm for rule in queue["rules"] for predicate in rule["predicate"]]
+    assert {"metric_name": "query_execution_time", "operator": ">", "value": QUERY_EXECUTION_TIMEOUT} in predicates
+    for predicate in predicates:
+        assert predicate["metric_name"] in QUERY_MONITORING_METRICS
+
+
+def test_synthesized_workgroups_do_not_mix_wlm_and_metrics(cdk_out_dir):
+    workgroups = [
+        resource for resources in load_templates(cdk_out_dir).values() for resource in resources.values()
+        if resource["Type"] == "AWS::RedshiftServerless::Workgroup"
+    ]
+
+    assert workgroups
+    for workgroup in workgroups:
+        assert_not_mixed([
+            parameter["ParameterKey"] for parameter in workgroup["Properties"].get("ConfigParameters", [])
+        ])
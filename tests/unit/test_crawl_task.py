@@ -0,0 +1,93 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, "lambda/bootstrap")
+
+from tasks import crawl  # noqa: E402
+
+
+class CrawlerRunningException(Exception):
+    pass
+
+
+class Glue:
+    """Crawler that reports the given states one poll after another, then the tables it found"""
+
+    class exceptions:
+        CrawlerRunningException = CrawlerRunningException
+
+    def __init__(self, crawlers, tables, running=False):
+        self.crawlers = list(crawlers)
+        self.tables = tables
+        self.running = running
+        self.started = 0
+
+    def start_crawler(self, Name):
+        if self.running:
+            raise CrawlerRunningException(Name)
+        self.started += 1
+
+    def get_crawler(self, Name):
+        return {"Crawler": self.crawlers.pop(0)}
+
+    def get_paginator(self, operation):
+        glue = self
+
+        class Paginator:
+            def paginate(self, DatabaseName):
+                return [{"TableList": [{"Name": name} for name in glue.tables]}]
+        return Paginator()
+
+
+def crawler(state, started_at=None, status=None):
+    last_crawl = {"StartTime": started_at, "Status": status} if started_at else {}
+    return {"State": state, "LastCrawl": last_crawl}
+
+
+def event(data=None):
+    return {
+        "RequestType": "Create",
+        "ResourceProperties": {
+            "CrawlerName": "financial-data-crawler",
+            "DatabaseName": "financial_data_db",
+            "ExpectedTables": ["cost_data", "equipment"]
+        },
+        "Data": data or {}
+    }
+
+
+def test_crawl_completes_once_its_own_run_succeeded(monkeypatch):
+    requested_at = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+    glue = Glue([
+        crawler("RUNNING"),
+        # The crawl of an earlier deploy, ours is not recorded yet
+        crawler("READY", datetime(2024, 12, 1, tzinfo=timezone.utc), "SUCCEEDED"),
+        crawler("READY", requested_at, "SUCCEEDED")
+    ], tables=["cost_data", "equipment"])
+    monkeypatch.setattr(crawl, "client", lambda service_name: glue)
+    started = {**event(), **crawl.on_event(event(), None)}
+    started["Data"]["CrawlRequestedAt"] = str(requested_at.timestamp())
+
+    assert glue.started == 1
+    assert crawl.is_complete(started, None) == {"IsComplete": False}
+    assert crawl.is_complete(started, None) == {"IsComplete": False}
+    assert crawl.is_complete(started, None) == {"IsComplete": True, "Data": {"Tables": "cost_data,equipment"}}
+
+
+def test_running_crawl_is_accepted(monkeypatch):
+    glue = Glue([], tables=[], running=True)
+    monkeypatch.setattr(crawl, "client", lambda service_name: glue)
+
+    assert crawl.on_event(event(), None)["Data"] == {"CrawlRequestedAt": "0"}
+
+
+def test_missing_tables_fail_the_crawl(monkeypatch):
+    glue = Glue([crawler("READY", datetime.now(timezone.utc), "SUCCEEDED")], tables=["cost_data"])
+    monkeypatch.setattr(crawl, "client", lambda service_name: glue)
+
+    with pytest.raises(RuntimeError, match=r"missing from financial_data_db: \['equipment'\]"):
+        crawl.is_complete(event({"CrawlRequestedAt": "0"}), None)
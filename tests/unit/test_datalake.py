@@ -0,0 +1,45 @@
+import json
+
+import pyarrow as pa
+import pytest
+
+from business_agent.datalake import read_table, table_definitions
+
+
+def write_source(tmp_path, rows):
+    source_dir = tmp_path / "financial_data"
+    (source_dir / "sales").mkdir(parents=True)
+    with open(source_dir / "sales" / "sales.csv", "w") as f:
+        f.write("\n".join(rows) + "\n")
+    descriptions_path = tmp_path / "descriptions.json"
+    with open(descriptions_path, "w") as f:
+        json.dump({"sales": {}}, f)
+    return str(source_dir), str(descriptions_path)
+
+
+def test_empty_column_is_a_string(tmp_path):
+    source_dir, descriptions_path = write_source(tmp_path, ["Date,Units,Note", "2023-01,5,", "2023-02,7,"])
+
+    definition = table_definitions(source_dir, descriptions_path)[0]
+    columns = {column["name"]: column["type"] for column in definition["columns"]}
+
+    assert columns == {"date": "date", "units": "bigint", "note": "string"}
+
+
+def test_unmapped_type_names_the_column(tmp_path):
+    source_dir, descriptions_path = write_source(tmp_path, ["Units,Recorded", "5,2023-01-01 10:00:00"])
+
+    with pytest.raises(ValueError, match="sales.recorded has Arrow type timestamp"):
+        table_definitions(source_dir, descriptions_path)
+
+
+def test_files_of_a_table_are_read_with_one_type_per_column(tmp_path):
+    source_dir, descriptions_path = write_source(tmp_path, ["Date,Units,Region,Note", "2023-01,5,North,"])
+    with open(tmp_path / "financial_data" / "sales" / "sales_2024.csv", "w") as f:
+        f.write("Date,Units,Region,Note\n2024-01,7.5,12,late\n")
+
+    table = read_table(sorted(str(path) for path in (tmp_path / "financial_data" / "sales").iterdir()))
+
+    assert table.schema.field("units").type == pa.float64()
+    assert table["region"].to_pylist() == ["North", "12"]
+    assert table["note"].to_pylist() == ["", "late"]
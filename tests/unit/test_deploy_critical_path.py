@@ -0,0 +1,18 @@
+from business_agent.deploy_critical_path import DEPLOY_BUDGET_SECONDS, critical_path, redundant_dependencies
+
+
+def test_fresh_deploy_within_budget(cdk_out_dir):
+    result = critical_path(cdk_out_dir)
+
+    assert result["seconds"] <= DEPLOY_BUDGET_SECONDS, "\n".join(
+        f"{step['seconds']:7.1f} s  {step['resource']}" for step in result["path"]
+    )
+
+
+def test_no_dependencies_implied_by_others(cdk_out_dir):
+    implied = [
+        dependency for dependency in redundant_dependencies(cdk_out_dir)
+        if dependency["reason"] != "already referenced"
+    ]
+
+    assert not implied
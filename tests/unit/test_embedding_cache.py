@@ -0,0 +1,33 @@
+import numpy as np
+
+from business_agent.embedding_cache import EmbeddingCache
+
+DIMENSIONS = 4
+
+
+def vector(value):
+    return np.full(DIMENSIONS, value, dtype=np.float32)
+
+
+def test_reopen_after_interrupted_write(tmp_path):
+    cache = EmbeddingCache("test-model", DIMENSIONS, str(tmp_path))
+    cache.put(cache.key("a"), vector(1))
+    cache.put(cache.key("b"), vector(2))
+
+    # The run died after writing the vector of "c" and half of the vector of "d", before either key
+    with open(cache.vectors_path, "ab") as f:
+        f.write(vector(3).tobytes())
+        f.write(vector(4).tobytes()[:DIMENSIONS * 2])
+
+    reopened = EmbeddingCache("test-model", DIMENSIONS, str(tmp_path))
+    assert len(reopened) == 2
+    assert reopened.get(reopened.key("c")) is None
+
+    reopened.put(reopened.key("e"), vector(5))
+    np.testing.assert_array_equal(reopened.get(reopened.key("a")), vector(1))
+    np.testing.assert_array_equal(reopened.get(reopened.key("b")), vector(2))
+    np.testing.assert_array_equal(reopened.get(reopened.key("e")), vector(5))
+
+    again = EmbeddingCache("test-model", DIMENSIONS, str(tmp_path))
+    assert len(again) == 3
+    np.testing.assert_array_equal(again.get(again.key("e")), vector(5))
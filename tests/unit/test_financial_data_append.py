@@ -0,0 +1,125 @@
+import importlib.util
+import io
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.update({
+    "GLUE_DATABASE": "financial_data_db",
+    "DATALAKE_PREFIX": "financial_data",
+    "INCOMING_PREFIX": "incoming/",
+    "REJECTED_PREFIX": "rejected/",
+    "APPEND_TABLES": "cost_data",
+    "ROLLUP_VIEWS": json.dumps({"cost_data": ["financial_rollups.cost_yearly"]}),
+    "WORKGROUP": "financial-data-workgroup",
+    "DATABASE": "dev",
+    "SECRET_ARN": "arn:aws:secretsmanager:us-east-1:123456789012:secret:admin"
+})
+
+spec = importlib.util.spec_from_file_location("financial_data_append", "lambda/financial_data_append/index.py")
+append = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(append)
+
+KEY = "incoming/cost_data/2025-01.csv"
+CSV = b"date,raw_materials\n2025-01,425000\n"
+
+
+class NoSuchKey(Exception):
+    pass
+
+
+class S3:
+    class exceptions:
+        NoSuchKey = NoSuchKey
+
+    def __init__(self, objects):
+        self.objects = dict(objects)
+        self.calls = []
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise NoSuchKey(Key)
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def put_object(self, Bucket, Key, Body):
+        self.calls.append(("put", Key))
+        self.objects[Key] = Body
+
+    def delete_object(self, Bucket, Key):
+        self.calls.append(("delete", Key))
+        del self.objects[Key]
+
+
+class Glue:
+    def get_table(self, DatabaseName, Name):
+        return {"Table": {
+            "Name": Name,
+            "StorageDescriptor": {
+                "Location": "s3://bucket/financial_data/cost_data/",
+                "Columns": [{"Name": "date", "Type": "date"}, {"Name": "raw_materials", "Type": "bigint"}]
+            }
+        }}
+
+    def batch_create_partition(self, **kwargs):
+        return {}
+
+
+class RedshiftData:
+    def __init__(self, status):
+        self.status = status
+        self.refreshes = 0
+
+    def batch_execute_statement(self, **kwargs):
+        self.refreshes += 1
+        return {"Id": f"refresh-{self.refreshes}"}
+
+    def describe_statement(self, Id):
+        return {"Status": self.status, "Error": "could not refresh"}
+
+
+class Context:
+    def __init__(self, remaining_ms=300 * 1000):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        self.remaining_ms -= 1000
+        return self.remaining_ms
+
+
+def handle(monkeypatch, s3, redshift_data, context=None):
+    monkeypatch.setattr(append, "s3", s3)
+    monkeypatch.setattr(append, "glue", Glue())
+    monkeypatch.setattr(append, "redshift_data", redshift_data)
+    append.handler({"detail": {"bucket": {"name": "bucket"}, "object": {"key": KEY}}}, context or Context())
+
+
+def test_failed_refresh_keeps_the_file_for_the_retry(monkeypatch):
+    s3 = S3({KEY: CSV})
+    with pytest.raises(RuntimeError, match="could not refresh"):
+        handle(monkeypatch, s3, RedshiftData("FAILED"))
+    assert KEY in s3.objects
+
+    # The retry appends the same file in place and removes it once the rollups are refreshed
+    handle(monkeypatch, s3, RedshiftData("FINISHED"))
+    assert KEY not in s3.objects
+    assert s3.calls[-1] == ("delete", KEY)
+    assert [key for action, key in s3.calls if action == "put"] == [
+        "financial_data/cost_data/year=2025/append-2025-01.parquet"
+    ] * 2
+
+
+def test_retry_of_an_appended_file_refreshes_the_rollups(monkeypatch):
+    redshift_data = RedshiftData("FINISHED")
+    handle(monkeypatch, S3({}), redshift_data)
+    assert redshift_data.refreshes == 1
+
+
+
+def test_unfinished_refresh_keeps_the_file_for_the_retry(monkeypatch):
+    monkeypatch.setattr(append.time, "sleep", lambda seconds: None)
+    s3 = S3({KEY: CSV})
+    with pytest.raises(RuntimeError, match="still running"):
+        handle(monkeypatch, s3, RedshiftData("STARTED"), Context(remaining_ms=20 * 1000))
+    assert KEY in s3.objects
@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, "lambda/bootstrap")
+
+from tasks import index_init  # noqa: E402
+
+from business_agent.index_profiles import DEFAULT_INDEX_PROFILE, INDEX_PROFILES, index_mapping  # noqa: E402
+
+URL = "https://collection.aoss.amazonaws.com/internal-reports"
+
+
+class Response:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+        self.ok = status_code < 400
+
+
+def collection(responses):
+    """Answer requests from a list of (method, path suffix, response) and record them"""
+    requests = []
+
+    def aoss_request(method, url, body=None):
+        requests.append((method, url, body))
+        for expected_method, suffix, response in responses:
+            if method == expected_method and url.endswith(suffix):
+                return response
+        raise AssertionError(f"unexpected {method} {url}")
+    return aoss_request, requests
+
+
+def current_mapping(properties):
+    return Response(200, json.dumps({"internal-reports": {"mappings": {"properties": properties}}}))
+
+
+def test_existing_index_gets_only_the_missing_fields(monkeypatch):
+    mapping = index_mapping(INDEX_PROFILES[DEFAULT_INDEX_PROFILE])
+    existing = {
+        name: field for name, field in mapping["mappings"]["properties"].items() if name != "year"
+    }
+    # Mapped dynamically by Bedrock before the profile declared it, the existing field is left as it is
+    existing["x-amz-bedrock-kb-source-uri"] = {"type": "text"}
+    aoss_request, requests = collection([
+        ("HEAD", "/internal-reports", Response(200)),
+        ("GET", "/_mapping", current_mapping(existing)),
+        ("PUT", "/_mapping", Response(200, '{"acknowledged": true}'))
+    ])
+    monkeypatch.setattr(index_init, "aoss_request", aoss_request)
+
+    index_init.create_index(URL, "internal-reports", mapping, lambda delay: False)
+
+    year = mapping["mappings"]["properties"]["year"]
+    assert requests[-1] == ("PUT", f"{URL}/_mapping", {"properties": {"year": year}})
+
+
+def test_conflicting_field_is_logged_not_raised(monkeypatch, capsys):
+    mapping = index_mapping(INDEX_PROFILES[DEFAULT_INDEX_PROFILE])
+    existing = {**mapping["mappings"]["properties"], "year": {"type": "keyword"}}
+    aoss_request, requests = collection([
+        ("HEAD", "/internal-reports", Response(200)),
+        ("GET", "/_mapping", current_mapping(existing))
+    ])
+    monkeypatch.setattr(index_init, "aoss_request", aoss_request)
+
+    index_init.create_index(URL, "internal-reports", mapping, lambda delay: False)
+
+    assert [method for method, _, _ in requests] == ["HEAD", "GET"]
+    assert "year is keyword" in capsys.readouterr().out
@@ -0,0 +1,54 @@
+import pytest
+
+from business_agent.index_profiles import (
+    INDEX_PROFILES, embedding_model_configuration, estimated_memory_bytes, index_mapping, index_name,
+    resolve_profiles
+)
+
+INDICES = ["internal_reports_index", "research_reports_index"]
+
+
+def test_profiles_resolve_to_the_default_unless_overridden():
+    assert resolve_profiles(INDICES) == {index: "high_recall" for index in INDICES}
+    assert resolve_profiles(INDICES, '{"research_reports_index": "compact"}')["research_reports_index"] == "compact"
+
+    with pytest.raises(ValueError, match="unknown indices: reports_index"):
+        resolve_profiles(INDICES, {"reports_index": "compact"})
+    with pytest.raises(ValueError, match="Unknown index profile fast"):
+        resolve_profiles(INDICES, {"research_reports_index": "fast"})
+
+
+def test_only_other_profiles_get_a_new_index():
+    assert index_name("research_reports_index", "high_recall") == "research_reports_index"
+    assert index_name("research_reports_index", "balanced") == "research_reports_index_balanced"
+
+
+def test_mapping_carries_the_vector_parameters_of_each_profile():
+    fields = {name: index_mapping(profile)["mappings"]["properties"] for name, profile in INDEX_PROFILES.items()}
+
+    high_recall = fields["high_recall"]["content_embedding"]
+    assert high_recall["dimension"] == 1024
+    assert high_recall["method"]["space_type"] == "l2"
+    assert "data_type" not in high_recall
+
+    balanced = fields["balanced"]["content_embedding"]
+    assert balanced["dimension"] == 512
+    assert balanced["method"]["parameters"]["encoder"] == {"name": "sq", "parameters": {"type": "fp16"}}
+
+    compact = fields["compact"]["content_embedding"]
+    assert compact["data_type"] == "binary"
+    assert compact["method"]["space_type"] == "hamming"
+    assert embedding_model_configuration(INDEX_PROFILES["compact"]) == {
+        "dimensions": 1024, "embedding_data_type": "BINARY"
+    }
+
+    # Every profile types the report metadata for pre-filtered knn queries
+    assert all(properties["year"] == {"type": "integer"} for properties in fields.values())
+
+
+def test_smaller_profiles_need_less_memory():
+    memory = {name: estimated_memory_bytes(profile, 1_000_000) for name, profile in INDEX_PROFILES.items()}
+
+    assert memory["compact"] < memory["balanced"] < memory["high_recall"]
+    # 1.1 * (1024 * 4 bytes + 8 * 16 bytes of graph links) per vector
+    assert memory["high_recall"] == int(1.1 * (4096 + 128) * 1_000_000)
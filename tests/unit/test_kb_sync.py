@@ -0,0 +1,157 @@
+import json
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, "lambda/bootstrap")
+
+from tasks import kb_sync  # noqa: E402
+
+from business_agent.documents import document_manifest  # noqa: E402
+
+
+class BedrockAgent:
+    """Ingestion jobs that finish after a number of polls, the failing data sources with a failure reason"""
+
+    def __init__(self, polls=1, failing=()):
+        self.polls = polls
+        self.failing = failing
+        self.jobs = {}
+
+    def start_ingestion_job(self, knowledgeBaseId, dataSourceId):
+        job_id = f"job-{dataSourceId}"
+        self.jobs[job_id] = {"dataSourceId": dataSourceId, "polls": 0}
+        return {"ingestionJob": {"ingestionJobId": job_id, "status": "STARTING"}}
+
+    def get_ingestion_job(self, knowledgeBaseId, dataSourceId, ingestionJobId):
+        job = self.jobs[ingestionJobId]
+        job["polls"] += 1
+        if job["polls"] < self.polls:
+            return {"ingestionJob": {"status": "IN_PROGRESS"}}
+        if dataSourceId in self.failing:
+            return {"ingestionJob": {"status": "FAILED", "failureReasons": ["parsing failed"]}}
+        return {"ingestionJob": {"status": "COMPLETE", "statistics": {"numberOfNewDocumentsIndexed": 3}}}
+
+
+class Context:
+    def __init__(self, remaining_ms=900_000):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def event(*data_source_ids):
+    return {
+        "RequestType": "Create",
+        "ResourceProperties": {
+            "Sources": [
+                {"KnowledgeBaseId": "kb-reports", "DataSourceId": data_source_id}
+                for data_source_id in data_source_ids
+            ]
+        }
+    }
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(kb_sync.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def start(monkeypatch, bedrock_agent, *data_source_ids):
+    monkeypatch.setattr(kb_sync, "client", lambda service_name: bedrock_agent)
+    create = event(*data_source_ids)
+    return {**create, **kb_sync.on_event(create, None)}
+
+
+def test_each_data_source_of_a_knowledge_base_reports_its_statistics(monkeypatch, sleeps):
+    started = start(monkeypatch, BedrockAgent(), "ds-parsed", "ds-multimodal")
+
+    statistics = json.loads(kb_sync.is_complete(started, Context())["Data"]["Statistics"])
+
+    assert sorted(statistics) == ["kb-reports/ds-multimodal", "kb-reports/ds-parsed"]
+    assert statistics["kb-reports/ds-multimodal"]["documentsIndexed"] == 3
+
+
+def test_failure_names_the_data_source(monkeypatch, sleeps):
+    started = start(monkeypatch, BedrockAgent(failing={"ds-multimodal"}), "ds-parsed", "ds-multimodal")
+
+    with pytest.raises(RuntimeError, match="kb-reports/ds-multimodal FAILED"):
+        kb_sync.is_complete(started, Context())
+
+
+def test_polling_backs_off_until_the_jobs_finish(monkeypatch, sleeps):
+    started = start(monkeypatch, BedrockAgent(polls=4), "ds-parsed")
+
+    assert kb_sync.is_complete(started, Context())["IsComplete"]
+    assert sleeps == [5, 7.5, 11.25]
+
+
+def test_running_jobs_are_handed_back_before_the_timeout(monkeypatch, sleeps):
+    bedrock_agent = BedrockAgent(polls=2)
+    started = start(monkeypatch, bedrock_agent, "ds-parsed")
+
+    # Not enough time left for another poll, the provider invokes is_complete again later
+    assert kb_sync.is_complete(started, Context(remaining_ms=10_000)) == {"IsComplete": False}
+    assert sleeps == []
+
+    # The next invocation picks the job up again from the on_event output
+    assert kb_sync.is_complete(started, Context())["IsComplete"]
+    assert bedrock_agent.jobs["job-ds-parsed"]["polls"] == 2
+
+
+def update(old_sources, sources):
+    def properties(sources):
+        return {"Sources": [
+            {"KnowledgeBaseId": "kb-reports", "DataSourceId": data_source_id, "Bucket": "reports",
+             **({"Manifest": json.dumps(manifest)} if manifest is not None else {})}
+            for data_source_id, manifest in sources.items()
+        ]}
+    return {
+        "RequestType": "Update",
+        "OldResourceProperties": properties(old_sources),
+        "ResourceProperties": properties(sources)
+    }
+
+
+def write_reports(directory, reports):
+    directory.mkdir(exist_ok=True)
+    for path in directory.iterdir():
+        path.unlink()
+    for name, content in reports.items():
+        (directory / name).write_text(content)
+    return document_manifest(str(directory), "parsed/")
+
+
+def test_only_changed_documents_are_ingested(tmp_path):
+    reports = tmp_path / "reports"
+    old_manifest = write_reports(reports, {
+        "q1.md": "Q1", "q1.md.metadata.json": "{}", "q2.md": "Q2", "q2.md.metadata.json": "{}", "q3.md": "Q3",
+        "q5.md": "Q5"
+    })
+    # q1 changed, only the metadata of q2 changed, q3 was removed and q4 added
+    manifest = write_reports(reports, {
+        "q1.md": "Q1 revised", "q1.md.metadata.json": "{}", "q2.md": "Q2", "q2.md.metadata.json": '{"year": 2024}',
+        "q4.md": "Q4", "q5.md": "Q5"
+    })
+
+    plan, = kb_sync.plan_sources(update({"ds-parsed": old_manifest}, {"ds-parsed": manifest}))
+
+    assert plan["mode"] == "documents"
+    assert plan["ingest"] == ["s3://reports/parsed/q1.md", "s3://reports/parsed/q2.md", "s3://reports/parsed/q4.md"]
+    assert plan["metadata"] == ["s3://reports/parsed/q1.md", "s3://reports/parsed/q2.md"]
+    assert plan["delete"] == ["s3://reports/parsed/q3.md"]
+    assert plan["unchanged"] == 1
+
+
+def test_new_data_source_gets_a_full_job_and_one_without_manifest_is_skipped():
+    plans = kb_sync.plan_sources(update(
+        {"ds-parsed": None},
+        {"ds-parsed": None, "ds-multimodal": {"multimodal/q1.md": "hash"}}
+    ))
+
+    assert [(plan["dataSourceId"], plan["mode"]) for plan in plans] == [("ds-multimodal", "job")]
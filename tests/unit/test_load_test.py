@@ -0,0 +1,40 @@
+import asyncio
+
+from business_agent.load_test import LoadTest, Throttled
+
+
+class ThrottlingBackend:
+    """Reports answer after a delay and financial data throttles every call at once"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def sources(self, question):
+        return ["financial_data", "internal_reports"] if question == "costs" else ["internal_reports"]
+
+    async def call(self, source, question):
+        self.calls += 1
+        if source == "financial_data":
+            raise Throttled("financial_data queue is full")
+        await asyncio.sleep(0.05)
+
+
+def test_throttled_questions_are_not_timed():
+    load_test = LoadTest(ThrottlingBackend(), [("costs", 1.0), ("reports", 1.0)], concurrency=2, requests=40)
+    report = asyncio.run(load_test.run())
+
+    assert report["requests"] + report["failed_requests"] == 40
+    assert report["failed_requests"] == report["throttled_requests"] > 0
+    # Every timed question waited for its report call, none returned with the throttled call
+    assert report["p50_ms"] >= 50
+    assert report["sources"]["financial_data"]["throughput_per_s"] == 0
+    assert report["sources"]["financial_data"]["throttle_rate"] == 1
+
+
+def test_throttled_analyst_backs_off():
+    backend = ThrottlingBackend()
+    load_test = LoadTest(backend, [("costs", 1.0)], concurrency=1, duration=1.0)
+    asyncio.run(load_test.run())
+
+    # Without the backoff the analyst would ask hundreds of questions in a second
+    assert backend.calls < 40
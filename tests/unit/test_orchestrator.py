@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from business_agent.orchestrator import Orchestrator
+
+
+class Runtime:
+    def __init__(self):
+        self.prompts = []
+
+    def converse(self, modelId, messages, inferenceConfig):
+        self.prompts.append(messages[0]["content"][0]["text"])
+        return {"output": {"message": {"content": [{"text": "Raw materials cost 1.2M [financial_data 1]"}]}}}
+
+
+class Session:
+    region_name = "us-east-1"
+
+    def __init__(self):
+        self.runtime = Runtime()
+
+    def client(self, service_name, config=None):
+        return self.runtime if service_name == "bedrock-runtime" else None
+
+
+def make_orchestrator(timeouts):
+    session = Session()
+    orchestrator = Orchestrator(
+        {"financial_data": "kb-sql", "internal_reports": "kb-internal", "research_reports": "kb-research"},
+        timeouts=timeouts, session=session, route=False
+    )
+    return orchestrator, session.runtime
+
+
+def test_slow_and_failing_sources_are_left_out(monkeypatch):
+    orchestrator, runtime = make_orchestrator({"financial_data": 1.0, "internal_reports": 1.0, "research_reports": 0.2})
+
+    def query_financial_data(question):
+        time.sleep(0.3)
+        return [{"text": "raw_materials 1200000", "queries": ["SELECT SUM(raw_materials) FROM cost_data"]}]
+
+    def query_reports(source, question):
+        if source == "internal_reports":
+            raise RuntimeError("throttled")
+        time.sleep(1)
+        return [{"text": "late", "document": "Market study"}]
+
+    monkeypatch.setattr(orchestrator, "query_financial_data", query_financial_data)
+    monkeypatch.setattr(orchestrator, "query_reports", query_reports)
+
+    result = asyncio.run(orchestrator.answer("What did raw materials cost?"))
+
+    assert result["sources"]["financial_data"]["status"] == "ok"
+    assert result["sources"]["internal_reports"]["status"] == "error"
+    assert result["sources"]["internal_reports"]["error"] == "RuntimeError: throttled"
+    assert result["sources"]["research_reports"]["status"] == "timeout"
+    assert result["sql"] == ["SELECT SUM(raw_materials) FROM cost_data"]
+    # The sources ran side by side, the slow one only cost its timeout
+    assert result["retrieval_seconds"] < 0.5
+    assert "late" not in runtime.prompts[0]
+
+
+def test_no_context_skips_the_answer_model(monkeypatch):
+    orchestrator, runtime = make_orchestrator({})
+    monkeypatch.setattr(orchestrator, "query_financial_data", lambda question: [])
+    monkeypatch.setattr(orchestrator, "query_reports", lambda source, question: [])
+
+    result = asyncio.run(orchestrator.answer("What did raw materials cost?"))
+
+    assert result["answer"] == "None of the knowledge bases returned a result for this question."
+    assert runtime.prompts == []
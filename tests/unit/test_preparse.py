@@ -0,0 +1,55 @@
+import json
+import os
+
+import docx
+
+from business_agent.preparse import cache_key, preparse_reports
+
+
+def write_report(path, *paragraphs):
+    document = docx.Document()
+    document.add_heading("Smart Packaging Pilot", 1)
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def test_cache_key_follows_the_content_and_the_knowledge_base(tmp_path):
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        write_report(tmp_path / directory / "pilot.docx", "Date: March 3, 2023")
+    first, copy = str(tmp_path / "a" / "pilot.docx"), str(tmp_path / "b" / "pilot.docx")
+
+    assert cache_key(first, "internal_reports") == cache_key(copy, "internal_reports")
+    assert cache_key(first, "internal_reports") != cache_key(first, "research_reports")
+
+    write_report(copy, "Date: March 3, 2024")
+    assert cache_key(first, "internal_reports") != cache_key(copy, "internal_reports")
+
+
+def test_unchanged_reports_are_not_parsed_again(tmp_path):
+    source_dir, cache_dir = tmp_path / "reports", tmp_path / "cache"
+    source_dir.mkdir()
+    write_report(source_dir / "Smart Packaging Pilot.docx", "Date: March 3, 2023", "Results were good.")
+
+    output_dir = preparse_reports(str(source_dir), "internal_reports", str(tmp_path / "out"), str(cache_dir))
+    markdown = os.path.join(output_dir, "parsed", "Smart Packaging Pilot.md")
+    with open(markdown + ".metadata.json") as f:
+        attributes = json.load(f)["metadataAttributes"]
+    assert attributes["source_kb"] == "internal_reports"
+    assert attributes["year"] == 2023
+    with open(markdown) as f:
+        assert "Results were good." in f.read()
+
+    entry, = os.listdir(cache_dir)
+    modified = os.path.getmtime(cache_dir / entry)
+    preparse_reports(str(source_dir), "internal_reports", str(tmp_path / "out"), str(cache_dir))
+    assert os.listdir(cache_dir) == [entry]
+    assert os.path.getmtime(cache_dir / entry) == modified
+
+    # A changed report gets a new entry, the output only holds its current version
+    write_report(source_dir / "Smart Packaging Pilot.docx", "Date: March 3, 2023", "Results were better.")
+    preparse_reports(str(source_dir), "internal_reports", str(tmp_path / "out"), str(cache_dir))
+    assert len(os.listdir(cache_dir)) == 2
+    with open(markdown) as f:
+        assert "Results were better." in f.read()
@@ -0,0 +1,41 @@
+import re
+
+import pytest
+
+from business_agent.local_sql import connect
+from business_agent.rollups import ROLLUPS, SPECTRUM_SCHEMA, rollup_groups, rollup_table_name
+
+
+@pytest.fixture(scope="module")
+def connection():
+    return connect()
+
+
+def test_groups_recreate_every_view_from_the_spectrum_schema():
+    groups = {group["Name"]: group["Statements"] for group in rollup_groups()}
+
+    assert sorted(groups) == sorted(f"rollups/{rollup['name']}" for rollup in ROLLUPS)
+    drop, create = groups["rollups/cost_yearly"]
+    assert drop == "DROP MATERIALIZED VIEW IF EXISTS financial_rollups.cost_yearly"
+    assert create.startswith("CREATE MATERIALIZED VIEW financial_rollups.cost_yearly AUTO REFRESH NO AS SELECT")
+    assert f"FROM {SPECTRUM_SCHEMA}.cost_data GROUP BY year" in create
+
+
+@pytest.mark.parametrize("rollup", ROLLUPS, ids=[rollup["name"] for rollup in ROLLUPS])
+def test_rollup_has_its_documented_columns_and_sources(connection, rollup):
+    columns = [column[0] for column in connection.execute(
+        f"SELECT * FROM {rollup_table_name(rollup)} LIMIT 0"
+    ).description]
+
+    assert columns == list(rollup["columns"])
+    # The monthly append refreshes a view when one of its source tables changes
+    assert set(re.findall(r"\{spectrum_schema\}\.(\w+)", rollup["sql"])) == set(rollup["source_tables"])
+
+
+def test_yearly_totals_match_the_monthly_rows(connection):
+    rollup_total, monthly_total = connection.execute(
+        "SELECT (SELECT SUM(total_raw_materials) FROM financial_data_db.financial_rollups.cost_yearly), "
+        "(SELECT SUM(raw_materials) FROM cost_data)"
+    ).fetchone()
+
+    assert rollup_total == pytest.approx(monthly_total)
@@ -0,0 +1,36 @@
+import pytest
+
+from business_agent.router import SOURCES, Router, router_artifacts
+from business_agent.router_benchmark import labelled_questions, run_benchmark
+
+
+@pytest.fixture(scope="module")
+def router():
+    return Router(router_artifacts())
+
+
+@pytest.mark.parametrize("scores, expected", [
+    # Above the threshold, or close enough to the best source
+    ((0.5, 0.36, 0.1), ["financial_data", "internal_reports"]),
+    ((0.3, 0.1, 0.22), ["financial_data", "research_reports"]),
+    # No source matches with confidence, every one of them is asked
+    ((0.1, 0.05, 0.0), list(SOURCES))
+])
+def test_thresholds_select_the_sources(monkeypatch, router, scores, expected):
+    monkeypatch.setattr(router, "scores", lambda question: dict(zip(SOURCES, scores)))
+
+    assert router.route("question")[0] == expected
+
+
+def test_questions_go_to_the_sources_they_name(router):
+    assert router.route("What was the total raw materials cost per year?")[0] == ["financial_data"]
+    assert router.route("What were the lessons learned from the Smart Packaging Pilot?")[0] == ["internal_reports"]
+    assert router.route("Are consumers willing to pay more for compostable packaging?")[0] == ["research_reports"]
+
+
+def test_labelled_questions_keep_their_coverage():
+    summary = run_benchmark(labelled_questions(), repeats=1)
+
+    # A missed source loses part of the answer, an extra one only costs a call
+    assert summary["coverage"] >= 0.95
+    assert summary["calls_per_question"] <= 1.5
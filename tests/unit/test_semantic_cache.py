@@ -0,0 +1,112 @@
+import numpy as np
+
+from business_agent.semantic_cache import VERSION_CHECK_SECONDS, SemanticCache
+
+DIMENSIONS = 16
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def topic(index):
+    return unit(np.eye(DIMENSIONS)[index])
+
+
+def rephrasing(index):
+    # Cosine similarity of about 0.995 to the topic's own question
+    return unit(np.eye(DIMENSIONS)[index] + 0.1 * np.eye(DIMENSIONS)[(index + 1) % DIMENSIONS])
+
+
+EMBEDDINGS = {
+    "What did raw materials cost?": topic(0),
+    "How much did we spend on raw materials?": rephrasing(0),
+    "Which products sold best?": topic(2),
+    "Which product lines sold the most?": rephrasing(2),
+    "What were the marketing expenses?": topic(4),
+    "Cost breakdown 2023": topic(6),
+    "Cost breakdown for 2023": rephrasing(6),
+    "Cost breakdown 2022": rephrasing(6)
+}
+
+
+def make_cache(clock, **kwargs):
+    return SemanticCache(EMBEDDINGS.__getitem__, dimensions=DIMENSIONS, clock=clock, **kwargs)
+
+
+def test_rephrasing_hits_and_other_question_misses():
+    cache = make_cache(Clock(), version=None)
+    cache.put("What did raw materials cost?", "1.2M", ["SELECT 1"])
+
+    hit = cache.lookup("How much did we spend on raw materials?")
+    assert hit["answer"] == "1.2M"
+    assert hit["sql"] == ["SELECT 1"]
+    assert hit["question"] == "What did raw materials cost?"
+    assert hit["similarity"] > 0.99
+
+    assert cache.lookup("Which products sold best?") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_different_year_misses():
+    cache = make_cache(Clock(), version=None)
+    cache.put("Cost breakdown 2023", "answer for 2023")
+
+    assert cache.lookup("Cost breakdown 2022") is None
+    assert cache.lookup("Cost breakdown for 2023")["answer"] == "answer for 2023"
+
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = make_cache(clock, version=None, ttl_seconds=60)
+    cache.put("What did raw materials cost?", "1.2M")
+
+    clock.now = 59
+    assert cache.lookup("How much did we spend on raw materials?") is not None
+    clock.now = 60
+    assert cache.lookup("How much did we spend on raw materials?") is None
+    assert len(cache) == 0
+
+
+def test_full_cache_evicts_least_recently_used():
+    clock = Clock()
+    cache = make_cache(clock, version=None, max_entries=2)
+    cache.put("What did raw materials cost?", "raw materials")
+    clock.now = 1
+    cache.put("Which products sold best?", "products")
+
+    # Using the older entry makes the newer one the least recently used
+    clock.now = 2
+    assert cache.lookup("How much did we spend on raw materials?") is not None
+    clock.now = 3
+    cache.put("What were the marketing expenses?", "marketing")
+
+    assert cache.lookup("How much did we spend on raw materials?")["answer"] == "raw materials"
+    assert cache.lookup("Which product lines sold the most?") is None
+    assert cache.lookup("What were the marketing expenses?")["answer"] == "marketing"
+
+
+def test_changed_data_version_drops_every_entry():
+    clock = Clock()
+    versions = ["v1"]
+    cache = make_cache(clock, version=lambda: versions[-1])
+    cache.put("What did raw materials cost?", "1.2M")
+
+    # The version is only checked again after VERSION_CHECK_SECONDS
+    versions.append("v2")
+    clock.now = VERSION_CHECK_SECONDS - 1
+    assert cache.lookup("How much did we spend on raw materials?") is not None
+
+    clock.now = VERSION_CHECK_SECONDS
+    assert cache.lookup("How much did we spend on raw materials?") is None
+    assert len(cache) == 0
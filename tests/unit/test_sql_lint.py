@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from business_agent.sql_lint import checked_query_pairs, rewrite
+
+
+def write_pairs(tmp_path, *pairs):
+    path = tmp_path / "curated_queries.json"
+    with open(path, "w") as f:
+        json.dump({"queryPairs": [{"naturalLanguage": question, "sqlQuery": sql} for question, sql in pairs]}, f)
+    return str(path)
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM cost_data WHERE date LIKE '2023-%'", "SELECT * FROM cost_data WHERE year = 2023"),
+    ("SELECT * FROM cost_data c WHERE c.date LIKE '2023-04%'",
+     "SELECT * FROM cost_data c WHERE c.year = 2023 AND c.date = DATE '2023-04-01'"),
+    ("SELECT SUM(labor) FROM cost_data WHERE EXTRACT(YEAR FROM date) = '2022'",
+     "SELECT SUM(labor) FROM cost_data WHERE year = 2022"),
+    ("SELECT DATE_PART('year', date) AS y FROM cost_data", "SELECT year AS y FROM cost_data")
+])
+def test_date_predicates_are_rewritten_onto_the_partition(sql, expected):
+    assert rewrite(sql)[0] == expected
+
+
+def test_rewritten_pairs_are_returned(tmp_path):
+    path = write_pairs(tmp_path, ("What was the labor cost in 2023?",
+                                  "SELECT SUM(labor) FROM cost_data WHERE date LIKE '2023-%'"))
+
+    assert checked_query_pairs(path)[0]["sqlQuery"] == "SELECT SUM(labor) FROM cost_data WHERE year = 2023"
+
+
+def test_unknown_column_fails_the_synth(tmp_path):
+    path = write_pairs(
+        tmp_path,
+        ("What was the labor cost?", "SELECT SUM(labor) FROM cost_data"),
+        ("What was the packaging cost?", "SELECT SUM(packaging_cost) FROM cost_data")
+    )
+
+    with pytest.raises(ValueError, match=r"#1 \(What was the packaging cost\?\): .*packaging_cost"):
+        checked_query_pairs(path)
+
+
+def test_question_over_time_must_not_pin_one_year(tmp_path):
+    path = write_pairs(tmp_path, ("How did labor costs change over time?",
+                                  "SELECT date, labor FROM cost_data WHERE year = 2023"))
+
+    with pytest.raises(ValueError, match="asks about a change over time but the query only reads year 2023"):
+        checked_query_pairs(path)
@@ -0,0 +1,117 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, "lambda/bootstrap")
+
+from tasks import sql  # noqa: E402
+
+
+class RedshiftData:
+    """Data API that runs every statement for a number of polls and honours client tokens"""
+
+    def __init__(self, polls=2, failing=()):
+        self.polls = polls
+        self.failing = failing
+        self.statements = {}
+        self.tokens = {}
+        self.submitted = []
+        self.described = []
+
+    def batch_execute_statement(self, Sqls, StatementName, ClientToken, **kwargs):
+        if ClientToken not in self.tokens:
+            # The next stage only starts once every group of the current one finished
+            stage = StatementName.split("/")[0]
+            assert all(
+                statement["polls"] >= self.polls for statement in self.statements.values()
+                if not statement["name"].startswith(f"{stage}/")
+            )
+            statement_id = f"id-{len(self.statements)}"
+            self.tokens[ClientToken] = statement_id
+            self.statements[statement_id] = {"name": StatementName, "polls": 0}
+            self.submitted.append(StatementName)
+        return {"Id": self.tokens[ClientToken]}
+
+    def describe_statement(self, Id):
+        self.described.append(Id)
+        statement = self.statements[Id]
+        statement["polls"] += 1
+        if statement["name"] in self.failing:
+            return {"Status": "FAILED", "Error": "relation does not exist", "SubStatements": []}
+        return {"Status": "FINISHED" if statement["polls"] >= self.polls else "STARTED"}
+
+
+class Context:
+    def __init__(self, remaining_ms=300_000):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(sql.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def event(request_type="Create"):
+    return {
+        "RequestType": request_type,
+        "RequestId": "request-1",
+        "PhysicalResourceId": "financial-bootstrap",
+        "ResourceProperties": {
+            "Name": "financial-bootstrap",
+            "Workgroup": "financial-data-workgroup",
+            "Database": "dev",
+            "SecretArn": "arn:aws:secretsmanager:us-east-1:123456789012:secret:admin",
+            "Stages": [
+                [{"Name": "10_schemas/a.sql", "Statements": ["SELECT 1"]},
+                 {"Name": "10_schemas/b.sql", "Statements": ["SELECT 2"]}],
+                [{"Name": "20_rollups/c", "Statements": ["SELECT 3"]}]
+            ]
+        }
+    }
+
+
+def start(monkeypatch, redshift_data):
+    monkeypatch.setattr(sql, "client", lambda service_name: redshift_data)
+    create = event()
+    return {**create, **sql.on_event(create, None)}
+
+
+def test_stages_advance_from_is_complete(monkeypatch, sleeps):
+    redshift_data = RedshiftData(polls=3)
+    started = start(monkeypatch, redshift_data)
+    assert redshift_data.submitted == ["10_schemas/a.sql", "10_schemas/b.sql"]
+
+    assert sql.is_complete(started, Context())["IsComplete"]
+
+    assert redshift_data.submitted == ["10_schemas/a.sql", "10_schemas/b.sql", "20_rollups/c"]
+    # Only the statements still running are described, with a growing wait in between
+    assert len(redshift_data.described) == 3 * 3
+    assert sleeps == [2, 3.0, 2, 3.0]
+
+
+def test_running_stage_is_handed_back_before_the_timeout(monkeypatch, sleeps):
+    redshift_data = RedshiftData(polls=2)
+    started = start(monkeypatch, redshift_data)
+
+    assert sql.is_complete(started, Context(remaining_ms=10_000)) == {"IsComplete": False}
+    assert sleeps == []
+
+    # The next invocation resubmits the stages it reaches, every group still runs exactly once
+    assert sql.is_complete(started, Context())["IsComplete"]
+    assert redshift_data.submitted == ["10_schemas/a.sql", "10_schemas/b.sql", "20_rollups/c"]
+
+
+def test_failed_group_fails_the_resource(monkeypatch, sleeps):
+    redshift_data = RedshiftData(failing={"10_schemas/b.sql"})
+    started = start(monkeypatch, redshift_data)
+
+    with pytest.raises(RuntimeError, match="relation does not exist"):
+        sql.is_complete(started, Context())
+    assert "20_rollups/c" not in redshift_data.submitted
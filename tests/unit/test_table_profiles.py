@@ -0,0 +1,34 @@
+from business_agent.table_profiles import profile_table, table_description
+
+
+def test_value_wider_than_the_first_block(tmp_path):
+    path = tmp_path / "sales.csv"
+    with open(path, "w") as f:
+        f.write("Date,Units,Region\n")
+        for month in range(1, 13):
+            for row in range(200):
+                f.write(f"2023-{month:02d},{row},North\n")
+        f.write("2024-01,1.5,100\n")
+
+    profile = profile_table([str(path)], block_size=1024)
+
+    assert profile["rows"] == 12 * 200 + 1
+    assert profile["columns"]["units"]["type"] == "double"
+    assert profile["columns"]["units"]["max"] == 199
+    assert profile["columns"]["region"]["type"] == "string"
+    assert profile["columns"]["date"]["max"] == "2024-01-01"
+
+
+def test_description_leaves_the_end_open():
+    profiles = {
+        "tables": {
+            "sales": {"rows": 10, "columns": {"date": {"min": "2021-01-01", "max": "2023-12-01"}, "sales_id": {}}},
+            "costs": {"rows": 5, "columns": {"sales_id": {}}}
+        },
+        "join_keys": {"sales_id": ["costs", "sales"]}
+    }
+
+    description = table_description("sales", profiles)
+
+    assert description == "sales: 10 rows, monthly from 2021-01-01 onward; sales_id joins costs"
+    assert "2023" not in description